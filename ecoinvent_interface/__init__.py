@@ -9,12 +9,20 @@ __all__ = [
     "ReleaseType",
     "Settings",
     "get_excel_lcia_file_for_version",
+    "get_lcia_implementation",
+    "diff_releases",
 ]
 
 __version__ = "3.1"
 
 from .storage import CachedStorage
 from .settings import Settings, permanent_setting
-from .release import EcoinventRelease, ReleaseType, get_excel_lcia_file_for_version
+from .release import (
+    EcoinventRelease,
+    ReleaseType,
+    get_excel_lcia_file_for_version,
+    get_lcia_implementation,
+)
 from .process_interface import EcoinventProcess, ProcessFileType
 from .mapping import ProcessMapping
+from .diff import diff_releases
@@ -0,0 +1,331 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Mapping
+from collections.abc import Sequence as SequenceABC
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+MAGIC = b"EICOL\x00\x01\x00"
+ALIGNMENT = 8
+NULL = np.iinfo(np.uint32).max
+# Missing values of integer and boolean columns; float columns use NaN
+INT_NULL = np.iinfo(np.int64).min
+BOOL_NULL = 255
+DTYPES = {
+    "str": "<u4",
+    "int64": "<i8",
+    "float64": "<f8",
+    "bool": "u1",
+    "json": "<u4",
+}
+
+
+def _is_int(value) -> bool:
+    return (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and INT_NULL < value <= np.iinfo(np.int64).max
+    )
+
+
+def _column_type(values: list) -> str:
+    """Storage type of a column; `None` is allowed in every type. Values
+    which don't fit any other type, e.g. mixed types or lists, are stored as
+    JSON strings."""
+    present = [value for value in values if value is not None]
+    if all(isinstance(value, str) for value in present):
+        return "str"
+    elif all(isinstance(value, bool) for value in present):
+        return "bool"
+    elif all(_is_int(value) for value in present):
+        return "int64"
+    elif all(isinstance(value, float) or _is_int(value) for value in present):
+        return "float64"
+    return "json"
+
+
+def _decode(kind: str, value, strings: List[str]):
+    if kind == "str":
+        return None if value == NULL else strings[value]
+    elif kind == "json":
+        return None if value == NULL else json.loads(strings[value])
+    elif kind == "bool":
+        return None if value == BOOL_NULL else bool(value)
+    elif kind == "int64":
+        return None if value == INT_NULL else value
+    elif kind == "float64":
+        return None if value != value else value
+    return value
+
+
+def _decode_column(kind: str, values: list, strings: List[str]) -> list:
+    if kind == "float64" and not any(value != value for value in values):
+        return values
+    elif kind == "int64" and INT_NULL not in values:
+        return values
+    return [_decode(kind, value, strings) for value in values]
+
+
+def _padding(length: int) -> bytes:
+    return b"\x00" * (-length % ALIGNMENT)
+
+
+def encode_columns(records: Iterable[dict], columns: Sequence[str]) -> tuple:
+    """Convert records to column arrays and a shared string table.
+
+    String values are replaced by their position in the string table, and
+    `None` by `NULL`. Other values are stored as numbers, with `None` as
+    `INT_NULL`, `BOOL_NULL`, or NaN; columns with anything else, e.g. lists
+    or mixed types, are stored as JSON strings.
+
+    Returns `(arrays, types, strings)`, with `arrays` and `types`
+    dictionaries keyed by column name."""
+    records = list(records)
+    codes, strings = {}, []
+
+    def encode(value):
+        if value is None:
+            return NULL
+        if value not in codes:
+            codes[value] = len(strings)
+            strings.append(value)
+        return codes[value]
+
+    missing = {"int64": INT_NULL, "float64": np.nan, "bool": BOOL_NULL}
+    arrays, types = {}, {}
+    for name in columns:
+        values = [obj.get(name) for obj in records]
+        kind = types[name] = _column_type(values)
+        if kind == "str":
+            values = [encode(value) for value in values]
+        elif kind == "json":
+            values = [
+                NULL if value is None else encode(json.dumps(value, sort_keys=True))
+                for value in values
+            ]
+        else:
+            values = [missing[kind] if value is None else value for value in values]
+        arrays[name] = np.asarray(values, dtype=DTYPES[kind])
+    return arrays, types, strings
+
+
+def write_table(
+    records: Iterable[dict], columns: Sequence[str], filepath: Union[str, Path]
+) -> Path:
+    """Write `records` to a compact, memory-mappable columnar file.
+
+    All strings are stored once in a shared string table; string columns are
+    arrays of `uint32` string codes, with `None` stored as `NULL`. Integer and
+    float columns are stored as little-endian 64 bit arrays, and boolean
+    columns as bytes (see `encode_columns` for missing and other values).
+
+    Every section is aligned to eight bytes, so arrays can be used directly
+    from a memory map without copying. The JSON header with the section
+    offsets is at the end of the file, followed by its length and `MAGIC`."""
+    arrays, types, strings = encode_columns(records, columns)
+    strings = [obj.encode("utf-8") for obj in strings]
+    header_columns = [{"name": name, "type": types[name]} for name in columns]
+    rows = len(next(iter(arrays.values()))) if arrays else 0
+
+    string_offsets = np.zeros(len(strings) + 1, dtype="<u8")
+    np.cumsum([len(obj) for obj in strings], out=string_offsets[1:])
+    sections = [arrays[name].tobytes() for name in columns] + [
+        string_offsets.tobytes(),
+        b"".join(strings),
+    ]
+
+    offsets, position = [], len(MAGIC)
+    for section in sections:
+        offsets.append(position)
+        position += len(section) + len(_padding(len(section)))
+    header = {
+        "rows": rows,
+        "columns": [
+            dict(column, offset=offset)
+            for column, offset in zip(header_columns, offsets)
+        ],
+        "strings": {"count": len(strings), "offsets": offsets[-2], "data": offsets[-1]},
+    }
+    header = json.dumps(header).encode("utf-8")
+
+    filepath = Path(filepath)
+    fd, tmp_filepath = tempfile.mkstemp(dir=filepath.parent, suffix=".tmp")
+    with open(fd, "wb") as f:
+        f.write(MAGIC)
+        for section in sections:
+            f.write(section)
+            f.write(_padding(len(section)))
+        # Header goes at the end, as the section offsets are only known now
+        f.write(header)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(MAGIC)
+    os.replace(tmp_filepath, filepath)
+    return filepath
+
+
+class ColumnarTable:
+    """Read-only view of a table written by `write_table`.
+
+    `buffer` can be any bytes-like object; with a memory map, column arrays
+    are shared between processes by the operating system and only read from
+    disk when used."""
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if bytes(view[: len(MAGIC)]) != MAGIC or bytes(view[-len(MAGIC) :]) != MAGIC:
+            raise ValueError("Not a columnar table file")
+        end = len(view) - len(MAGIC) - 8
+        (length,) = struct.unpack("<Q", view[end : end + 8])
+        header = json.loads(bytes(view[end - length : end]))
+
+        self._buffer = buffer
+        self._view = view
+        self.rows = header["rows"]
+        self.types = {obj["name"]: obj["type"] for obj in header["columns"]}
+        self.arrays = {
+            obj["name"]: np.frombuffer(
+                buffer,
+                dtype=DTYPES[obj["type"]],
+                count=self.rows,
+                offset=obj["offset"],
+            )
+            for obj in header["columns"]
+        }
+        self._string_offsets = np.frombuffer(
+            buffer,
+            dtype="<u8",
+            count=header["strings"]["count"] + 1,
+            offset=header["strings"]["offsets"],
+        )
+        self._string_data = header["strings"]["data"]
+        self._strings = None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def strings(self) -> List[str]:
+        """The decoded string table; decoded on first use"""
+        if self._strings is None:
+            offsets = self._string_offsets.tolist()
+            base, view = self._string_data, self._view
+            self._strings = [
+                str(view[base + start : base + end], "utf-8")
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ]
+        return self._strings
+
+    def column(self, name: str) -> list:
+        """Column values as a list of Python objects"""
+        kind = self.types[name]
+        # Only decode the string table if the column refers to it
+        strings = self.strings if kind in ("str", "json") else []
+        return _decode_column(kind, self.arrays[name].tolist(), strings)
+
+    def to_records(self) -> List[dict]:
+        columns = {name: self.column(name) for name in self.arrays}
+        return [
+            {name: values[row] for name, values in columns.items()}
+            for row in range(self.rows)
+        ]
+
+
+def open_table(filepath: Union[str, Path]) -> ColumnarTable:
+    """Memory map a columnar table file"""
+    with open(filepath, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return ColumnarTable(buffer)
+
+
+class MappingRow(Mapping):
+    """Read-only dictionary view of one row of a `MappingTable`"""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "MappingTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str):
+        return self._table.value(key, self._row)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.columns)
+
+    def __len__(self) -> int:
+        return len(self._table.columns)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class MappingTable(SequenceABC):
+    """Memory-compact table of mapping records.
+
+    Columns are `numpy` arrays; strings are stored once in a shared table
+    and referenced by code, so repeated geographies or products cost four
+    bytes per row. Behaves like a list of read-only dictionaries."""
+
+    def __init__(self, arrays: dict, types: dict, strings: List[str]):
+        self.arrays = arrays
+        self.types = types
+        self.strings = strings
+        self.columns = list(arrays)
+        self._length = len(next(iter(arrays.values()))) if arrays else 0
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[dict], columns: Optional[Sequence[str]] = None
+    ) -> "MappingTable":
+        records = list(records)
+        if columns is None:
+            columns = list(dict.fromkeys(key for obj in records for key in obj))
+        return cls(*encode_columns(records, columns))
+
+    @classmethod
+    def from_columnar(cls, table: ColumnarTable) -> "MappingTable":
+        """Use the (memory mapped) arrays of `table` without copying"""
+        return cls(table.arrays, table.types, table.strings)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [MappingRow(self, row) for row in range(self._length)[index]]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("MappingTable index out of range")
+        return MappingRow(self, index)
+
+    def __iter__(self) -> Iterator[MappingRow]:
+        return (MappingRow(self, row) for row in range(self._length))
+
+    def value(self, name: str, row: int):
+        return _decode(self.types[name], self.arrays[name][row].item(), self.strings)
+
+    def column(self, name: str) -> list:
+        """Column values as a list of Python objects"""
+        return _decode_column(
+            self.types[name], self.arrays[name].tolist(), self.strings
+        )
+
+    def to_records(self) -> List[dict]:
+        columns = {name: self.column(name) for name in self.columns}
+        return [
+            {name: values[row] for name, values in columns.items()}
+            for row in range(self._length)
+        ]
+
+
+def table_column(data: Union[List[dict], MappingTable], name: str) -> list:
+    """Column values from a `MappingTable` or a list of dictionaries"""
+    if isinstance(data, MappingTable):
+        return data.column(name) if name in data.arrays else [None] * len(data)
+    return [obj.get(name) for obj in data]
@@ -1,6 +1,7 @@
 import gzip
 import json
 import logging
+import threading
 import warnings
 from datetime import datetime
 from pathlib import Path
@@ -27,10 +28,12 @@ def logged_in(f):
 
 def fresh_login(f):
     def wrapper(self, *args, **kwargs):
-        if not hasattr(self, "last_refresh"):
-            self.login()
-        if time() - self.last_refresh > 120:
-            self.refresh_tokens()
+        # Only one thread should get new tokens
+        with self._login_lock:
+            if not hasattr(self, "last_refresh"):
+                self.login()
+            if time() - self.last_refresh > 120:
+                self.refresh_tokens()
         return f(self, *args, **kwargs)
 
     return wrapper
@@ -67,6 +70,7 @@ class InterfaceBase:
         settings: Settings,
         urls: Optional[dict] = None,
         custom_headers: Optional[dict] = None,
+        pool_size: Optional[int] = 16,
     ):
         self.username = settings.username
         if not self.username:
@@ -78,6 +82,14 @@ class InterfaceBase:
         if not self.client_id:
             raise ValueError("Missing client_id; see configurations docs")
 
+        self._login_lock = threading.RLock()
+        # One session reuses connections; it can be shared between threads
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.urls = URLS if urls is None else urls
         self.custom_headers = custom_headers or {}
         self.storage = CachedStorage(settings.output_path)
@@ -135,7 +147,7 @@ class InterfaceBase:
             "ecoinvent-api-client-library-version": __version__,
         }
         headers.update(self.custom_headers)
-        response = requests.post(sso_url, post_data, headers=headers, timeout=20)
+        response = self.session.post(sso_url, post_data, headers=headers, timeout=20)
 
         if response.ok:
             tokens = json.loads(response.text)
@@ -179,7 +191,7 @@ class InterfaceBase:
     Client ID: {self.client_id}
         """
         logger.debug(message)
-        response = requests.get(reports_url, headers=headers, timeout=20)
+        response = self.session.get(reports_url, headers=headers, timeout=20)
         if response.status_code == 401:
             raise PermissionError("Your license doesn't permit report access")
         return response.json()
@@ -202,7 +214,7 @@ class InterfaceBase:
     Client ID: {self.client_id}
         """
         logger.debug(message)
-        response = requests.get(files_url, headers=headers, timeout=20)
+        response = self.session.get(files_url, headers=headers, timeout=20)
         if response.status_code == 404:
             raise PermissionError("Your license doesn't permit file access")
         return response.json()
@@ -235,7 +247,7 @@ class InterfaceBase:
     ) -> None:
         out_filepath = directory / (filename + ".gz" if zipped else filename)
         with (
-            requests.get(
+            self.session.get(
                 url, stream=True, headers=headers, params=params, timeout=60
             ) as response,
             open(out_filepath, "wb") as out_file,
@@ -310,7 +322,9 @@ class InterfaceBase:
             "ecoinvent-api-client-library-version": __version__,
         }
         headers.update(self.custom_headers)
-        s3_link = requests.get(url, headers=headers, timeout=20).json()["download_url"]
+        s3_link = self.session.get(url, headers=headers, timeout=20).json()[
+            "download_url"
+        ]
         self._streaming_download(
             url=s3_link, params={}, directory=directory, filename=filename
         )
@@ -0,0 +1,200 @@
+import json
+import shutil
+from array import array
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from .columnar import MappingTable, open_table, write_table
+from .storage import atomic_directory
+from .xlsx import Workbook
+
+CUMULATIVE_FORMAT = 1
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, float)
+
+
+def _label(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _field_names(cells: list, fallback: str) -> List[str]:
+    """Unique, non-empty field names from header cells"""
+    names = []
+    for position, cell in enumerate(cells):
+        name = _label(cell) or f"{fallback}_{position}"
+        while name in names:
+            name += "_"
+        names.append(name)
+    return names
+
+
+def convert_sheet(workbook: Workbook, sheet: str, directory: Path) -> dict:
+    """Convert one worksheet of cumulative results to binary files.
+
+    Rows before the first row with a number are header rows. In the data
+    rows, the columns before the first number are labels (e.g. activity name,
+    geography, and reference product), and the following columns are values
+    (e.g. one impact category each).
+
+    Writes to `directory`:
+
+    * `values.npy`: `float64` array of rows by value columns, in column-major
+      order so that one column is contiguous; empty or text cells are `NaN`
+    * `rows.eicol`: Columnar table of row labels, with field names from the
+      last header row
+    * `columns.eicol`: Columnar table of value column labels, with one field
+      per header row, named after the last label cell of that row
+
+    Returns metadata with the sheet shape."""
+    header, labels, values = [], [], array("d")
+    first_value, width = None, 0
+
+    for cells in workbook.iter_rows(sheet):
+        if first_value is None:
+            numbers = [pos for pos, cell in enumerate(cells) if _is_number(cell)]
+            if not numbers:
+                header.append(cells)
+                continue
+            first_value = numbers[0]
+            width = max([len(row) for row in header] + [len(cells)], default=len(cells))
+        if not any(cell is not None for cell in cells):
+            continue
+        cells = cells + [None] * (width - len(cells))
+        labels.append([_label(cell) for cell in cells[:first_value]])
+        values.extend(
+            cell if _is_number(cell) else np.nan for cell in cells[first_value:width]
+        )
+
+    if first_value is None:
+        raise ValueError(f"No numeric data found in sheet {sheet}")
+
+    matrix = np.frombuffer(values, dtype=np.float64).reshape(
+        (len(labels), width - first_value)
+    )
+    np.save(directory / "values.npy", np.asfortranarray(matrix))
+
+    last_header = header[-1] if header else []
+    row_fields = _field_names(
+        (last_header + [None] * first_value)[:first_value], "label"
+    )
+    write_table(
+        [dict(zip(row_fields, row)) for row in labels],
+        row_fields,
+        directory / "rows.eicol",
+    )
+
+    column_fields = _field_names(
+        [
+            next((cell for cell in reversed(row[:first_value]) if cell), None)
+            for row in header
+        ],
+        "header",
+    )
+    column_labels = [
+        {
+            field: _label(row[pos]) if pos < len(row) else None
+            for field, row in zip(column_fields, header)
+        }
+        for pos in range(first_value, width)
+    ]
+    write_table(column_labels, column_fields, directory / "columns.eicol")
+    return {"rows": len(labels), "columns": width - first_value}
+
+
+def convert_cumulative_workbook(
+    filepath: Path, target: Path, sheets: Optional[Sequence[str]] = None
+) -> Path:
+    """Convert the worksheets of a cumulative LCI or LCIA workbook with
+    `convert_sheet`, each into its own subdirectory of `target`.
+
+    Sheets without any numbers are skipped, unless given in `sheets`.
+
+    Returns `target`."""
+    filepath, target = Path(filepath), Path(target)
+    metadata = {"format": CUMULATIVE_FORMAT, "workbook": filepath.name, "sheets": {}}
+    with atomic_directory(target) as staging:
+        with Workbook(filepath) as workbook:
+            for position, sheet in enumerate(sheets or workbook.sheet_names):
+                directory = staging / str(position)
+                directory.mkdir()
+                try:
+                    meta = convert_sheet(workbook, sheet, directory)
+                except ValueError:
+                    if sheets:
+                        raise
+                    shutil.rmtree(directory)
+                    continue
+                metadata["sheets"][sheet] = dict(meta, directory=str(position))
+
+        with open(staging / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+    return target
+
+
+class CumulativeResults:
+    """Lazy access to a workbook converted with `convert_cumulative_workbook`.
+
+    Values are memory mapped, so only the requested rows and columns are
+    read from disk."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "metadata.json", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("format") != CUMULATIVE_FORMAT:
+            raise ValueError(f"Unknown cumulative cache format in {self.directory}")
+
+    @property
+    def sheets(self) -> List[str]:
+        return list(self.metadata["sheets"])
+
+    def _directory(self, sheet: str) -> Path:
+        if sheet not in self.metadata["sheets"]:
+            raise KeyError(f"Sheet {sheet} not in {self.sheets}")
+        return self.directory / self.metadata["sheets"][sheet]["directory"]
+
+    def rows(self, sheet: str) -> MappingTable:
+        """Row labels of `sheet`, e.g. activity name and geography"""
+        return MappingTable.from_columnar(
+            open_table(self._directory(sheet) / "rows.eicol")
+        )
+
+    def columns(self, sheet: str) -> MappingTable:
+        """Value column labels of `sheet`, e.g. method, category, and unit"""
+        return MappingTable.from_columnar(
+            open_table(self._directory(sheet) / "columns.eicol")
+        )
+
+    def find(self, labels: MappingTable, **attributes) -> List[int]:
+        """Positions in `labels` (from `rows` or `columns`) matching all
+        `attributes`"""
+        matches = None
+        for field, value in attributes.items():
+            found = {
+                pos for pos, obj in enumerate(labels.column(field)) if obj == value
+            }
+            matches = found if matches is None else matches & found
+        return sorted(matches if matches is not None else range(len(labels)))
+
+    def values(
+        self,
+        sheet: str,
+        rows: Optional[Union[Sequence[int], slice]] = None,
+        columns: Optional[Union[Sequence[int], slice]] = None,
+    ) -> np.ndarray:
+        """Values of `sheet`, optionally only the given row and column
+        positions. Without positions, returns the read-only memory map."""
+        data = np.load(self._directory(sheet) / "values.npy", mmap_mode="r")
+        if columns is not None:
+            data = data[:, columns]
+        if rows is not None:
+            data = data[rows, :]
+        return data
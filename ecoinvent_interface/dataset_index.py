@@ -0,0 +1,227 @@
+import os
+import re
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+from lxml import etree
+
+from .datasets import iter_datasets
+
+INDEX_FORMAT = 1
+# Columns of the `datasets` table, from `spold.parse_dataset` fields
+DATASET_COLUMNS = {
+    "filename": "filename",
+    "activity_id": "id",
+    "product_id": "reference_product_id",
+    "activity_name": "activity_name",
+    "reference_product": "reference_product",
+    "unit": "unit",
+    "geography": "geography",
+    "start_date": "start_date",
+    "end_date": "end_date",
+    "size": "size",
+}
+DATASET_INDEXES = {
+    "activity_id": ("activity_id",),
+    "product_id": ("product_id",),
+    "name": ("activity_name", "reference_product", "geography"),
+    "geography": ("geography",),
+}
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _local_name(tag: str) -> str:
+    return etree.QName(tag).localname
+
+
+def _column_name(name: str) -> str:
+    # `unitName` to `unit_name`
+    name = re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+    return re.sub(r"\W", "_", name)
+
+
+def _masterdata_records(filepath: Path) -> Iterator[dict]:
+    """One record per entry in a MasterData XML file, with the entry
+    attributes and the text of its child and grandchild elements which don't
+    have children themselves (first occurrence of each name only, so
+    translations are skipped)"""
+    root = etree.parse(str(filepath)).getroot()
+    for element in root:
+        if not isinstance(element.tag, str):
+            continue
+        record = {
+            _column_name(key): value
+            for key, value in element.attrib.items()
+            if not key.startswith("{")
+        }
+        for child in element.iterchildren("*"):
+            nodes = [child] if not len(child) else list(child.iterchildren("*"))
+            for node in nodes:
+                if len(node):
+                    continue
+                record.setdefault(_column_name(_local_name(node.tag)), node.text)
+        yield record
+
+
+def _find_masterdata(path: Path) -> Optional[Path]:
+    if (path / "MasterData").is_dir():
+        return path / "MasterData"
+    return next((obj for obj in path.glob("*/MasterData") if obj.is_dir()), None)
+
+
+def _write_masterdata(connection: sqlite3.Connection, directory: Path) -> List[str]:
+    tables = []
+    for filepath in sorted(directory.glob("*.xml")):
+        records = list(_masterdata_records(filepath))
+        if not records:
+            continue
+        columns = list(dict.fromkeys(key for obj in records for key in obj))
+        table = filepath.stem
+        connection.execute(
+            f"CREATE TABLE {_quote(table)} ("
+            + ", ".join(f"{_quote(column)} TEXT" for column in columns)
+            + ")"
+        )
+        connection.executemany(
+            f"INSERT INTO {_quote(table)} VALUES ("
+            + ", ".join("?" * len(columns))
+            + ")",
+            ([obj.get(column) for column in columns] for obj in records),
+        )
+        for column in ("id", "name"):
+            if column in columns:
+                connection.execute(
+                    f"CREATE INDEX {_quote(f'{table}_{column}')} "
+                    f"ON {_quote(table)} ({_quote(column)})"
+                )
+        tables.append(table)
+    return tables
+
+
+def build_dataset_index(
+    path: Path, target: Path, max_workers: Optional[int] = None
+) -> Path:
+    """Build an SQLite index of an extracted ecospold release.
+
+    The `datasets` table has one row per `.spold` file, with the
+    `DATASET_COLUMNS`, and indexes on activity id, product id, geography, and
+    name, product, and geography. Every XML file in `MasterData` becomes a
+    table of the same name (e.g. `IntermediateExchanges`), with columns from
+    the attributes and simple child elements of its entries, and indexes on
+    `id` and `name`. The `metadata` table lists the MasterData tables.
+
+    Datasets are read with `datasets.iter_datasets` using `max_workers`
+    processes. The database is written to a temporary file which then
+    replaces `target`.
+
+    Returns `target`."""
+    path, target = Path(path), Path(target)
+    fd, tmp_filepath = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(tmp_filepath)
+        try:
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            columns = list(DATASET_COLUMNS)
+            connection.execute(
+                "CREATE TABLE datasets ("
+                + ", ".join(
+                    f"{column} INTEGER" if column == "size" else f"{column} TEXT"
+                    for column in columns
+                )
+                + ", PRIMARY KEY (filename))"
+            )
+            records = iter_datasets(
+                path,
+                fields=list(DATASET_COLUMNS.values()),
+                max_workers=max_workers,
+            )
+            connection.executemany(
+                f"INSERT INTO datasets VALUES ({', '.join('?' * len(columns))})",
+                ([obj[field] for field in DATASET_COLUMNS.values()] for obj in records),
+            )
+            for name, index_columns in DATASET_INDEXES.items():
+                connection.execute(
+                    f"CREATE INDEX datasets_{name} ON datasets "
+                    f"({', '.join(index_columns)})"
+                )
+
+            masterdata = _find_masterdata(path)
+            tables = _write_masterdata(connection, masterdata) if masterdata else []
+            connection.execute("CREATE TABLE metadata (key TEXT, value TEXT)")
+            connection.executemany(
+                "INSERT INTO metadata VALUES (?, ?)",
+                [("format", str(INDEX_FORMAT))]
+                + [("masterdata", table) for table in tables],
+            )
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(tmp_filepath, target)
+    finally:
+        if os.path.exists(tmp_filepath):
+            os.unlink(tmp_filepath)
+    return target
+
+
+class DatasetIndex:
+    """Read-only queries on an index built with `build_dataset_index`.
+
+    Rows are returned as dictionaries. Use `connection` for anything else,
+    e.g. joins with the MasterData tables."""
+
+    def __init__(self, filepath: Union[str, Path]):
+        self.filepath = Path(filepath)
+        self.connection = sqlite3.connect(
+            f"{self.filepath.resolve().as_uri()}?mode=ro", uri=True
+        )
+        self.connection.row_factory = sqlite3.Row
+        metadata = self.connection.execute("SELECT key, value FROM metadata")
+        metadata = [tuple(row) for row in metadata]
+        if ("format", str(INDEX_FORMAT)) not in metadata:
+            raise ValueError(f"Unknown dataset index format in {self.filepath}")
+        self.masterdata = [value for key, value in metadata if key == "masterdata"]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "DatasetIndex":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM datasets").fetchone()[0]
+
+    def query(self, sql: str, parameters: Union[tuple, dict] = ()) -> List[dict]:
+        return [dict(row) for row in self.connection.execute(sql, parameters)]
+
+    def find(self, **attributes) -> List[dict]:
+        """Datasets matching all `attributes`, which are `datasets` columns,
+        e.g. `find(reference_product="heat", geography="CH")`"""
+        unknown = set(attributes).difference(DATASET_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown dataset columns: {sorted(unknown)}")
+        where = " AND ".join(f"{column} = ?" for column in attributes) or "1"
+        return self.query(
+            f"SELECT * FROM datasets WHERE {where} ORDER BY filename",
+            tuple(attributes.values()),
+        )
+
+    def get(self, filename: str) -> Optional[dict]:
+        found = self.find(filename=filename)
+        return found[0] if found else None
+
+    def masterdata_entry(self, table: str, entry_id: str) -> Optional[dict]:
+        """Entry `entry_id` of MasterData `table`, e.g. `"IntermediateExchanges"`"""
+        if table not in self.masterdata:
+            raise KeyError(f"MasterData table {table} not in {self.masterdata}")
+        found = self.query(f"SELECT * FROM {_quote(table)} WHERE id = ?", (entry_id,))
+        return found[0] if found else None
@@ -0,0 +1,214 @@
+import io
+import os
+import queue
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import py7zr
+from py7zr.io import Py7zIO, WriterFactory
+
+from .spold import check_fields, parse_dataset
+
+SPOLD_SUFFIX = ".spold"
+# Decompressed files waiting to be parsed
+QUEUE_SIZE = 256
+
+
+def _is_spold(name: str) -> bool:
+    return name.lower().endswith(SPOLD_SUFFIX)
+
+
+def _iter_directory(path: Path) -> Iterator[Tuple[str, Path]]:
+    for filepath in sorted(path.rglob("*")):
+        if filepath.is_file() and _is_spold(filepath.name):
+            yield filepath.name, filepath
+
+
+def _iter_zip(path: Path) -> Iterator[Tuple[str, bytes]]:
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if not info.is_dir() and _is_spold(info.filename):
+                yield PurePosixPath(info.filename).name, archive.read(info)
+
+
+class _Stopped(Exception):
+    """The consumer of a `_iter_7z` generator went away"""
+
+
+class _MemberWriter(Py7zIO):
+    """Collects one decompressed archive member in memory; other than
+    `.spold` files are discarded"""
+
+    def __init__(self, factory: "_QueueFactory", filename: str):
+        self.factory = factory
+        self.filename = filename
+        self.buffer = io.BytesIO() if _is_spold(filename) else None
+        self.done = False
+
+    def write(self, s: Union[bytes, bytearray]) -> int:
+        if self.buffer is not None:
+            self.buffer.write(s)
+        return len(s)
+
+    def read(self, size: Optional[int] = None) -> bytes:
+        return b"" if self.buffer is None else self.buffer.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return 0 if self.buffer is None else self.buffer.seek(offset, whence)
+
+    def flush(self) -> None:
+        pass
+
+    def size(self) -> int:
+        return 0 if self.buffer is None else self.buffer.getbuffer().nbytes
+
+    def close(self) -> None:
+        self.factory.finish(self)
+
+
+class _QueueFactory(WriterFactory):
+    """Puts each decompressed `.spold` member on a bounded queue.
+
+    A member is complete when `py7zr` closes it, or, with older versions
+    which don't close writers, when the next member is created."""
+
+    def __init__(self, items: queue.Queue, stop: threading.Event):
+        self.items = items
+        self.stop = stop
+        self.pending = None
+
+    def create(self, filename: str) -> Py7zIO:
+        self.finish(self.pending)
+        self.pending = _MemberWriter(self, filename)
+        return self.pending
+
+    def finish(self, writer: Optional[_MemberWriter]) -> None:
+        if writer is None or writer.done:
+            return
+        writer.done = True
+        if writer.buffer is not None:
+            self.put((PurePosixPath(writer.filename).name, writer.buffer.getvalue()))
+
+    def put(self, item) -> None:
+        while True:
+            if self.stop.is_set():
+                raise _Stopped
+            try:
+                self.items.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+def _iter_7z(path: Path) -> Iterator[Tuple[str, bytes]]:
+    """Decompress a `.7z` archive in one pass in a background thread.
+
+    Solid archives can't be read file by file without decompressing
+    everything before each file, so members are handed over through a queue
+    while the decompression continues."""
+    items, stop, done = queue.Queue(maxsize=QUEUE_SIZE), threading.Event(), object()
+    factory = _QueueFactory(items, stop)
+
+    def extract():
+        try:
+            with py7zr.SevenZipFile(path, "r") as archive:
+                archive.extract(factory=factory)
+            factory.finish(factory.pending)
+            factory.put(done)
+        except _Stopped:
+            pass
+        except BaseException as error:
+            try:
+                factory.put(error)
+            except _Stopped:
+                pass
+
+    thread = threading.Thread(target=extract, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iter_dataset_sources(
+    path: Union[str, Path]
+) -> Iterator[Tuple[str, Union[Path, bytes]]]:
+    """Yield `(filename, source)` for every `.spold` file in an extracted
+    release directory, or in a `.7z` or `.zip` release archive.
+
+    For directories, `source` is the filepath; for archives, the file
+    contents. Archives are read sequentially and never extracted to disk."""
+    path = Path(path)
+    if path.is_dir():
+        return _iter_directory(path)
+    elif path.suffix.lower() == ".7z":
+        return _iter_7z(path)
+    elif path.suffix.lower() == ".zip":
+        return _iter_zip(path)
+    raise ValueError(f"Can't read datasets from {path}")
+
+
+def _parse_chunk(job: tuple) -> List[dict]:
+    items, fields = job
+    return [parse_dataset(source, filename, fields) for filename, source in items]
+
+
+def _chunked(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_datasets(
+    path: Union[str, Path],
+    fields: Optional[Iterable[str]] = None,
+    max_workers: Optional[int] = None,
+    chunksize: Optional[int] = 64,
+) -> Iterator[dict]:
+    """Yield a `spold.parse_dataset` record for every `.spold` file in
+    `path`, which can be an extracted release or a release archive (see
+    `iter_dataset_sources`).
+
+    `fields` selects record fields; the fewer fields, the less of each file
+    is parsed. Chunks of `chunksize` files are parsed by a pool of
+    `max_workers` processes (default is the number of CPUs); use
+    `max_workers=1` to parse them in this process. Records are yielded in
+    file order, and only a few chunks are read ahead, so memory use doesn't
+    depend on the size of the release."""
+    fields = check_fields(fields)
+    chunks = _chunked(iter_dataset_sources(path), chunksize)
+    if max_workers == 1:
+        for chunk in chunks:
+            yield from _parse_chunk((chunk, fields))
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(_parse_chunk, (chunk, fields)))
+                if len(pending) >= 2 * max_workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,204 @@
+import hashlib
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import py7zr
+from lxml import etree
+
+from .storage import md5
+
+# Attributes set by `fix_release_versions`, which differ between releases
+# even if the data doesn't
+RELEASE_ATTRIBUTES = ("majorRelease", "minorRelease")
+ENTRY_KEYS = ("id", "code")
+
+
+def _files(path: Path, pattern: str) -> Dict[str, Path]:
+    return {obj.name: obj for obj in sorted(path.glob(pattern)) if obj.is_file()}
+
+
+def _dataset_files(path: Path) -> Dict[str, Path]:
+    return {
+        obj.name: obj
+        for obj in sorted(path.rglob("*"))
+        if obj.is_file() and obj.suffix.lower() == ".spold"
+    }
+
+
+def _masterdata_dir(path: Path) -> Optional[Path]:
+    if (path / "MasterData").is_dir():
+        return path / "MasterData"
+    return next((obj for obj in path.glob("*/MasterData") if obj.is_dir()), None)
+
+
+def _release_directory(path: Path, stack: ExitStack) -> Path:
+    """`path` itself if it's a directory; a `.7z` or `.zip` release archive
+    is extracted to a temporary directory, removed when `stack` closes"""
+    suffix = path.suffix.lower()
+    if path.is_dir():
+        return path
+    elif not path.is_file() or suffix not in (".7z", ".zip"):
+        ERROR = f"""{path} isn't an extracted release directory or a release archive.
+    Expected a directory, or a `.7z` or `.zip` file."""
+        raise ValueError(ERROR)
+    directory = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+    if suffix == ".7z":
+        with py7zr.SevenZipFile(path, "r") as archive:
+            archive.extractall(path=directory)
+    else:
+        with zipfile.ZipFile(path, "r") as archive:
+            archive.extractall(path=directory)
+    return directory
+
+
+def _canonical_hash(element: etree._Element) -> str:
+    return hashlib.md5(etree.tostring(element, method="c14n")).hexdigest()
+
+
+def content_hash(filepath: Union[str, Path]) -> str:
+    """Hash of the XML content of `filepath`, ignoring whitespace between
+    elements and the `RELEASE_ATTRIBUTES`"""
+    parser = etree.XMLParser(remove_blank_text=True)
+    root = etree.parse(str(filepath), parser).getroot()
+    for element in root.iter("*"):
+        for attribute in RELEASE_ATTRIBUTES:
+            element.attrib.pop(attribute, None)
+    return _canonical_hash(root)
+
+
+def masterdata_entries(filepath: Union[str, Path]) -> Dict[str, str]:
+    """Hash of each entry of a MasterData XML file, keyed by its `id` (or
+    `code`) attribute. Entries without either are keyed by their hash."""
+    parser = etree.XMLParser(remove_blank_text=True)
+    root = etree.parse(str(filepath), parser).getroot()
+    entries = {}
+    for element in root.iterchildren("*"):
+        digest = _canonical_hash(element)
+        key = next((element.get(obj) for obj in ENTRY_KEYS if element.get(obj)), None)
+        entries[key or digest] = digest
+    return entries
+
+
+def _compare(old: dict, new: dict, changed: list) -> dict:
+    return {
+        "added": sorted(set(new).difference(old)),
+        "removed": sorted(set(old).difference(new)),
+        "changed": sorted(changed),
+    }
+
+
+def diff_releases(
+    old: Union[str, Path],
+    new: Union[str, Path],
+    ignore_release_version: Optional[bool] = True,
+    max_workers: Optional[int] = None,
+) -> dict:
+    """Find the datasets and MasterData entries which differ between two
+    releases, e.g. two versions, or two downloads of the same version.
+
+    `old` and `new` are extracted release directories, or `.7z` or `.zip`
+    release archives, which are extracted to temporary directories first.
+    Downloading a release again replaces its extracted directory in the
+    cache, so to compare two downloads of the same release, copy the first
+    one (or its archive, from `get_release(..., extract=False)`) elsewhere
+    before downloading it again with `force_redownload=True`.
+
+    Datasets are matched by filename, which is made from the activity and
+    product UUIDs. Files with the same size and MD5 hash are unchanged;
+    other files are compared with `content_hash` if
+    `ignore_release_version`, so that datasets which only differ in their
+    release version number, or in formatting, are unchanged too. MasterData
+    files are compared entry by entry with `masterdata_entries`.
+
+    Files are hashed by a thread pool, and XML is parsed by a process pool,
+    each with `max_workers` workers; use `max_workers=1` to do everything in
+    this thread.
+
+    Returns a dictionary with `datasets`, the `added`, `removed`, and
+    `changed` dataset filenames; the number of `unchanged` datasets; and
+    `masterdata`, the `added`, `removed`, and `changed` entry ids of each
+    MasterData file which differs, e.g. `{"Geographies.xml": {"added": [...],
+    "removed": [...], "changed": [...]}}`. All lists are sorted."""
+    with ExitStack() as extracted:
+        old = _release_directory(Path(old), extracted)
+        new = _release_directory(Path(new), extracted)
+        return _diff_directories(old, new, ignore_release_version, max_workers)
+
+
+def _diff_directories(
+    old: Path, new: Path, ignore_release_version: bool, max_workers: Optional[int]
+) -> dict:
+    old_files, new_files = _dataset_files(old), _dataset_files(new)
+    common = sorted(set(old_files).intersection(new_files))
+
+    def same_bytes(name: str) -> bool:
+        a, b = old_files[name], new_files[name]
+        if a.stat().st_size != b.stat().st_size:
+            return False
+        return md5(a) == md5(b)
+
+    old_masterdata, new_masterdata = _masterdata_dir(old), _masterdata_dir(new)
+    old_xml = _files(old_masterdata, "*.xml") if old_masterdata else {}
+    new_xml = _files(new_masterdata, "*.xml") if new_masterdata else {}
+
+    with ExitStack() as stack:
+        if max_workers == 1:
+            thread_map = process_map = map
+        else:
+            threads = stack.enter_context(ThreadPoolExecutor(max_workers=max_workers))
+            processes = stack.enter_context(
+                ProcessPoolExecutor(max_workers=max_workers)
+            )
+            thread_map = threads.map
+
+            def process_map(function, items):
+                return processes.map(function, items, chunksize=16)
+
+        different = [
+            name
+            for name, same in zip(common, thread_map(same_bytes, common))
+            if not same
+        ]
+        if ignore_release_version and different:
+            hashes = list(
+                process_map(
+                    content_hash,
+                    [old_files[name] for name in different]
+                    + [new_files[name] for name in different],
+                )
+            )
+            changed = [
+                name
+                for name, a, b in zip(
+                    different, hashes[: len(different)], hashes[len(different) :]
+                )
+                if a != b
+            ]
+        else:
+            changed = different
+
+        entries = list(
+            process_map(
+                masterdata_entries,
+                list(old_xml.values()) + list(new_xml.values()),
+            )
+        )
+
+    old_entries = dict(zip(old_xml, entries))
+    new_entries = dict(zip(new_xml, entries[len(old_xml) :]))
+    masterdata = {}
+    for name in sorted(set(old_xml).union(new_xml)):
+        a, b = old_entries.get(name, {}), new_entries.get(name, {})
+        result = _compare(a, b, [key for key in a if key in b and a[key] != b[key]])
+        if any(result.values()):
+            masterdata[name] = result
+
+    return {
+        "datasets": _compare(old_files, new_files, changed),
+        "unchanged": len(common) - len(changed),
+        "masterdata": masterdata,
+    }
@@ -0,0 +1,209 @@
+import json
+from array import array
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from .columnar import MappingTable, open_table, write_table
+from .datasets import iter_datasets
+from .storage import atomic_directory
+
+EXCHANGES_FORMAT = 1
+DATASET_FIELDS = (
+    "filename",
+    "id",
+    "reference_product_id",
+    "activity_name",
+    "reference_product",
+    "geography",
+    "exchanges",
+)
+FLOW_FIELDS = ("kind", "flow_id", "name", "unit", "compartment", "subcompartment")
+# Bits of the `flags` array
+INPUT = 1
+ELEMENTARY = 2
+REFERENCE_PRODUCT = 4
+# Uncertainty distribution ids, following the `stats_arrays` convention;
+# exchanges without (or with other) distributions are 0
+UNCERTAINTY_TYPES = {
+    "undefined": 0,
+    "lognormal": 2,
+    "normal": 3,
+    "uniform": 4,
+    "triangular": 5,
+    "gamma": 9,
+    "beta": 10,
+}
+PARAMETERS = ("loc", "scale", "minimum", "maximum")
+# Array name to `numpy` dtype
+ARRAYS = {
+    "dataset": np.int32,
+    "flow": np.int32,
+    "supplier": np.int32,
+    "amount": np.float64,
+    "flags": np.uint8,
+    "group": np.int8,
+    "uncertainty_type": np.uint8,
+    "loc": np.float64,
+    "scale": np.float64,
+    "minimum": np.float64,
+    "maximum": np.float64,
+}
+
+
+def convert_exchanges(
+    path: Path, target: Path, max_workers: Optional[int] = None
+) -> Path:
+    """Convert the exchanges of an ecospold release to flat arrays.
+
+    Every exchange of every dataset is one position in the `ARRAYS`, saved as
+    `.npy` files:
+
+    * `dataset`: Row in the `datasets` table of the dataset with the exchange
+    * `flow`: Row in the `flows` table of the exchanged product or flow
+    * `supplier`: Row in the `datasets` table of the dataset producing a
+      linked intermediate exchange, or -1
+    * `amount`: Exchange amount
+    * `flags`: Bits `INPUT`, `ELEMENTARY`, and `REFERENCE_PRODUCT`
+    * `group`: ecospold input or output group, or -1
+    * `uncertainty_type` and `PARAMETERS`: Uncertainty distribution id (see
+      `UNCERTAINTY_TYPES`) and parameters, `NaN` if not given
+
+    The `datasets` (filename, activity and product ids, names, geography)
+    and `flows` (`FLOW_FIELDS`) tables are saved as columnar tables (see
+    `columnar.write_table`).
+
+    Datasets are read with `datasets.iter_datasets` using `max_workers`
+    processes.
+
+    Returns `target`."""
+    path, target = Path(path), Path(target)
+    values = {
+        "dataset": array("i"),
+        "flow": array("i"),
+        "amount": array("d"),
+        "flags": array("B"),
+        "group": array("b"),
+        "uncertainty_type": array("B"),
+    }
+    values.update({name: array("d") for name in PARAMETERS})
+    # Activity link ids as codes into `activities`, -1 for no link
+    links, activities = array("i"), {}
+    datasets, flows, flow_positions = [], [], {}
+
+    for record in iter_datasets(path, fields=DATASET_FIELDS, max_workers=max_workers):
+        position = len(datasets)
+        datasets.append(
+            {
+                "filename": record["filename"],
+                "activity_id": record["id"],
+                "product_id": record["reference_product_id"],
+                "activity_name": record["activity_name"],
+                "reference_product": record["reference_product"],
+                "geography": record["geography"],
+            }
+        )
+        for exchange in record["exchanges"]:
+            key = (exchange.kind, exchange.flow_id)
+            if key not in flow_positions:
+                flow_positions[key] = len(flows)
+                flows.append({field: getattr(exchange, field) for field in FLOW_FIELDS})
+            flags = INPUT if exchange.direction == "input" else 0
+            if exchange.kind == "elementary":
+                flags |= ELEMENTARY
+            elif exchange.direction == "output" and exchange.group == 0:
+                flags |= REFERENCE_PRODUCT
+            uncertainty = exchange.uncertainty
+            values["dataset"].append(position)
+            values["flow"].append(flow_positions[key])
+            values["amount"].append(exchange.amount)
+            values["flags"].append(flags)
+            values["group"].append(-1 if exchange.group is None else exchange.group)
+            values["uncertainty_type"].append(
+                UNCERTAINTY_TYPES.get(uncertainty.distribution, 0) if uncertainty else 0
+            )
+            for name in PARAMETERS:
+                value = getattr(uncertainty, name) if uncertainty else None
+                values[name].append(np.nan if value is None else value)
+            links.append(
+                -1
+                if exchange.activity_link is None
+                else activities.setdefault(exchange.activity_link, len(activities))
+            )
+
+    # Datasets are identified by activity and reference product
+    producers = {}
+    for position, obj in enumerate(datasets):
+        activity = activities.get(obj["activity_id"])
+        product = flow_positions.get(("intermediate", obj["product_id"]))
+        if activity is not None and product is not None:
+            producers[(activity, product)] = position
+    supplier = np.full(len(links), -1, dtype=np.int32)
+    for position, (link, flow) in enumerate(zip(links, values["flow"])):
+        if link != -1:
+            supplier[position] = producers.get((link, flow), -1)
+
+    with atomic_directory(target) as staging:
+        for name, dtype in ARRAYS.items():
+            data = supplier if name == "supplier" else np.array(values[name], dtype)
+            np.save(staging / f"{name}.npy", data.astype(dtype, copy=False))
+        write_table(
+            datasets,
+            (
+                "filename",
+                "activity_id",
+                "product_id",
+                "activity_name",
+                "reference_product",
+                "geography",
+            ),
+            staging / "datasets.eicol",
+        )
+        write_table(flows, FLOW_FIELDS, staging / "flows.eicol")
+        metadata = {
+            "format": EXCHANGES_FORMAT,
+            "exchanges": len(links),
+            "datasets": len(datasets),
+            "flows": len(flows),
+        }
+        with open(staging / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+    return target
+
+
+class ExchangeArrays:
+    """Memory-mapped access to exchanges converted with `convert_exchanges`.
+
+    For example, a square technosphere matrix has the `REFERENCE_PRODUCT`
+    exchanges at row and column `dataset`, and the exchanges with a
+    `supplier` at row `supplier` and column `dataset`, with negative
+    `amount` if the `INPUT` flag is set."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "metadata.json", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("format") != EXCHANGES_FORMAT:
+            raise ValueError(f"Unknown exchanges cache format in {self.directory}")
+
+    def __len__(self) -> int:
+        return self.metadata["exchanges"]
+
+    @property
+    def arrays(self) -> List[str]:
+        return list(ARRAYS)
+
+    def array(self, name: str) -> np.ndarray:
+        """Read-only memory map of array `name`, e.g. `"amount"`"""
+        if name not in ARRAYS:
+            raise KeyError(f"Array {name} not in {self.arrays}")
+        return np.load(self.directory / f"{name}.npy", mmap_mode="r")
+
+    @property
+    def datasets(self) -> MappingTable:
+        return MappingTable.from_columnar(open_table(self.directory / "datasets.eicol"))
+
+    @property
+    def flows(self) -> MappingTable:
+        return MappingTable.from_columnar(open_table(self.directory / "flows.eicol"))
@@ -0,0 +1,183 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .columnar import NULL, open_table, write_table
+from .storage import atomic_directory
+from .xlsx import Workbook
+
+LCIA_FORMAT = 1
+# Characterization factor sheet column labels, by lower case header
+COLUMNS = {
+    "method": "method",
+    "category": "category",
+    "indicator": "indicator",
+    "name": "name",
+    "compartment": "compartment",
+    "subcompartment": "subcompartment",
+    "cf": "cf",
+    "characterization factor": "cf",
+}
+INDICATOR_FIELDS = ("method", "category", "indicator")
+FLOW_FIELDS = ("name", "compartment", "subcompartment")
+
+
+def _header_positions(cells: list) -> Dict[str, int]:
+    positions = {}
+    for position, cell in enumerate(cells):
+        if isinstance(cell, str) and cell.strip().lower() in COLUMNS:
+            positions.setdefault(COLUMNS[cell.strip().lower()], position)
+    return positions
+
+
+def _read_factors(workbook: Workbook) -> List[dict]:
+    """Characterization factors from the first sheet with all `COLUMNS`
+    headers in its first row, preferring a sheet called `CFs`"""
+    sheets = sorted(workbook.sheet_names, key=lambda name: name.lower() != "cfs")
+    required = set(COLUMNS.values())
+    for sheet in sheets:
+        rows = workbook.iter_rows(sheet)
+        positions = _header_positions(next(rows, []))
+        if not required.issubset(positions):
+            continue
+        records = []
+        for cells in rows:
+            obj = {
+                field: cells[pos] if pos < len(cells) else None
+                for field, pos in positions.items()
+            }
+            if not isinstance(obj["cf"], float):
+                continue
+            for field in INDICATOR_FIELDS + FLOW_FIELDS:
+                if obj[field] is not None:
+                    obj[field] = str(obj[field])
+            records.append(obj)
+        return records
+    raise ValueError(f"No characterization factor sheet found in {workbook.filepath}")
+
+
+def _indicator_key(obj: dict) -> tuple:
+    return tuple(obj[field] or "" for field in INDICATOR_FIELDS)
+
+
+def convert_lcia_workbook(filepath: Path, target: Path) -> Path:
+    """Convert the characterization factors of an `LCIA_implementation`
+    workbook to columnar tables (see `columnar.write_table`).
+
+    Writes to `target`:
+
+    * `factors.eicol`: Flow name, compartment, subcompartment, and factor,
+      sorted by indicator, so the factors of each indicator are contiguous
+    * `indicators.eicol`: Method, category, and indicator, with the `start`
+      and `stop` rows of their factors
+
+    Returns `target`."""
+    filepath, target = Path(filepath), Path(target)
+    with Workbook(filepath) as workbook:
+        records = _read_factors(workbook)
+    records.sort(key=_indicator_key)
+
+    indicators = []
+    for row, obj in enumerate(records):
+        if not indicators or _indicator_key(indicators[-1]) != _indicator_key(obj):
+            indicators.append({field: obj[field] for field in INDICATOR_FIELDS})
+            indicators[-1]["start"] = row
+        indicators[-1]["stop"] = row + 1
+
+    with atomic_directory(target) as staging:
+        write_table(records, FLOW_FIELDS + ("cf",), staging / "factors.eicol")
+        write_table(
+            indicators,
+            INDICATOR_FIELDS + ("start", "stop"),
+            staging / "indicators.eicol",
+        )
+        metadata = {
+            "format": LCIA_FORMAT,
+            "workbook": filepath.name,
+            "factors": len(records),
+            "indicators": len(indicators),
+        }
+        with open(staging / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+    return target
+
+
+class LCIAImplementation:
+    """Characterization factors converted with `convert_lcia_workbook`.
+
+    The tables are memory mapped; the flow dictionary of an indicator is
+    built on first use, after which lookups are dictionary lookups."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "metadata.json", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("format") != LCIA_FORMAT:
+            raise ValueError(f"Unknown LCIA cache format in {self.directory}")
+        self._factors = open_table(self.directory / "factors.eicol")
+        table = open_table(self.directory / "indicators.eicol")
+        columns = [table.column(field) for field in INDICATOR_FIELDS]
+        self._indicators = {
+            key: (start, stop)
+            for key, start, stop in zip(
+                zip(*columns), table.column("start"), table.column("stop")
+            )
+        }
+        self._cache = {}
+
+    def __len__(self) -> int:
+        return len(self._factors)
+
+    @property
+    def indicators(self) -> List[Tuple[str, str, str]]:
+        """All `(method, category, indicator)` tuples"""
+        return list(self._indicators)
+
+    @property
+    def methods(self) -> List[str]:
+        return list(dict.fromkeys(key[0] for key in self._indicators))
+
+    def categories(self, method: str) -> List[str]:
+        return list(
+            dict.fromkeys(key[1] for key in self._indicators if key[0] == method)
+        )
+
+    def indicators_for(self, method: str, category: str) -> List[str]:
+        return [
+            key[2]
+            for key in self._indicators
+            if key[0] == method and key[1] == category
+        ]
+
+    def factors(
+        self, method: str, category: str, indicator: str
+    ) -> Dict[Tuple[str, str, str], float]:
+        """Factors of one indicator, keyed by `(name, compartment,
+        subcompartment)` flow tuples"""
+        key = (method, category, indicator)
+        if key not in self._cache:
+            if key not in self._indicators:
+                raise KeyError(f"Indicator {key} not found")
+            start, stop = self._indicators[key]
+            table, strings = self._factors, self._factors.strings
+            columns = [
+                table.arrays[field][start:stop].tolist() for field in FLOW_FIELDS
+            ]
+            flows = [
+                tuple(None if code == NULL else strings[code] for code in codes)
+                for codes in zip(*columns)
+            ]
+            self._cache[key] = dict(zip(flows, table.arrays["cf"][start:stop].tolist()))
+        return self._cache[key]
+
+    def factor(
+        self,
+        method: str,
+        category: str,
+        indicator: str,
+        flow: Tuple[str, str, str],
+        default: Optional[float] = None,
+    ) -> Optional[float]:
+        """Factor of `flow` (`(name, compartment, subcompartment)`) for one
+        indicator, or `default` if the flow isn't characterized"""
+        return self.factors(method, category, indicator).get(tuple(flow), default)
@@ -1,28 +1,91 @@
 import json
+import logging
+import os
 import shutil
 import tempfile
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from pathlib import Path
 from time import sleep
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-import pyecospold
+import requests
 from tqdm import tqdm
 
 from . import CachedStorage, EcoinventProcess, Settings
+from .columnar import write_table
 from .core import SYSTEM_MODELS
+from .process_interface import (
+    get_cached_mapping,
+    get_field_values,
+    get_mapping_index,
+    get_search_index,
+    get_version_linkage,
+)
 from .release import ReleaseType
+from .spold import extract_mapping_fields
+from .storage import crc32
 
 DATA_DIR = Path(__file__).parent.resolve() / "data"
 
+logger = logging.getLogger("ecoinvent_interface")
 
-def get_rp_text(exchanges: list) -> str:
-    rp_exchanges = [
-        exc for exc in exchanges if exc.groupStr == "ReferenceProduct" and exc.amount
-    ]
-    if len(rp_exchanges) != 1:
-        raise ValueError("Can't find single reference product")
-    return rp_exchanges[0].names[0]
+
+def write_mapping_table(data: List[dict], filepath: Path) -> Path:
+    """Write mapping records to the columnar format read by `get_cached_mapping`"""
+    columns = list(dict.fromkeys(key for obj in data for key in obj))
+    return write_table(data, columns, filepath)
+
+
+def _fingerprint_record(job: tuple) -> tuple:
+    """Return `(checksum, record)` for a `.spold` file.
+
+    `job` is `(filepath, previous, checksum)`; the file is only parsed if
+    its checksum differs from the `previous` fingerprint."""
+    filepath, previous, checksum = job
+    if not checksum:
+        return None, extract_mapping_fields(filepath)
+    checksum = crc32(filepath)
+    if previous and previous["crc32"] == checksum:
+        return checksum, previous["record"]
+    return checksum, extract_mapping_fields(filepath)
+
+
+def _write_json(data, filepath: Path, **kwargs) -> None:
+    """Write JSON to a temporary file first, so readers never see part of it"""
+    fd, tmp_filepath = tempfile.mkstemp(dir=filepath.parent, suffix=".tmp")
+    try:
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, **kwargs)
+        os.replace(tmp_filepath, filepath)
+    finally:
+        if os.path.exists(tmp_filepath):
+            os.unlink(tmp_filepath)
+
+
+def load_checkpoint(filepath: Path) -> dict:
+    """Read a `create_remote_mapping` checkpoint file.
+
+    Returns dictionary of dataset id to record, or `None` for ids without
+    a dataset. An incomplete last line, e.g. after a crash, is removed from
+    the file so that new lines can be appended."""
+    done = {}
+    if not filepath.is_file():
+        return done
+    with open(filepath, "rb+") as f:
+        valid = 0
+        for line in f:
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            done[obj["id"]] = obj["data"]
+            valid += len(line)
+        f.truncate(valid)
+    return done
 
 
 class ProcessMapping:
@@ -33,21 +96,136 @@ class ProcessMapping:
         self.storage = storage or CachedStorage()
 
     def create_remote_mapping(
-        self, version: str, system_model: str, max_id: int
+        self,
+        version: str,
+        system_model: str,
+        max_id: Optional[int] = None,
+        checkpoint: Optional[Path] = None,
+        max_workers: Optional[int] = 4,
+        max_misses: Optional[int] = 100,
+        delay: Optional[float] = 0.1,
+        max_retries: Optional[int] = 5,
+        backoff: Optional[float] = 1,
     ) -> list:
-        remote_data = []
+        """Get basic info for all datasets of a release from the API.
+
+        Dataset ids are requested in order by `max_workers` threads, each
+        waiting `delay` seconds between requests. If `max_id` isn't given,
+        stops after `max_misses` consecutive ids without a dataset.
+
+        Only a 404 or an empty response means there is no dataset with an
+        id. Other errors, e.g. rate limiting, server errors, or connection
+        errors and timeouts, are retried up to `max_retries` times, waiting
+        `backoff` seconds, then twice as long each time; if the last attempt
+        fails too, its `HTTPError` or other `requests` exception is raised,
+        once the datasets fetched so far are saved to the checkpoint.
+
+        Progress is appended to the JSON lines file `checkpoint` (default is
+        in the cache directory), so an interrupted run can be started again
+        and only requests the remaining ids.
+
+        Returns the dataset records sorted by id."""
+        if checkpoint is None:
+            checkpoint = (
+                self.storage.dir / f"remote-mapping-{version}-{system_model}.jsonl"
+            )
+        checkpoint = Path(checkpoint)
+        done = load_checkpoint(checkpoint)
 
         process = EcoinventProcess(self.settings)
         process.set_release(version, system_model)
 
-        for index in tqdm(range(1, max_id + 1)):
-            process.dataset_id = index
-            remote_data.append(process.get_basic_info())
-            sleep(0.1)
+        def fetch(index: int) -> tuple:
+            for attempt in range(max_retries + 1):
+                if attempt:
+                    sleep(backoff * 2 ** (attempt - 1))
+                try:
+                    response = process.get_dataset_info_response(index)
+                except requests.RequestException as error:
+                    if attempt == max_retries:
+                        raise
+                    reason = repr(error)
+                else:
+                    sleep(delay)
+                    if response.status_code == 404 or (
+                        response.ok and not response.content
+                    ):
+                        return index, None
+                    if response.ok:
+                        return index, response.json() or None
+                    if attempt == max_retries:
+                        response.raise_for_status()
+                    reason = response.status_code
+                message = f"""Dataset info request failed.
+    Dataset ID: {index}
+    Error: {reason}
+    Attempt: {attempt + 1} of {max_retries + 1}
+                """
+                logger.debug(message)
+
+        batch_size = 4 * (max_workers or 1)
+        index, misses, finished = 0, 0, False
+        with (
+            open(checkpoint, "a", encoding="utf-8") as f,
+            ThreadPoolExecutor(max_workers=max_workers) as executor,
+            tqdm(total=max_id) as progress,
+        ):
+            while not finished:
+                stop = (
+                    index + batch_size
+                    if max_id is None
+                    else min(index + batch_size, max_id)
+                )
+                batch = range(index + 1, stop + 1)
+                futures = [executor.submit(fetch, i) for i in batch if i not in done]
+                error = None
+                for future in as_completed(futures):
+                    try:
+                        i, data = future.result()
+                    except Exception as exception:
+                        # Checkpoint the rest of the batch before giving up
+                        error = error or exception
+                        continue
+                    done[i] = data
+                    f.write(json.dumps({"id": i, "data": data}) + "\n")
+                f.flush()
+                if error is not None:
+                    raise error
+                progress.update(len(batch))
 
-        return remote_data
+                for i in batch:
+                    misses = 0 if done[i] is not None else misses + 1
+                index = stop
+                if max_id is None:
+                    finished = misses >= max_misses
+                else:
+                    finished = index >= max_id
 
-    def create_local_mapping(self, version: str, system_model: str) -> None:
+        return [
+            done[i]
+            for i in sorted(done)
+            if done[i] is not None and (max_id is None or i <= max_id)
+        ]
+
+    def iter_local_mapping(
+        self,
+        version: str,
+        system_model: str,
+        max_workers: Optional[int] = None,
+        chunksize: Optional[int] = 64,
+        incremental: Optional[bool] = True,
+    ) -> Iterator[dict]:
+        """Yield mapping records for each dataset of a downloaded release.
+
+        Files are read with `extract_mapping_fields` by a pool of
+        `max_workers` processes (default is the number of CPUs); use
+        `max_workers=1` to read them in this process.
+
+        If `incremental`, the size, modification time, and CRC32 checksum of
+        each file are saved with its record in the cache directory once all
+        records are yielded. The next run reuses the records of unchanged
+        files: files with the same size and modification time aren't read at
+        all, and other files are only parsed if their checksum changed."""
         key = ReleaseType.ecospold.filename(
             version=version,
             system_model_abbr=SYSTEM_MODELS.get(system_model, system_model),
@@ -57,67 +235,136 @@ class ProcessMapping:
             raise ValueError(ERROR)
 
         dir_path = Path(self.storage.catalogue[key]["path"]) / "datasets"
-        local_data = []
         file_paths = [
             fp
             for fp in dir_path.iterdir()
             if fp.is_file() and fp.suffix.lower() == ".spold"
         ]
 
-        for file_path in tqdm(file_paths):
-            ecospold = pyecospold.parse_file_v2(file_path)
-            local_data.append(
-                {
-                    "filename": file_path.name,
-                    "activity_name": ecospold.activityDataset.activityDescription.activity[  # NOQA E501
-                        0
-                    ].activityNames[
-                        0
-                    ],
-                    "reference_product": get_rp_text(
-                        ecospold.activityDataset.flowData.intermediateExchanges
-                    ),
-                    "geography": ecospold.activityDataset.activityDescription.geography[
-                        0
-                    ].shortNames[0],
+        fingerprint_path = (
+            self.storage.dir / f"local-mapping-{version}-{system_model}.json"
+        )
+        previous = {}
+        if incremental and fingerprint_path.is_file():
+            with open(fingerprint_path, encoding="utf-8") as f:
+                previous = json.load(f)["files"]
+
+        fingerprints, jobs = {}, []
+        for file_path in file_paths:
+            stat = file_path.stat()
+            old = previous.get(file_path.name)
+            if old and (old["size"], old["mtime"]) == (stat.st_size, stat.st_mtime_ns):
+                fingerprints[file_path.name] = old
+                yield old["record"]
+            else:
+                jobs.append((file_path, old, incremental))
+
+        with ExitStack() as stack:
+            if max_workers == 1 or len(jobs) < 2:
+                results = map(_fingerprint_record, jobs)
+            else:
+                executor = stack.enter_context(
+                    ProcessPoolExecutor(max_workers=max_workers)
+                )
+                results = executor.map(_fingerprint_record, jobs, chunksize=chunksize)
+            for (file_path, _, _), (checksum, record) in zip(
+                jobs, tqdm(results, total=len(jobs))
+            ):
+                stat = file_path.stat()
+                fingerprints[file_path.name] = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime_ns,
+                    "crc32": checksum,
+                    "record": record,
                 }
+                yield record
+
+        if incremental:
+            _write_json({"files": fingerprints}, fingerprint_path)
+
+    def create_local_mapping(
+        self,
+        version: str,
+        system_model: str,
+        max_workers: Optional[int] = None,
+        incremental: Optional[bool] = True,
+    ) -> List[dict]:
+        return list(
+            self.iter_local_mapping(
+                version=version,
+                system_model=system_model,
+                max_workers=max_workers,
+                incremental=incremental,
             )
+        )
 
-        return local_data
+    def add_mapping(
+        self,
+        data: List[dict],
+        version: str,
+        system_model: str,
+        replace: Optional[bool] = False,
+    ) -> Path:
+        """Add the mapping `data` for one release to the package data.
 
-    def add_mapping(self, data: List[dict], version: str, system_model: str) -> Path:
-        zf = zipfile.ZipFile(DATA_DIR / "mappings.zip")
+        Each release is stored as its own JSON and columnar files in the
+        `mappings` data directory, next to a small `catalogue.json`, so only
+        the new data is written. Mappings in this directory take precedence
+        over those in `mappings.zip`, which is never modified.
 
-        with tempfile.TemporaryDirectory() as td:
-            zf.extractall(path=td)
-            metadata = json.load(open(Path(td) / "catalogue.json"))
-            assert not any(
-                obj["version"] == version and obj["system_model"] == system_model
-                for obj in metadata
-            )
-            filename = f"{version}_{system_model}.json"
-            metadata.append(
-                {
-                    "filename": filename,
-                    "version": version,
-                    "system_model": system_model,
-                }
-            )
+        Raises `ValueError` if the release already has a mapping, unless
+        `replace`.
 
-            with open(Path(td) / "catalogue.json", "w") as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
-            with open(Path(td) / filename, "w") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+        Returns the path of the catalogue file."""
+        directory = DATA_DIR / "mappings"
+        directory.mkdir(exist_ok=True)
+        catalogue_path = directory / "catalogue.json"
+        metadata = []
+        if catalogue_path.is_file():
+            with open(catalogue_path, encoding="utf-8") as f:
+                metadata = json.load(f)
 
-            shutil.copyfile(DATA_DIR / "mappings.zip", DATA_DIR / "mappings.backup.zip")
-            shutil.make_archive(DATA_DIR / "mappings", "zip", td)
+        existing = {(obj["version"], obj["system_model"]) for obj in metadata}
+        if (DATA_DIR / "mappings.zip").is_file():
+            with zipfile.ZipFile(DATA_DIR / "mappings.zip") as zf:
+                existing.update(
+                    (obj["version"], obj["system_model"])
+                    for obj in json.load(zf.open("catalogue.json"))
+                )
+        if (version, system_model) in existing and not replace:
+            ERROR = f"""Mapping for {version} + {system_model} already exists.
+    Use `replace=True` to overwrite it."""
+            raise ValueError(ERROR)
 
-            with zipfile.ZipFile(
-                DATA_DIR / "mappings.zip", "w", zipfile.ZIP_LZMA
-            ) as archive:
-                for file_path in Path(td).iterdir():
-                    if not file_path.is_file():
-                        continue
-                    archive.write(file_path, arcname=file_path.name)
+        entry = {
+            "filename": f"{version}_{system_model}.json",
+            "columnar": f"{version}_{system_model}.eicol",
+            "version": version,
+            "system_model": system_model,
+        }
+        # Both files are written in full before either replaces an existing
+        # file, and are only registered in the catalogue afterwards
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=directory))
+        try:
+            write_mapping_table(data, staging / entry["columnar"])
+            _write_json(data, staging / entry["filename"], indent=2)
+            for name in (entry["columnar"], entry["filename"]):
+                os.replace(staging / name, directory / name)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        metadata = [
+            obj
+            for obj in metadata
+            if (obj["version"], obj["system_model"]) != (version, system_model)
+        ] + [entry]
+        _write_json(metadata, catalogue_path, indent=2)
 
-        return DATA_DIR / "mappings.zip"
+        for cached in (
+            get_cached_mapping,
+            get_field_values,
+            get_mapping_index,
+            get_search_index,
+            get_version_linkage,
+        ):
+            cached.cache_clear()
+        return catalogue_path
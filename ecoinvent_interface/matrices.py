@@ -0,0 +1,151 @@
+import csv
+import json
+from array import array
+from pathlib import Path
+from typing import Tuple, Union
+
+import numpy as np
+
+from .columnar import MappingTable, open_table, write_table
+from .storage import atomic_directory
+
+MATRICES_FORMAT = 1
+# Matrix name to (filename, row index, column index)
+MATRICES = {
+    "A": ("A_public.csv", "ie", "ie"),
+    "B": ("B_public.csv", "ee", "ie"),
+    "C": ("C.csv", "LCIA", "ee"),
+}
+# Index name to filename; intermediate exchanges, elementary exchanges, and
+# impact categories
+INDEXES = {
+    "ie": "ie_index.csv",
+    "ee": "ee_index.csv",
+    "LCIA": "LCIA_index.csv",
+}
+
+
+def _find(directory: Path, filename: str) -> Union[Path, None]:
+    # Archives can have a top-level directory
+    return next(iter(sorted(directory.rglob(filename))), None)
+
+
+def _read_index(filepath: Path) -> list:
+    with open(filepath, encoding="utf-8-sig", newline="") as f:
+        records = list(csv.DictReader(f, delimiter=";"))
+    for obj in records:
+        obj["index"] = int(obj["index"])
+    records.sort(key=lambda obj: obj["index"])
+    if [obj["index"] for obj in records] != list(range(len(records))):
+        raise ValueError(f"Index values in {filepath.name} aren't 0 to n - 1")
+    return records
+
+
+def _read_coo(filepath: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rows, cols, data = array("q"), array("q"), array("d")
+    with open(filepath, encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f, delimiter=";")
+        next(reader)
+        for row, col, value in reader:
+            rows.append(int(row))
+            cols.append(int(col))
+            data.append(float(value))
+    return (
+        np.frombuffer(rows, dtype=np.int64).astype(np.int32),
+        np.frombuffer(cols, dtype=np.int64).astype(np.int32),
+        np.frombuffer(data, dtype=np.float64),
+    )
+
+
+def convert_matrix_export(source: Path, target: Path) -> Path:
+    """Convert an extracted universal matrix export release to binary arrays.
+
+    Each matrix in `MATRICES` is saved as `.npy` COO arrays (`rows` and
+    `cols` as `int32`, `data` as `float64`), and each index in `INDEXES` as a
+    columnar table (see `columnar.write_table`) with one row per matrix
+    row or column. Matrices or indices missing from `source` are skipped.
+
+    Returns `target`."""
+    source, target = Path(source), Path(target)
+    metadata = {"format": MATRICES_FORMAT, "matrices": {}, "indexes": {}}
+    with atomic_directory(target) as staging:
+        for name, filename in INDEXES.items():
+            filepath = _find(source, filename)
+            if filepath is None:
+                continue
+            records = _read_index(filepath)
+            columns = list(records[0]) if records else ["index"]
+            write_table(records, columns, staging / f"{name}.eicol")
+            metadata["indexes"][name] = {"filename": filename, "size": len(records)}
+
+        for name, (filename, row_index, col_index) in MATRICES.items():
+            filepath = _find(source, filename)
+            if filepath is None:
+                continue
+            rows, cols, data = _read_coo(filepath)
+            shape = [
+                metadata["indexes"].get(row_index, {}).get("size"),
+                metadata["indexes"].get(col_index, {}).get("size"),
+            ]
+            # Without an index, the largest position gives the size
+            if shape[0] is None:
+                shape[0] = int(rows.max()) + 1 if len(rows) else 0
+            if shape[1] is None:
+                shape[1] = int(cols.max()) + 1 if len(cols) else 0
+            for suffix, values in (("rows", rows), ("cols", cols), ("data", data)):
+                np.save(staging / f"{name}.{suffix}.npy", values)
+            metadata["matrices"][name] = {
+                "filename": filename,
+                "shape": shape,
+                "nnz": len(data),
+                "rows": row_index,
+                "cols": col_index,
+            }
+
+        with open(staging / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+    return target
+
+
+class MatrixExport:
+    """Memory-mapped access to a converted universal matrix export.
+
+    Arrays are opened with `numpy.load(mmap_mode="r")`, so opening is
+    instant and the operating system shares the data between processes."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "metadata.json", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("format") != MATRICES_FORMAT:
+            raise ValueError(f"Unknown matrix cache format in {self.directory}")
+
+    @property
+    def matrices(self) -> list:
+        return list(self.metadata["matrices"])
+
+    def shape(self, name: str) -> Tuple[int, int]:
+        return tuple(self.metadata["matrices"][name]["shape"])
+
+    def coo(self, name: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """`(rows, cols, data)` arrays of matrix `name`, e.g. `"A"`"""
+        if name not in self.metadata["matrices"]:
+            raise KeyError(f"Matrix {name} not in {self.matrices}")
+        return tuple(
+            np.load(self.directory / f"{name}.{suffix}.npy", mmap_mode="r")
+            for suffix in ("rows", "cols", "data")
+        )
+
+    def sparse(self, name: str):
+        """Matrix `name` as a `scipy.sparse.coo_matrix`; needs `scipy`"""
+        from scipy import sparse
+
+        rows, cols, data = self.coo(name)
+        return sparse.coo_matrix((data, (rows, cols)), shape=self.shape(name))
+
+    def index(self, name: str) -> MappingTable:
+        """Rows of index `name` (`ie`, `ee`, or `LCIA`); row `i` describes
+        matrix position `i`"""
+        if name not in self.metadata["indexes"]:
+            raise KeyError(f"Index {name} not in {list(self.metadata['indexes'])}")
+        return MappingTable.from_columnar(open_table(self.directory / f"{name}.eicol"))
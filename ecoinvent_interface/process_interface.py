@@ -2,40 +2,340 @@ import io
 import json
 import logging
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple, Union
+from time import time
+from typing import Iterable, List, Optional, Tuple, Union
 from urllib.parse import parse_qsl, urlparse
 
 import requests
 
 from . import __version__
+from .columnar import MappingTable, open_table, table_column, write_table
 from .core import SYSTEM_MODELS, InterfaceBase, fresh_login
+from .search import SearchIndex
+from .storage import ResponseCache, base_dir
+from .string_distance import top_k_matches
 
 DATA_DIR = Path(__file__).parent.resolve() / "data"
+mapping_cache_dir = base_dir / "mappings"
 
 logger = logging.getLogger("ecoinvent_interface")
 
 
+def _load_mapping(meta: dict, directory: Path) -> MappingTable:
+    if meta.get("columnar"):
+        return MappingTable.from_columnar(open_table(directory / meta["columnar"]))
+    with open(directory / meta["filename"], encoding="utf-8") as f:
+        return MappingTable.from_records(json.load(f))
+
+
 @lru_cache(maxsize=4)
-def get_cached_mapping(version: str, system_model: str) -> dict:
-    zf = zipfile.ZipFile(DATA_DIR / "mappings.zip")
-    try:
+def get_cached_mapping(version: str, system_model: str) -> MappingTable:
+    # Mappings added with `ProcessMapping.add_mapping` take precedence over
+    # the bundled archive
+    catalogue_path = DATA_DIR / "mappings" / "catalogue.json"
+    if catalogue_path.is_file():
+        with open(catalogue_path, encoding="utf-8") as f:
+            for meta in json.load(f):
+                if (meta["version"], meta["system_model"]) == (version, system_model):
+                    return _load_mapping(meta, catalogue_path.parent)
+
+    with zipfile.ZipFile(DATA_DIR / "mappings.zip") as zf:
         catalogue = {
             (o["version"], o["system_model"]): o
             for o in json.load(
                 io.TextIOWrapper(zf.open("catalogue.json"), encoding="utf-8")
             )
         }
-        return json.load(
-            io.TextIOWrapper(
-                zf.open(catalogue[(version, system_model)]["filename"]),
-                encoding="utf-8",
-            )
+        if (version, system_model) not in catalogue:
+            raise KeyError(f"Combination {version} + {system_model} not yet cached")
+        return _bundled_mapping(zf, catalogue[(version, system_model)]["filename"])
+
+
+def _bundled_mapping(zf: zipfile.ZipFile, member: str) -> MappingTable:
+    """Mapping `member` of the bundled archive, converted to a columnar file
+    in `mapping_cache_dir` on first use, so that later loads, in any process,
+    memory map it instead of parsing JSON. Files are named by the CRC of the
+    archive member, so a new archive is converted again."""
+    info = zf.getinfo(member)
+    filepath = mapping_cache_dir / f"{Path(member).stem}-{info.CRC:08x}.eicol"
+    if filepath.is_file():
+        return MappingTable.from_columnar(open_table(filepath))
+
+    records = json.load(io.TextIOWrapper(zf.open(member), encoding="utf-8"))
+    columns = list(dict.fromkeys(key for obj in records for key in obj))
+    try:
+        mapping_cache_dir.mkdir(parents=True, exist_ok=True)
+        write_table(records, columns, filepath)
+    except OSError as error:
+        message = f"""Can't write columnar mapping cache.
+    Filepath: {filepath}
+    Error: {error}
+        """
+        logger.debug(message)
+        return MappingTable.from_records(records, columns)
+    return MappingTable.from_columnar(open_table(filepath))
+
+
+def filename_product_id(filename: str) -> Optional[str]:
+    """Product UUID of a dataset filename, which is
+    `{activity UUID}_{product UUID}.spold`; `None` for other filenames"""
+    stem = filename.rsplit(".", 1)[0] if filename else ""
+    return stem.split("_")[1] if stem.count("_") == 1 else None
+
+
+class MappingIndex:
+    """Lookup tables over the cached mapping data of one release.
+
+    * `by_filename`: filename to dataset id
+    * `by_key`: `(activity_name, reference_product, geography)` to row numbers
+    * `by_product`: `(product UUID, geography)` to row numbers, see
+      `filename_product_id`
+    * `inverted`: for each of these fields, field value to row numbers
+
+    Row numbers refer to positions in `data`, and are sorted.
+
+    """
+
+    FIELDS = ("activity_name", "reference_product", "geography")
+
+    def __init__(self, data: Union[list, MappingTable]):
+        self.data = data
+        self.by_filename = dict(
+            zip(table_column(data, "filename"), table_column(data, "index"))
         )
-    except KeyError:
-        raise KeyError(f"Combination {version} + {system_model} not yet cached")
+        self.by_key, self.by_product = {}, {}
+        self.inverted = {field: {} for field in self.FIELDS}
+        for row, (filename, geography) in enumerate(
+            zip(table_column(data, "filename"), table_column(data, "geography"))
+        ):
+            product = filename_product_id(filename)
+            if product:
+                self.by_product.setdefault((product, geography), []).append(row)
+        columns = [table_column(data, field) for field in self.FIELDS]
+        for row, key in enumerate(zip(*columns)):
+            self.by_key.setdefault(key, []).append(row)
+            for field, value in zip(self.FIELDS, key):
+                self.inverted[field].setdefault(value, []).append(row)
+
+    def filter(self, attributes: dict) -> list:
+        """Return mapping records whose values match all `attributes`.
+
+        Cost is proportional to the number of records matching the most
+        selective attribute, not to the size of the mapping."""
+        if not attributes:
+            return list(self.data)
+        if set(attributes) == set(self.FIELDS):
+            rows = self.by_key.get(tuple(attributes[f] for f in self.FIELDS), [])
+            return [self.data[row] for row in rows]
+
+        postings = []
+        for key, value in attributes.items():
+            if key not in self.inverted:
+                # Fall back to checking each candidate record
+                continue
+            postings.append(self.inverted[key].get(value, []))
+        if not postings:
+            rows = range(len(self.data))
+        else:
+            rows = min(postings, key=len)
+        return [
+            self.data[row]
+            for row in rows
+            if all(
+                self.data[row].get(key) == value for key, value in attributes.items()
+            )
+        ]
+
+
+@lru_cache(maxsize=4)
+def get_mapping_index(version: str, system_model: str) -> MappingIndex:
+    return MappingIndex(get_cached_mapping(version=version, system_model=system_model))
+
+
+@lru_cache(maxsize=4)
+def get_search_index(version: str, system_model: str) -> SearchIndex:
+    return SearchIndex(get_cached_mapping(version=version, system_model=system_model))
+
+
+@lru_cache(maxsize=4)
+def get_field_values(version: str, system_model: str, field: str) -> Tuple[str, ...]:
+    """Sorted distinct values of `field` (e.g. `activity_name` or `filename`)
+    in the cached mapping data of a release"""
+    values = table_column(get_cached_mapping(version, system_model), field)
+    return tuple(sorted({value for value in values if value is not None}))
+
+
+def match_field(
+    version: str,
+    system_model: str,
+    field: str,
+    query: str,
+    k: Optional[int] = 5,
+    max_distance: Optional[int] = None,
+) -> List[Tuple[int, str]]:
+    """The `k` values of `field` closest to `query`, as `(distance, value)`
+    tuples sorted by distance and value, optionally only within
+    `max_distance`. With `k=None`, all values within `max_distance` are
+    returned.
+
+    Each lookup is one bit-parallel pass over `get_field_values` with
+    `string_distance.top_k_matches`."""
+    return top_k_matches(
+        query,
+        get_field_values(version, system_model, field),
+        k=k,
+        max_distance=max_distance,
+    )
+
+
+LABEL_MAPPING = {
+    "reference product": "reference_product",
+    "name": "activity_name",
+    "location": "geography",
+}
+
+
+def translate_attributes(attributes: dict) -> dict:
+    """Translate attribute labels to mapping field names, dropping unknown keys"""
+    valid_keys = set(LABEL_MAPPING).union(set(LABEL_MAPPING.values()))
+    return {
+        LABEL_MAPPING.get(key, key): value
+        for key, value in attributes.items()
+        if key in valid_keys
+    }
+
+
+def resolve_processes(
+    version: str, system_model: str, queries: Iterable[Union[str, dict]]
+) -> dict:
+    """Resolve many filenames or attribute dictionaries to dataset ids at once.
+
+    Each query is either a filename string, or an `attributes` dictionary as
+    accepted by `EcoinventProcess.select_process`. Identical queries are only
+    looked up once.
+
+    Returns a dictionary with:
+
+    * `ids`: List of dataset ids in the order of `queries`; `None` if not
+      uniquely resolved
+    * `ambiguous`: Dictionary of query position to list of matching dataset ids
+    * `missing`: List of query positions without any match
+
+    """
+    index = get_mapping_index(version=version, system_model=system_model)
+    ids, ambiguous, missing = [], {}, []
+    seen = {}
+
+    for position, query in enumerate(queries):
+        if isinstance(query, str):
+            key = query
+        else:
+            key = tuple(sorted(translate_attributes(query).items()))
+
+        if key not in seen:
+            if isinstance(query, str):
+                found = [index.by_filename[key]] if key in index.by_filename else []
+            else:
+                found = [obj["index"] for obj in index.filter(dict(key))]
+            seen[key] = found
+
+        found = seen[key]
+        if len(found) == 1:
+            ids.append(found[0])
+        else:
+            ids.append(None)
+            if found:
+                ambiguous[position] = found
+            else:
+                missing.append(position)
+
+    return {"ids": ids, "ambiguous": ambiguous, "missing": missing}
+
+
+class VersionLinkage:
+    """Links the datasets of one release to those of another release.
+
+    Dataset filenames are `{activity UUID}_{product UUID}.spold`. Activity
+    UUIDs often change between releases, but product UUIDs recur, so
+    datasets are linked by:
+
+    * `filename`: The same filename
+    * `product`: The only target dataset with the same product UUID and
+      geography, or if there are several (e.g. many activities produce
+      electricity in one country), the only one of these which also has the
+      same `activity_name`
+    * `key`: The only target dataset with the same `(activity_name,
+      reference_product, geography)`
+
+    * `links`: source dataset id to target dataset id
+    * `methods`: source dataset id to `filename`, `product`, or `key`
+    * `unlinked`: sorted list of source dataset ids without a target
+
+    """
+
+    def __init__(self, source: MappingIndex, target: MappingIndex):
+        target_ids = table_column(target.data, "index")
+        target_names = table_column(target.data, "activity_name")
+        source_keys = zip(*[table_column(source.data, f) for f in source.FIELDS])
+        self.links, self.methods, self.unlinked = {}, {}, []
+
+        for filename, key, index in zip(
+            table_column(source.data, "filename"),
+            source_keys,
+            table_column(source.data, "index"),
+        ):
+            activity_name, _, geography = key
+            rows = target.by_product.get((filename_product_id(filename), geography))
+            if rows and len(rows) > 1:
+                rows = [row for row in rows if target_names[row] == activity_name]
+            if filename in target.by_filename:
+                self.links[index] = target.by_filename[filename]
+                self.methods[index] = "filename"
+            elif rows and len(rows) == 1:
+                self.links[index] = target_ids[rows[0]]
+                self.methods[index] = "product"
+            elif len(target.by_key.get(key, [])) == 1:
+                self.links[index] = target_ids[target.by_key[key][0]]
+                self.methods[index] = "key"
+            else:
+                self.unlinked.append(index)
+        self.unlinked.sort()
+
+    def link(self, dataset_ids: Iterable[int]) -> list:
+        """Target dataset ids for `dataset_ids`; `None` if not linked"""
+        links = self.links
+        return [links.get(index) for index in dataset_ids]
+
+
+@lru_cache(maxsize=4)
+def get_version_linkage(
+    source_version: str, target_version: str, system_model: str
+) -> VersionLinkage:
+    return VersionLinkage(
+        get_mapping_index(version=source_version, system_model=system_model),
+        get_mapping_index(version=target_version, system_model=system_model),
+    )
+
+
+def link_datasets(
+    source_version: str,
+    target_version: str,
+    system_model: str,
+    dataset_ids: Iterable[int],
+) -> list:
+    """Find the dataset ids in `target_version` for `dataset_ids` of
+    `source_version`; `None` if a dataset can't be linked.
+
+    See `VersionLinkage` for how datasets are linked."""
+    return get_version_linkage(
+        source_version=source_version,
+        target_version=target_version,
+        system_model=system_model,
+    ).link(dataset_ids)
 
 
 class MissingProcess(BaseException):
@@ -70,11 +370,40 @@ class ProcessFileType(Enum):
 ZIPPED_FILE_TYPES = (ProcessFileType.lci, ProcessFileType.lcia, ProcessFileType.upr)
 
 
+def process_file_stem(
+    version: str, system_model: str, file_type: ProcessFileType, dataset_id: str
+) -> str:
+    return f"ecoinvent-{version}-{system_model}-{file_type.name}-{dataset_id}"
+
+
 def as_tuple(version_string: str) -> Tuple[int, int]:
     return tuple([int(x) for x in version_string.split(".")])
 
 
 class EcoinventProcess(InterfaceBase):
+    def __init__(
+        self,
+        *args,
+        cache_responses: Optional[bool] = True,
+        response_ttl: Optional[float] = None,
+        response_cache_size: Optional[int] = 100 * 1024 * 1024,
+        **kwargs,
+    ):
+        """Responses of the JSON API for a given dataset are cached in the
+        `responses` subdirectory of the cache, unless `cache_responses` is
+        false. See `ResponseCache` for `response_ttl` (in seconds) and
+        `response_cache_size` (in bytes)."""
+        super().__init__(*args, **kwargs)
+        self.response_cache = (
+            ResponseCache(
+                self.storage.dir / "responses",
+                ttl=response_ttl,
+                max_size=response_cache_size,
+            )
+            if cache_responses
+            else None
+        )
+
     def set_release(self, version: str, system_model: str) -> None:
         if version not in self.list_versions():
             raise ValueError(f"Given version {version} not found")
@@ -89,6 +418,36 @@ class EcoinventProcess(InterfaceBase):
             )
         self.system_model = system_model
 
+    def resolve_processes(self, queries: Iterable[Union[str, dict]]) -> dict:
+        """Resolve many filenames or attribute dictionaries to dataset ids.
+
+        Doesn't change the selected process. See `resolve_processes` for the
+        format of the result."""
+        if not hasattr(self, "system_model"):
+            raise ValueError("Must call `.set_release()` first")
+        return resolve_processes(
+            version=self.version, system_model=self.system_model, queries=queries
+        )
+
+    def search_processes(
+        self, query: Union[str, dict], limit: Optional[int] = 10
+    ) -> list:
+        """Fuzzy search for processes in the mapping data.
+
+        `query` is either text to compare with activity names and reference
+        products, or an `attributes` dictionary as accepted by
+        `select_process`.
+
+        Returns up to `limit` mapping records, best first, with an added
+        `score` between 0 and 1."""
+        if not hasattr(self, "system_model"):
+            raise ValueError("Must call `.set_release()` first")
+        if not isinstance(query, str):
+            query = translate_attributes(query)
+        return get_search_index(
+            version=self.version, system_model=self.system_model
+        ).search(query, limit=limit)
+
     def select_process(
         self,
         attributes: Optional[dict] = None,
@@ -101,39 +460,26 @@ class EcoinventProcess(InterfaceBase):
         if dataset_id:
             self.dataset_id = dataset_id
         elif filename:
-            mapping = {
-                obj["filename"]: obj["index"]
-                for obj in get_cached_mapping(
-                    version=self.version, system_model=self.system_model
-                )
-            }
+            index = get_mapping_index(
+                version=self.version, system_model=self.system_model
+            )
             try:
-                self.dataset_id = mapping[filename]
+                self.dataset_id = index.by_filename[filename]
             except KeyError:
                 raise KeyError(f"Can't find filename `{filename}` in mapping data")
         elif attributes:
-            label_mapping = {
-                "reference product": "reference_product",
-                "name": "activity_name",
-                "location": "geography",
-            }
-            valid_keys = set(label_mapping).union(set(label_mapping.values()))
-            mapped_attributes = {
-                label_mapping.get(key, key): value
-                for key, value in attributes.items()
-                if key in valid_keys
-            }
-            possibles = [
-                obj
-                for obj in get_cached_mapping(
-                    version=self.version, system_model=self.system_model
+            possibles = get_mapping_index(
+                version=self.version, system_model=self.system_model
+            ).filter(translate_attributes(attributes))
+            if not possibles:
+                closest = "\n\t".join(
+                    str({key: obj.get(key) for key in MappingIndex.FIELDS})
+                    for obj in self.search_processes(attributes, limit=3)
                 )
-                if all(
-                    obj.get(key) == value for key, value in mapped_attributes.items()
+                raise KeyError(
+                    "Can't find a dataset for these attributes. Closest matches:\n\t"
+                    + closest
                 )
-            ]
-            if not possibles:
-                raise KeyError("Can't find a dataset for these attributes")
             elif len(possibles) > 1:
                 raise KeyError(
                     "These attributes don't uniquely identify one dataset - "
@@ -147,9 +493,45 @@ class EcoinventProcess(InterfaceBase):
                 + "choose a process."
             )
 
-    @selected_process
+    def _dataset_params(
+        self,
+        dataset_id: Union[int, str],
+        version: Optional[str] = None,
+        system_model: Optional[str] = None,
+    ) -> dict:
+        """Request parameters for one dataset; `version` and `system_model`
+        default to the release chosen with `set_release`"""
+        if version is None or system_model is None:
+            if not hasattr(self, "system_model"):
+                raise ValueError(
+                    "Must give `version` and `system_model` or call `.set_release()`"
+                )
+            version = version or self.version
+            system_model = system_model or self.system_model
+        return {
+            "dataset_id": str(dataset_id),
+            "version": version,
+            "system_model": SYSTEM_MODELS.get(system_model, system_model),
+        }
+
+    def _json_request(
+        self, url: str, params: dict, use_cache: Optional[bool] = True
+    ) -> Union[dict, list]:
+        if not use_cache or self.response_cache is None:
+            return self._get_json(url, params).json()
+
+        # Responses depend on the license, so include the user
+        key = ResponseCache.make_key(self.username, url, params)
+        data = self.response_cache.get(key)
+        if data is None:
+            response = self._get_json(url, params)
+            data = response.json()
+            if response.ok:
+                self.response_cache.set(key, data)
+        return data
+
     @fresh_login
-    def _json_request(self, url: str) -> Union[dict, list]:
+    def _get_json(self, url: str, params: dict) -> requests.Response:
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "ecoinvent-api-client-library": "ecoinvent_interface",
@@ -164,27 +546,180 @@ class EcoinventProcess(InterfaceBase):
     User: {self.username}
         """
         logger.debug(message)
-        return requests.get(
-            url,
-            params={
-                "dataset_id": self.dataset_id,
-                "version": self.version,
-                "system_model": self.system_model,
-            },
-            headers=headers,
-            timeout=20,
-        ).json()
+        return self.session.get(url, params=params, headers=headers, timeout=20)
+
+    @selected_process
+    def get_basic_info(self, use_cache: Optional[bool] = True) -> dict:
+        return self.get_dataset_info(self.dataset_id, use_cache=use_cache)
+
+    @selected_process
+    def get_documentation(self, use_cache: Optional[bool] = True) -> dict:
+        return self.get_dataset_documentation(self.dataset_id, use_cache=use_cache)
+
+    def get_dataset_info(
+        self,
+        dataset_id: Union[int, str],
+        version: Optional[str] = None,
+        system_model: Optional[str] = None,
+        use_cache: Optional[bool] = True,
+    ) -> dict:
+        """Like `get_basic_info`, but for the given dataset instead of the
+        selected process. Doesn't change the instance, so can be called from
+        many threads at once."""
+        return self._json_request(
+            self.urls["api"] + "spold",
+            params=self._dataset_params(dataset_id, version, system_model),
+            use_cache=use_cache,
+        )
+
+    def get_dataset_info_response(
+        self,
+        dataset_id: Union[int, str],
+        version: Optional[str] = None,
+        system_model: Optional[str] = None,
+    ) -> requests.Response:
+        """Uncached response of `get_dataset_info`, for callers which need
+        the HTTP status"""
+        return self._get_json(
+            self.urls["api"] + "spold",
+            params=self._dataset_params(dataset_id, version, system_model),
+        )
+
+    def get_dataset_documentation(
+        self,
+        dataset_id: Union[int, str],
+        version: Optional[str] = None,
+        system_model: Optional[str] = None,
+        use_cache: Optional[bool] = True,
+    ) -> dict:
+        """Like `get_documentation`, but for the given dataset"""
+        return self._json_request(
+            self.urls["api"] + "spold/documentation",
+            params=self._dataset_params(dataset_id, version, system_model),
+            use_cache=use_cache,
+        )
+
+    @selected_process
+    def get_file(
+        self,
+        file_type: ProcessFileType,
+        directory: Path,
+        use_cache: Optional[bool] = True,
+    ) -> Path:
+        return self.get_dataset_file(
+            dataset_id=self.dataset_id,
+            file_type=file_type,
+            directory=directory,
+            use_cache=use_cache,
+        )
 
-    def get_basic_info(self) -> dict:
-        return self._json_request(self.urls["api"] + "spold")
+    def get_files(
+        self,
+        dataset_ids: Iterable[str],
+        file_types: Iterable[ProcessFileType],
+        directory: Path,
+        max_workers: Optional[int] = 4,
+        use_cache: Optional[bool] = True,
+    ) -> dict:
+        """Download files of each of `file_types` for many datasets in the
+        current release, using a pool of `max_workers` threads.
+
+        Files already in `directory` are skipped, and each file is only
+        downloaded once, even if a dataset id is given more than once. Errors
+        for one file don't stop the other downloads.
+
+        Returns a dictionary with:
+
+        * `results`: List of dictionaries with `dataset_id`, `file_type`,
+          `status` (`downloaded`, `skipped`, or `error`), and either `path`
+          or `error`, in the order of `dataset_ids` and `file_types`
+        * `seconds`, `bytes`, `files_per_second`, and `bytes_per_second` for
+          the downloaded files, each counted once
 
-    def get_documentation(self) -> dict:
-        return self._json_request(self.urls["api"] + "spold/documentation")
+        """
+        if not hasattr(self, "system_model"):
+            raise ValueError("Must call `.set_release()` first")
+        directory = Path(directory)
+        version, system_model = self.version, self.system_model
+        existing = {filepath.stem: filepath for filepath in directory.iterdir()}
+        file_types = list(file_types)
+        jobs = [
+            (str(dataset_id), file_type)
+            for dataset_id in dataset_ids
+            for file_type in file_types
+        ]
+        # Concurrent downloads of the same file would overwrite each other
+        unique = list(dict.fromkeys(jobs))
+
+        def download(job: tuple) -> dict:
+            dataset_id, file_type = job
+            result = {"dataset_id": dataset_id, "file_type": file_type}
+            stem = process_file_stem(version, system_model, file_type, dataset_id)
+            if stem in existing:
+                return dict(result, status="skipped", path=existing[stem])
+            try:
+                filepath = self.get_dataset_file(
+                    dataset_id=dataset_id,
+                    file_type=file_type,
+                    directory=directory,
+                    version=version,
+                    system_model=system_model,
+                    use_cache=use_cache,
+                )
+            except Exception as error:
+                # Don't leave partial downloads which would be skipped next time
+                for filepath in directory.glob(f"{stem}.*"):
+                    filepath.unlink()
+                return dict(result, status="error", error=error)
+            return dict(result, status="downloaded", path=filepath)
+
+        start = time()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            done = dict(zip(unique, executor.map(download, unique)))
+        seconds = time() - start
+        results = [dict(done[job]) for job in jobs]
+
+        downloaded = [obj for obj in done.values() if obj["status"] == "downloaded"]
+        total = sum(obj["path"].stat().st_size for obj in downloaded)
+        message = f"""Downloaded process files.
+    Downloaded: {len(downloaded)}
+    Skipped: {sum(1 for obj in done.values() if obj["status"] == "skipped")}
+    Errors: {sum(1 for obj in done.values() if obj["status"] == "error")}
+    Seconds: {seconds:.1f}
+        """
+        logger.info(message)
+        return {
+            "results": results,
+            "seconds": seconds,
+            "bytes": total,
+            "files_per_second": len(downloaded) / seconds if seconds else 0,
+            "bytes_per_second": total / seconds if seconds else 0,
+        }
 
-    def get_file(self, file_type: ProcessFileType, directory: Path) -> Path:
+    @fresh_login
+    def get_dataset_file(
+        self,
+        dataset_id: Union[int, str],
+        file_type: ProcessFileType,
+        directory: Path,
+        version: Optional[str] = None,
+        system_model: Optional[str] = None,
+        use_cache: Optional[bool] = True,
+    ) -> Path:
+        """Like `get_file`, but for the given dataset"""
+        params = self._dataset_params(dataset_id, version, system_model)
+        dataset_id, version, system_model = (
+            params["dataset_id"],
+            params["version"],
+            params["system_model"],
+        )
         files = {
             obj.pop("name"): obj
-            for obj in self._json_request(self.urls["api"] + "spold/export_file_list")
+            for obj in self._json_request(
+                self.urls["api"] + "spold/export_file_list",
+                params=params,
+                use_cache=use_cache,
+            )
         }
         try:
             meta = files[file_type.value]
@@ -204,12 +739,12 @@ class EcoinventProcess(InterfaceBase):
         url, params = split_url(meta["url"])
         suffix = meta["type"].lower()
         filename = (
-            f"ecoinvent-{self.version}-{self.system_model}-{file_type.name}-"
-            + f"{self.dataset_id}.{suffix}"
+            process_file_stem(version, system_model, file_type, dataset_id)
+            + f".{suffix}"
         )
 
         if file_type == ProcessFileType.undefined:
-            s3_link = requests.get(
+            s3_link = self.session.get(
                 self.urls["api"][:-1] + url, params=params, headers=headers, timeout=20
             ).json()["download_url"]
             self._streaming_download(
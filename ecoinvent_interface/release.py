@@ -5,13 +5,19 @@ import zipfile
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, List, Optional
 
 import py7zr
 
 from .core import SYSTEM_MODELS, InterfaceBase, format_dict
+from .cumulative import CumulativeResults, convert_cumulative_workbook
+from .dataset_index import DatasetIndex, build_dataset_index
+from .datasets import iter_datasets
+from .exchanges import ExchangeArrays, convert_exchanges
+from .lcia import LCIAImplementation, convert_lcia_workbook
+from .matrices import MatrixExport, convert_matrix_export
 from .spold_versions import fix_version_meta, fix_version_upr, major_minor_from_string
-from .string_distance import damerau_levenshtein
+from .string_distance import closest_match
 
 logger = logging.getLogger("ecoinvent_interface")
 
@@ -34,6 +40,9 @@ class ReleaseType(Enum):
         return CORRECTIONS.get(guess, guess)
 
 
+SPOLD_FILES = (ReleaseType.ecospold, ReleaseType.lci, ReleaseType.lcia)
+
+
 class EcoinventRelease(InterfaceBase):
     def list_report_files(self) -> dict:
         return {obj["name"]: format_dict(obj) for obj in self._get_all_reports()}
@@ -109,20 +118,16 @@ class EcoinventRelease(InterfaceBase):
             # follows our patterns. But these exceptions are unpredictable, it's
             # just easier to find the closest match and log the correction
             # than build a catalogue of exceptions.
-            possible = sorted(
-                [
-                    (damerau_levenshtein(filename, maybe), maybe)
-                    for maybe in available_files
-                ]
-            )[0]
-            if possible[0] <= 3:
+            possible = closest_match(filename, available_files, max_distance=3)
+            if possible is not None:
                 logger.info(
                     f"Using close match {possible[1]} for predicted filename {filename}"
                 )
                 filename = possible[1]
             else:
-                ERROR = """"Can't find predicted filename {filename}.
-    Closest match is {possible[1]}.
+                possible = closest_match(filename, available_files)
+                ERROR = f"""Can't find predicted filename {filename}.
+    Closest match is {possible[1] if possible else None}.
     Filenames for this version:""" + "\n\t".join(
                     available_files
                 )
@@ -142,28 +147,265 @@ class EcoinventRelease(InterfaceBase):
             kind="release",
         )
 
-        SPOLD_FILES = (ReleaseType.ecospold, ReleaseType.lci, ReleaseType.lcia)
         if fix_version and release_type in SPOLD_FILES and not cached:
             major, minor = major_minor_from_string(version)
-            if (result_path / "datasets").is_dir():
-                logger.info("Fixing versions in unit process datasets")
-                for filepath in (result_path / "datasets").iterdir():
-                    if not filepath.suffix.lower() == ".spold":
-                        continue
-                    fix_version_upr(
-                        filepath=filepath, major_version=major, minor_version=minor
-                    )
-            if (result_path / "MasterData").is_dir():
-                logger.info("Fixing versions in master data")
-                for filepath in (result_path / "MasterData").iterdir():
-                    if not filepath.suffix.lower() == ".xml":
-                        continue
-                    fix_version_meta(
-                        filepath=filepath, major_version=major, minor_version=minor
-                    )
+            fixed = fix_release_versions(
+                dirpath=result_path, major_version=major, minor_version=minor
+            )
+            if fixed and "manifest" in self.storage.catalogue[filename]:
+                self.storage.refresh_manifest(
+                    filename, fixed, fixed_version=[major, minor]
+                )
 
         return result_path
 
+    def iter_datasets(
+        self,
+        version: str,
+        system_model: str,
+        release_type: ReleaseType = ReleaseType.ecospold,
+        fields: Optional[Iterable[str]] = None,
+        extract: Optional[bool] = True,
+        max_workers: Optional[int] = None,
+        chunksize: Optional[int] = 64,
+    ) -> Iterator[dict]:
+        """Stream lightweight records of the datasets of an ecospold release.
+
+        The release is downloaded if needed, as by `get_release`; with
+        `extract=False` the datasets are read directly from the archive. See
+        `datasets.iter_datasets` for `fields`, `max_workers`, and `chunksize`,
+        and `spold.parse_dataset` for the record fields."""
+        if release_type not in SPOLD_FILES:
+            raise ValueError("`release_type` must be an ecospold release")
+        path = self.get_release(
+            version=version,
+            system_model=system_model,
+            release_type=release_type,
+            extract=extract,
+        )
+        return iter_datasets(
+            path, fields=fields, max_workers=max_workers, chunksize=chunksize
+        )
+
+    def get_dataset_index(
+        self,
+        version: str,
+        system_model: str,
+        release_type: ReleaseType = ReleaseType.ecospold,
+        force_redownload: Optional[bool] = False,
+        max_workers: Optional[int] = None,
+    ) -> DatasetIndex:
+        """Get an SQLite index of the datasets and MasterData of an ecospold
+        release, built once with `build_dataset_index`."""
+        if release_type not in SPOLD_FILES:
+            raise ValueError("`release_type` must be an ecospold release")
+        path = self.get_release(
+            version=version,
+            system_model=system_model,
+            release_type=release_type,
+            force_redownload=force_redownload,
+        )
+        filepath = self._derived_cache(
+            path,
+            "dataset_index",
+            ".sqlite",
+            lambda target: build_dataset_index(path, target, max_workers=max_workers),
+        )
+        return DatasetIndex(filepath)
+
+    def get_exchange_arrays(
+        self,
+        version: str,
+        system_model: str,
+        release_type: ReleaseType = ReleaseType.ecospold,
+        force_redownload: Optional[bool] = False,
+        max_workers: Optional[int] = None,
+    ) -> ExchangeArrays:
+        """Get the exchanges of an ecospold or LCI release as memory-mapped
+        arrays, converted once with `convert_exchanges`."""
+        if release_type not in (ReleaseType.ecospold, ReleaseType.lci):
+            raise ValueError("`release_type` must be an ecospold or LCI release")
+        path = self.get_release(
+            version=version,
+            system_model=system_model,
+            release_type=release_type,
+            force_redownload=force_redownload,
+        )
+        directory = self._derived_cache(
+            path,
+            "exchanges",
+            ".exchanges",
+            lambda target: convert_exchanges(path, target, max_workers=max_workers),
+        )
+        return ExchangeArrays(directory)
+
+    def _catalogue_key(self, path: Path) -> str:
+        """Catalogue key of the cached archive extracted to `path`"""
+        for key, meta in self.storage.catalogue.items():
+            if meta.get("path") == str(path):
+                return key
+        raise KeyError(f"No catalogue entry for {path}")
+
+    def _derived_cache(
+        self, path: Path, field: str, suffix: str, convert: Callable[[Path], Path]
+    ) -> Path:
+        """Path of a file or directory derived from the cached archive
+        extracted to `path`, e.g. converted arrays or an index.
+
+        It is built with `convert(target)` the first time, stored next to the
+        release as `target` (`path` plus `suffix`), and recorded as `field` of
+        the catalogue entry. Downloading the release again replaces the
+        catalogue entry, so it is then built again."""
+        key = self._catalogue_key(path)
+        meta = self.storage.catalogue[key]
+        if not meta.get(field) or not Path(meta[field]).exists():
+            target = convert(path.with_name(path.name + suffix))
+            self.storage.catalogue[key] = dict(meta, **{field: str(target)})
+            message = f"""Built derived cache:
+    Filename: {key}
+    Field: {field}
+    Path: {target}
+            """
+            logger.debug(message)
+        return Path(self.storage.catalogue[key][field])
+
+    def get_matrix_export(
+        self,
+        version: str,
+        system_model: str,
+        force_redownload: Optional[bool] = False,
+    ) -> MatrixExport:
+        """Get the universal matrix export release as memory-mapped arrays.
+
+        The extracted CSV files are converted once with
+        `convert_matrix_export`."""
+        path = self.get_release(
+            version=version,
+            system_model=system_model,
+            release_type=ReleaseType.matrix,
+            force_redownload=force_redownload,
+        )
+        directory = self._derived_cache(
+            path,
+            "matrices",
+            ".matrices",
+            lambda target: convert_matrix_export(path, target),
+        )
+        return MatrixExport(directory)
+
+    def get_cumulative_results(
+        self,
+        version: str,
+        system_model: str,
+        release_type: ReleaseType = ReleaseType.cumulative_lcia,
+        workbook: Optional[str] = None,
+        force_redownload: Optional[bool] = False,
+    ) -> CumulativeResults:
+        """Get a cumulative LCI or LCIA release as lazily loaded arrays.
+
+        Each Excel workbook is converted once with
+        `convert_cumulative_workbook`, to its own subdirectory of the cache
+        directory. If the release has more than one workbook, pick one with
+        `workbook` (the filename, with or without the `.xlsx` suffix)."""
+        if release_type not in (
+            ReleaseType.cumulative_lci,
+            ReleaseType.cumulative_lcia,
+        ):
+            raise ValueError("`release_type` must be a cumulative LCI or LCIA release")
+        path = self.get_release(
+            version=version,
+            system_model=system_model,
+            release_type=release_type,
+            force_redownload=force_redownload,
+        )
+        workbooks = {
+            obj.stem: obj
+            for obj in sorted(path.rglob("*.xlsx"))
+            if not obj.name.startswith("~$")
+        }
+        if workbook is not None:
+            workbook = workbook[:-5] if workbook.endswith(".xlsx") else workbook
+            if workbook not in workbooks:
+                ERROR = f"""Workbook {workbook} not found in release.
+    Available workbooks: {sorted(workbooks)}"""
+                raise ValueError(ERROR)
+        elif len(workbooks) == 1:
+            workbook = next(iter(workbooks))
+        else:
+            ERROR = f"""Release has {len(workbooks)} workbooks; choose one with
+    `workbook`. Available workbooks: {sorted(workbooks)}"""
+            raise ValueError(ERROR)
+
+        def reset(target: Path) -> Path:
+            # Conversions left over from before the release was downloaded
+            # again are stale
+            shutil.rmtree(target, ignore_errors=True)
+            target.mkdir(parents=True)
+            return target
+
+        directory = self._derived_cache(path, "cumulative", ".cumulative", reset)
+        if not (directory / workbook / "metadata.json").is_file():
+            convert_cumulative_workbook(workbooks[workbook], directory / workbook)
+            message = f"""Converted cumulative results workbook:
+    Workbook: {workbook}
+    Directory: {directory / workbook}
+            """
+            logger.debug(message)
+        return CumulativeResults(directory / workbook)
+
+    def repair(
+        self,
+        filename: str,
+        full: Optional[bool] = False,
+        max_workers: Optional[int] = None,
+    ) -> List[str]:
+        """Verify an extracted archive in the cache, and restore missing or
+        damaged files.
+
+        See `CachedStorage.verify` for the meaning of `full` and `max_workers`.
+        If any files are damaged, the archive is downloaded again, but only the
+        damaged files are extracted.
+
+        Returns the list of repaired archive member names."""
+        damaged = self.storage.verify(filename, full=full, max_workers=max_workers)
+        if not damaged:
+            return damaged
+
+        manifest = self.storage.load_manifest(filename)
+        directory = Path(self.storage.catalogue[filename]["path"])
+        filepath = self._download_s3(
+            uuid=manifest["uuid"],
+            filename=filename,
+            url_namespace=manifest["url_namespace"],
+            directory=self.storage.dir,
+        )
+        if filepath.suffix.lower() == ".7z":
+            with py7zr.SevenZipFile(filepath, "r") as archive:
+                archive.extract(path=directory, targets=damaged)
+        else:
+            with zipfile.ZipFile(filepath, "r") as archive:
+                for name in damaged:
+                    archive.extract(name, path=directory)
+        try:
+            filepath.unlink()
+        except PermissionError:
+            # Error on Windows during testing
+            message = f"""Can't automatically delete {filepath}
+    Please delete manually"""
+            warnings.warn(message)
+
+        if manifest.get("fixed_version"):
+            fix_release_versions(directory, *manifest["fixed_version"], names=damaged)
+        self.storage.refresh_manifest(filename, damaged)
+
+        message = f"""Repaired cached files:
+    Filename: {filename}
+    Directory: {directory}
+    Number of repaired files: {len(damaged)}
+        """
+        logger.info(message)
+        return damaged
+
     def _download_and_cache(
         self,
         filename: str,
@@ -219,9 +461,22 @@ Proceeding anyways as no download error occurred."""
                 directory = filepath.parent / Path(filename).stem
                 if directory.exists():
                     shutil.rmtree(directory)
+                members = {
+                    obj.filename: {"size": obj.uncompressed, "crc32": obj.crc32 or 0}
+                    for obj in archive.list()
+                    if not obj.is_directory
+                }
                 archive.extractall(path=directory)
+                manifest = self.storage.write_manifest(
+                    filename=filename,
+                    directory=directory,
+                    members=members,
+                    uuid=uuid,
+                    url_namespace=url_namespace,
+                )
                 self.storage.catalogue[filename] = {
                     "path": str(directory),
+                    "manifest": str(manifest),
                     "archive": filepath.name,
                     "extracted": True,
                     "created": datetime.now().isoformat(),
@@ -251,7 +506,19 @@ Proceeding anyways as no download error occurred."""
                 directory = filepath.parent / Path(filename).stem
                 if directory.exists():
                     shutil.rmtree(directory)
+                members = {
+                    obj.filename: {"size": obj.file_size, "crc32": obj.CRC}
+                    for obj in archive.infolist()
+                    if not obj.is_dir()
+                }
                 archive.extractall(path=directory)
+                manifest = self.storage.write_manifest(
+                    filename=filename,
+                    directory=directory,
+                    members=members,
+                    uuid=uuid,
+                    url_namespace=url_namespace,
+                )
                 try:
                     filepath.unlink()
                 except PermissionError:
@@ -262,6 +529,7 @@ Proceeding anyways as no download error occurred."""
 
                 self.storage.catalogue[filename] = {
                     "path": str(directory),
+                    "manifest": str(manifest),
                     "archive": filepath.name,
                     "extracted": True,
                     "created": datetime.now().isoformat(),
@@ -298,7 +566,46 @@ Proceeding anyways as no download error occurred."""
             return filepath
 
 
-def get_excel_lcia_file_for_version(release: EcoinventRelease, version: str) -> Path:
+def fix_release_versions(
+    dirpath: Path,
+    major_version: int,
+    minor_version: int,
+    names: Optional[Iterable[str]] = None,
+) -> List[str]:
+    """Fix `majorRelease` and `minorRelease` in unit process and master data
+    files of an extracted release.
+
+    Only the archive member names in `names` are changed, if given.
+
+    Returns the list of changed archive member names."""
+    names = None if names is None else set(names)
+    fixed = []
+    FIXES = (
+        ("datasets", ".spold", fix_version_upr),
+        ("MasterData", ".xml", fix_version_meta),
+    )
+    for subdirectory, suffix, func in FIXES:
+        if not (dirpath / subdirectory).is_dir():
+            continue
+        logger.info(f"Fixing versions in {subdirectory} files")
+        for filepath in (dirpath / subdirectory).iterdir():
+            name = f"{subdirectory}/{filepath.name}"
+            if not filepath.suffix.lower() == suffix:
+                continue
+            if names is not None and name not in names:
+                continue
+            func(
+                filepath=filepath,
+                major_version=major_version,
+                minor_version=minor_version,
+            )
+            fixed.append(name)
+    return fixed
+
+
+def get_excel_lcia_file_for_version(
+    release: EcoinventRelease, version: str, force_redownload: Optional[bool] = False
+) -> Path:
     """
     The Excel LCIA file has varying names depending on the version. This
     function download the LCIA file, if necessary, and returns the filepath
@@ -310,6 +617,8 @@ def get_excel_lcia_file_for_version(release: EcoinventRelease, version: str) ->
         An instance of `EcoinventRelease` with valid settings
     version
         The ecoinvent version for which the LCIA file should be found
+    force_redownload
+        Download the LCIA file again even if it is in the cache
 
     Returns
     -------
@@ -324,35 +633,71 @@ def get_excel_lcia_file_for_version(release: EcoinventRelease, version: str) ->
     filelist = release.list_extra_files(version)
     guess = f"ecoinvent {version}_LCIA_implementation.7z"
 
-    possibles = sorted(
-        [
-            (damerau_levenshtein(given, guess), given)
-            for given in release.list_extra_files(version)
-            if "lcia" in given.lower() and version in given
-        ]
-    )
-    if not possibles:
+    candidates = [
+        given
+        for given in release.list_extra_files(version)
+        if "lcia" in given.lower() and version in given
+    ]
+    if not candidates:
         raise ValueError(f"Can't find LCIA file close to {guess} among {filelist}")
-    elif possibles[0][0] > 10:
+    possible = closest_match(guess, candidates, max_distance=10)
+    if possible is None:
         raise ValueError(
-            f"Closest LCIA filename match to {guess} is {filelist[0][1]},"
-            + "but this is too different"
+            f"Closest LCIA filename match to {guess} is "
+            + f"{closest_match(guess, candidates)[1]}, but this is too different"
         )
     dirpath = release.get_extra(
         version=version,
-        filename=possibles[0][1],
+        filename=possible[1],
+        force_redownload=force_redownload,
     )
 
     guess = f"LCIA_implementation_{version}.xlsx"
     filelist = list(dirpath.iterdir())
-    possibles = sorted(
-        [
-            (damerau_levenshtein(filepath.name, guess), filepath)
-            for filepath in filelist
-            if filepath.suffix.lower() == ".xlsx" and version in filepath.name
-        ]
-    )
-    if possibles and possibles[0][0] < 10:
-        return possibles[0][1]
+    candidates = {
+        filepath.name: filepath
+        for filepath in filelist
+        if filepath.suffix.lower() == ".xlsx" and version in filepath.name
+    }
+    possible = closest_match(guess, candidates, max_distance=9)
+    if possible is not None:
+        return candidates[possible[1]]
     else:
         raise ValueError(f"Can't find LCIA Excel file like {guess} in {filelist}")
+
+
+def get_lcia_implementation(
+    release: EcoinventRelease, version: str, force_redownload: Optional[bool] = False
+) -> LCIAImplementation:
+    """
+    Get the characterization factors of the LCIA implementation file from
+    `get_excel_lcia_file_for_version` as indexed tables.
+
+    The Excel file is converted once with `convert_lcia_workbook`, and
+    cached next to the extracted file.
+
+    Parameters
+    ----------
+    release
+        An instance of `EcoinventRelease` with valid settings
+    version
+        The ecoinvent version for which the LCIA file should be found
+    force_redownload
+        Download the LCIA file again even if it is in the cache
+
+    Returns
+    -------
+    An `LCIAImplementation`, with lookups like
+    `factor(method, category, indicator, (name, compartment, subcompartment))`
+
+    """
+    filepath = get_excel_lcia_file_for_version(
+        release=release, version=version, force_redownload=force_redownload
+    )
+    directory = release._derived_cache(
+        filepath.parent,
+        "lcia",
+        ".lcia",
+        lambda target: convert_lcia_workbook(filepath, target),
+    )
+    return LCIAImplementation(directory)
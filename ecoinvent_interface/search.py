@@ -0,0 +1,134 @@
+import heapq
+from collections import Counter
+from typing import Iterable, List, Optional, Union
+
+from .columnar import table_column
+from .string_distance import damerau_levenshtein_many
+
+FIELDS = ("activity_name", "reference_product", "geography")
+# Geography codes are short and shared by many datasets, so they shouldn't
+# outweigh a good match on names
+FIELD_WEIGHTS = {"activity_name": 1, "reference_product": 1, "geography": 0.25}
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join(str(text or "").lower().split())
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class FieldIndex:
+    """Trigram inverted index over the distinct values of one field"""
+
+    def __init__(self, values: Iterable[str]):
+        self.values = []
+        self.rows = []
+        self.sizes = []
+        self.postings = {}
+        lookup = {}
+
+        for row, value in enumerate(values):
+            text = normalize(value)
+            if text not in lookup:
+                lookup[text] = len(self.values)
+                grams = trigrams(text)
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(len(self.values))
+                self.values.append(text)
+                self.rows.append([])
+                self.sizes.append(len(grams))
+            self.rows[lookup[text]].append(row)
+
+    def scores(self, query: str, shortlist: int) -> dict:
+        """Score values similar to `query` between 0 and 1.
+
+        Candidate values are found with the trigram Dice coefficient, and the
+        best `shortlist` candidates are reranked by Damerau-Levenshtein
+        distance.
+
+        Returns a dictionary of value position to score."""
+        text = normalize(query)
+        grams = trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        candidates = heapq.nlargest(
+            shortlist,
+            shared,
+            key=lambda pos: 2 * shared[pos] / (len(grams) + self.sizes[pos]),
+        )
+        distances = damerau_levenshtein_many(
+            text, [self.values[pos] for pos in candidates]
+        )
+        return {
+            pos: 1 - distance / max(len(text), len(self.values[pos]), 1)
+            for pos, distance in zip(candidates, distances)
+        }
+
+
+def _ranking(item: tuple) -> tuple:
+    # Best score first, then by row
+    return -item[1], item[0]
+
+
+class SearchIndex:
+    """Fuzzy search over activity names, reference products and geographies
+    of mapping records.
+
+    Build once per release and reuse; searches take milliseconds even for a
+    complete release."""
+
+    def __init__(self, data: list, fields: Iterable[str] = FIELDS):
+        self.data = data
+        self.fields = {field: FieldIndex(table_column(data, field)) for field in fields}
+
+    def _row_scores(self, field: str, query: str, shortlist: int) -> dict:
+        index = self.fields[field]
+        return {
+            row: score
+            for pos, score in index.scores(query, shortlist).items()
+            for row in index.rows[pos]
+        }
+
+    def search(
+        self,
+        query: Union[str, dict],
+        limit: Optional[int] = 10,
+        shortlist: Optional[int] = None,
+    ) -> List[dict]:
+        """Find the mapping records most similar to `query`.
+
+        `query` can be a string, which is compared to the activity name and
+        reference product, or a dictionary of field names and values, in which
+        case the record score is the weighted average score over the given
+        fields (see `FIELD_WEIGHTS`).
+
+        `shortlist` is the number of trigram candidates per field which are
+        reranked with the edit distance; default is `max(50, 5 * limit)`, or
+        50 if `limit` is `None`.
+
+        Returns up to `limit` records (all shortlisted records if `limit` is
+        `None`), best first, each with an added `score` between 0 and 1."""
+        shortlist = shortlist or max(50, 5 * (limit or 10))
+        scores = Counter()
+        if isinstance(query, str):
+            for field in ("activity_name", "reference_product"):
+                if field not in self.fields:
+                    continue
+                for row, score in self._row_scores(field, query, shortlist).items():
+                    scores[row] = max(scores[row], score)
+        else:
+            query = {key: value for key, value in query.items() if key in self.fields}
+            total = sum(FIELD_WEIGHTS.get(field, 1) for field in query)
+            for field, value in query.items():
+                weight = FIELD_WEIGHTS.get(field, 1) / total
+                for row, score in self._row_scores(field, value, shortlist).items():
+                    scores[row] += score * weight
+        if limit is None:
+            best = sorted(scores.items(), key=_ranking)
+        else:
+            best = heapq.nsmallest(limit, scores.items(), key=_ranking)
+        return [dict(self.data[row], score=score) for row, score in best]
@@ -0,0 +1,269 @@
+import io
+from collections import namedtuple
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from lxml import etree
+
+NS = "{http://www.EcoInvent.org/EcoSpold02}"
+ACTIVITY = NS + "activity"
+ACTIVITY_NAME = NS + "activityName"
+GEOGRAPHY = NS + "geography"
+SHORTNAME = NS + "shortname"
+TIME_PERIOD = NS + "timePeriod"
+INTERMEDIATE = NS + "intermediateExchange"
+ELEMENTARY = NS + "elementaryExchange"
+FLOW_DATA = NS + "flowData"
+NAME = NS + "name"
+OUTPUT_GROUP = NS + "outputGroup"
+INPUT_GROUP = NS + "inputGroup"
+UNIT_NAME = NS + "unitName"
+UNCERTAINTY = NS + "uncertainty"
+COMPARTMENT = f"{NS}compartment/{NS}compartment"
+SUBCOMPARTMENT = f"{NS}compartment/{NS}subcompartment"
+
+# Fields of `parse_dataset` records
+DATASET_FIELDS = (
+    "filename",
+    "id",
+    "activity_name",
+    "geography",
+    "start_date",
+    "end_date",
+    "reference_product",
+    "reference_product_id",
+    "unit",
+    "size",
+    "exchanges",
+)
+PRODUCT_FIELDS = {"reference_product", "reference_product_id", "unit"}
+
+Exchange = namedtuple(
+    "Exchange",
+    [
+        "kind",
+        "flow_id",
+        "name",
+        "amount",
+        "unit",
+        "direction",
+        "group",
+        "compartment",
+        "subcompartment",
+        "activity_link",
+        "uncertainty",
+    ],
+    defaults=[None],
+)
+Exchange.__doc__ = """One exchange of a dataset. `kind` is `intermediate` or
+`elementary`, `direction` is `input` or `output`, and `group` is the
+ecospold input or output group number; `compartment` and `subcompartment`
+are only given for elementary exchanges, `activity_link` only for linked
+intermediate exchanges, and `uncertainty` only if the amount has an
+uncertainty distribution."""
+Uncertainty = namedtuple(
+    "Uncertainty", ["distribution", "loc", "scale", "minimum", "maximum"]
+)
+Uncertainty.__doc__ = """Uncertainty distribution of an exchange amount, e.g.
+`lognormal` with `loc` as the mean of the underlying normal distribution and
+`scale` as its standard deviation, including the pedigree uncertainty.
+Parameters which don't apply to the distribution are `None`."""
+
+
+def _reference_product(exchange: etree._Element) -> Union[str, None]:
+    """Name of `exchange` if it is a reference product with a non-zero amount"""
+    if exchange.findtext(OUTPUT_GROUP) != "0":
+        return None
+    if not float(exchange.get("amount", 0)):
+        return None
+    return exchange.findtext(NAME)
+
+
+def extract_mapping_fields(filepath: Union[str, Path]) -> dict:
+    """Read activity name, reference product and geography of an ecospold 2
+    file.
+
+    Parses incrementally and stops after the intermediate exchanges, so most
+    of the file is never read. Gives the same values as
+    `pyecospold.parse_file_v2`, but doesn't validate against the schema.
+
+    Raises `ValueError` if there isn't exactly one reference product with a
+    non-zero amount."""
+    filepath = Path(filepath)
+    activity_name, geography, products = None, None, []
+
+    context = etree.iterparse(
+        str(filepath),
+        events=("end",),
+        tag=(ACTIVITY_NAME, SHORTNAME, INTERMEDIATE, ELEMENTARY, FLOW_DATA),
+        remove_blank_text=True,
+    )
+    for _, element in context:
+        if element.tag == ACTIVITY_NAME:
+            if activity_name is None:
+                activity_name = element.text
+        elif element.tag == SHORTNAME:
+            if geography is None and element.getparent().tag == GEOGRAPHY:
+                geography = element.text
+        elif element.tag == INTERMEDIATE:
+            product = _reference_product(element)
+            if product is not None:
+                products.append(product)
+            element.clear()
+        else:
+            # Intermediate exchanges come first in `flowData`
+            break
+    del context
+
+    if len(products) != 1:
+        raise ValueError(f"Can't find single reference product in {filepath.name}")
+    return {
+        "filename": filepath.name,
+        "activity_name": activity_name,
+        "reference_product": products[0],
+        "geography": geography,
+    }
+
+
+def _float(element: etree._Element, attribute: str) -> Optional[float]:
+    value = element.get(attribute)
+    return None if value is None else float(value)
+
+
+def _uncertainty(element: etree._Element) -> Optional[Uncertainty]:
+    uncertainty = element.find(UNCERTAINTY)
+    distribution = None if uncertainty is None else uncertainty.find("*")
+    if distribution is None or not isinstance(distribution.tag, str):
+        return None
+    name = etree.QName(distribution).localname
+    variance = _float(distribution, "varianceWithPedigreeUncertainty")
+    if variance is None:
+        variance = _float(distribution, "variance")
+    scale = None if variance is None else variance**0.5
+    if name == "lognormal":
+        return Uncertainty(name, _float(distribution, "mu"), scale, None, None)
+    elif name == "normal":
+        return Uncertainty(name, _float(distribution, "meanValue"), scale, None, None)
+    return Uncertainty(
+        name,
+        _float(distribution, "mostLikelyValue"),
+        None,
+        _float(distribution, "minValue"),
+        _float(distribution, "maxValue"),
+    )
+
+
+def _exchange(element: etree._Element) -> Exchange:
+    intermediate = element.tag == INTERMEDIATE
+    group = element.findtext(OUTPUT_GROUP)
+    direction = "output"
+    if group is None:
+        group, direction = element.findtext(INPUT_GROUP), "input"
+    return Exchange(
+        kind="intermediate" if intermediate else "elementary",
+        flow_id=element.get(
+            "intermediateExchangeId" if intermediate else "elementaryExchangeId"
+        ),
+        name=element.findtext(NAME),
+        amount=float(element.get("amount", 0)),
+        unit=element.findtext(UNIT_NAME),
+        direction=direction,
+        group=None if group is None else int(group),
+        compartment=None if intermediate else element.findtext(COMPARTMENT),
+        subcompartment=None if intermediate else element.findtext(SUBCOMPARTMENT),
+        activity_link=element.get("activityLinkId"),
+        uncertainty=_uncertainty(element),
+    )
+
+
+def check_fields(fields: Optional[Iterable[str]]) -> tuple:
+    """`fields` as a tuple, or all `DATASET_FIELDS` if `None`"""
+    fields = DATASET_FIELDS if fields is None else tuple(fields)
+    unknown = set(fields).difference(DATASET_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown dataset fields: {sorted(unknown)}")
+    return fields
+
+
+def parse_dataset(
+    source: Union[str, Path, bytes],
+    filename: Optional[str] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> dict:
+    """Read a lightweight record of an ecospold 2 dataset.
+
+    `source` is a filepath or the file contents. The record has the
+    `DATASET_FIELDS` given in `fields` (default is all): activity `id`,
+    `activity_name`, `geography`, time period `start_date` and `end_date`,
+    the name, id, and unit of the first reference product with a non-zero
+    amount (or `None`), the file `size` in bytes, and `exchanges` as a tuple
+    of `Exchange` named tuples.
+
+    Like `extract_mapping_fields`, parses incrementally and stops as soon as
+    the requested fields are read, e.g. before the exchanges if they aren't
+    requested."""
+    fields = check_fields(fields)
+    record = dict.fromkeys(DATASET_FIELDS)
+    if isinstance(source, (bytes, bytearray)):
+        data = io.BytesIO(source)
+        record["size"] = len(source)
+    else:
+        source = Path(source)
+        filename = filename or source.name
+        data = str(source)
+        record["size"] = source.stat().st_size
+    record["filename"] = filename
+    need_exchanges = "exchanges" in fields
+    need_products = need_exchanges or bool(PRODUCT_FIELDS.intersection(fields))
+
+    exchanges = []
+    context = etree.iterparse(
+        data,
+        events=("end",),
+        tag=(
+            ACTIVITY,
+            ACTIVITY_NAME,
+            SHORTNAME,
+            TIME_PERIOD,
+            INTERMEDIATE,
+            ELEMENTARY,
+            FLOW_DATA,
+        ),
+        remove_blank_text=True,
+    )
+    for _, element in context:
+        if element.tag == ACTIVITY:
+            record["id"] = record["id"] or element.get("id")
+        elif element.tag == ACTIVITY_NAME:
+            record["activity_name"] = record["activity_name"] or element.text
+        elif element.tag == SHORTNAME:
+            if record["geography"] is None and element.getparent().tag == GEOGRAPHY:
+                record["geography"] = element.text
+        elif element.tag == TIME_PERIOD:
+            record["start_date"] = element.get("startDate")
+            record["end_date"] = element.get("endDate")
+        elif element.tag == FLOW_DATA:
+            break
+        elif not need_products:
+            # Activity description is complete
+            break
+        elif element.tag == INTERMEDIATE or need_exchanges:
+            exchange = _exchange(element)
+            if (
+                record["reference_product"] is None
+                and exchange.direction == "output"
+                and exchange.group == 0
+                and exchange.amount
+            ):
+                record["reference_product"] = exchange.name
+                record["reference_product_id"] = exchange.flow_id
+                record["unit"] = exchange.unit
+            exchanges.append(exchange)
+            element.clear()
+        else:
+            # Intermediate exchanges come first in `flowData`
+            break
+    del context
+
+    record["exchanges"] = tuple(exchanges)
+    return {field: record[field] for field in fields}
@@ -1,9 +1,19 @@
 import hashlib
+import io
 import json
+import os
 import shutil
+import tarfile
+import tempfile
+import threading
+import zlib
 from collections.abc import MutableMapping
-from pathlib import Path
-from typing import Iterable, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from time import time
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Union
 
 import platformdirs
 
@@ -15,6 +25,20 @@ cache_dir_platformdirs.mkdir(exist_ok=True, parents=True)
 secrets_dir = base_dir / "secrets"
 secrets_dir.mkdir(exist_ok=True)
 
+BUNDLE_FORMAT = 1
+BUNDLE_MANIFEST = "manifest.json"
+BUNDLE_BUFSIZE = 1024 * 1024
+# Catalogue entry fields which point to files or directories in the cache
+CACHED_PATH_FIELDS = (
+    "path",
+    "manifest",
+    "matrices",
+    "cumulative",
+    "lcia",
+    "dataset_index",
+    "exchanges",
+)
+
 
 class Catalogue(MutableMapping):
     """Synchronous JSON dictionary"""
@@ -28,8 +52,12 @@ class Catalogue(MutableMapping):
         return json.load(open(self._filepath, encoding="utf-8"))
 
     def _write(self, data: dict) -> None:
-        with open(self._filepath, "w", encoding="utf-8") as f:
+        # Write to a temporary file and swap it in, so readers never see
+        # a half-written catalogue
+        tmp_filepath = self._filepath.with_name(self._filepath.name + ".tmp")
+        with open(tmp_filepath, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_filepath, self._filepath)
 
     def __getitem__(self, key: str) -> dict:
         return self._load()[key]
@@ -50,6 +78,12 @@ class Catalogue(MutableMapping):
     def __len__(self) -> int:
         return len(self._load())
 
+    def update(self, *args, **kwargs) -> None:
+        """Add several entries with a single write"""
+        data = self._load()
+        data.update(*args, **kwargs)
+        self._write(data)
+
 
 class CachedStorage:
     def __init__(self, cache_dir: Union[None, Path, str] = None):
@@ -68,6 +102,492 @@ class CachedStorage:
         (self.dir / "catalogue.json").unlink()
         self.dir.mkdir(exist_ok=True)
 
+    def write_manifest(
+        self, filename: str, directory: Path, members: dict, **metadata
+    ) -> Path:
+        """Record the expected state of an extracted archive.
+
+        `members` maps archive member names (relative paths with forward
+        slashes) to `{"size": int, "crc32": int}`, as given in the archive
+        listing. File modification times are added from the extracted files
+        so that `verify` can skip unchanged files. Any `metadata`, like the
+        `uuid` needed to download the archive again, is stored as well.
+
+        Returns the manifest filepath."""
+        for name, member in members.items():
+            member["mtime"] = _mtime(directory / name)
+        manifest = dict(metadata, filename=filename, members=members)
+        filepath = self.dir / (Path(filename).stem + ".manifest.json")
+        self._write_manifest(filepath, manifest)
+        return filepath
+
+    def load_manifest(self, filename: str) -> dict:
+        try:
+            return json.load(
+                open(self.catalogue[filename]["manifest"], encoding="utf-8")
+            )
+        except KeyError:
+            raise KeyError(f"No integrity manifest for {filename} in cache")
+
+    def _write_manifest(self, filepath: Path, manifest: dict) -> None:
+        tmp_filepath = filepath.with_name(filepath.name + ".tmp")
+        with open(tmp_filepath, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_filepath, filepath)
+
+    def refresh_manifest(self, filename: str, names: Iterable[str], **metadata) -> None:
+        """Update manifest members after the files were deliberately changed"""
+        manifest = self.load_manifest(filename)
+        directory = Path(self.catalogue[filename]["path"])
+        for name in names:
+            manifest["members"][name] = {
+                "size": (directory / name).stat().st_size,
+                "crc32": crc32(directory / name),
+                "mtime": _mtime(directory / name),
+            }
+        manifest.update(metadata)
+        self._write_manifest(Path(self.catalogue[filename]["manifest"]), manifest)
+
+    def verify(
+        self,
+        filename: str,
+        full: Optional[bool] = False,
+        max_workers: Optional[int] = None,
+    ) -> List[str]:
+        """Check an extracted archive against its integrity manifest.
+
+        Files whose size and modification time match the manifest are assumed
+        to be intact unless `full` is set; other files are checked by CRC32.
+        Files are checked in parallel with a thread pool of `max_workers`.
+
+        Returns the sorted list of missing or damaged member names."""
+        manifest = self.load_manifest(filename)
+        directory = Path(self.catalogue[filename]["path"])
+
+        def check(item: tuple) -> tuple:
+            name, expected = item
+            try:
+                stat = (directory / name).stat()
+            except FileNotFoundError:
+                return name, False, None
+            if stat.st_size != expected["size"]:
+                return name, False, None
+            if not full and stat.st_mtime_ns == expected["mtime"]:
+                return name, True, None
+            return name, crc32(directory / name) == expected["crc32"], stat
+
+        damaged, touched = [], False
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for name, ok, stat in executor.map(check, manifest["members"].items()):
+                if not ok:
+                    damaged.append(name)
+                elif stat is not None and stat.st_mtime_ns != (
+                    manifest["members"][name]["mtime"]
+                ):
+                    # Content is fine; remember the new mtime for the fast path
+                    manifest["members"][name]["mtime"] = stat.st_mtime_ns
+                    touched = True
+        if touched:
+            self._write_manifest(Path(self.catalogue[filename]["manifest"]), manifest)
+        return sorted(damaged)
+
+    def _relative_path(self, key: str, field: str = "path") -> PurePosixPath:
+        path = Path(self.catalogue[key][field])
+        try:
+            return PurePosixPath(path.relative_to(self.dir).as_posix())
+        except ValueError:
+            raise ValueError(f"Cached path {path} for {key} is outside {self.dir}")
+
+    def export_bundle(
+        self,
+        target: Union[str, Path, BinaryIO],
+        filenames: Optional[Iterable[str]] = None,
+        compression: Optional[str] = None,
+    ) -> dict:
+        """Write catalogue entries and their files to a single tar stream.
+
+        `target` can be a filepath or a writable binary file object (e.g.
+        `sys.stdout.buffer`); the bundle is written sequentially and never
+        seeks. `filenames` selects catalogue keys; default is all entries.
+        `compression` can be `None`, `"gz"`, `"bz2"`, or `"xz"`.
+
+        The manifest with catalogue metadata and file hashes is written as
+        the last member, so it can be computed in the same pass.
+
+        Returns the manifest."""
+        filenames = list(self.catalogue) if filenames is None else list(filenames)
+        entries = {}
+        for key in filenames:
+            meta = dict(self.catalogue[key])
+            for field in CACHED_PATH_FIELDS:
+                if field in meta:
+                    meta[field] = str(self._relative_path(key, field))
+            entries[key] = meta
+
+        mode = "w|" + (compression or "")
+        files = {}
+        with _open_tar(target, mode) as tar:
+            relative_paths = [
+                meta[field]
+                for meta in entries.values()
+                for field in CACHED_PATH_FIELDS
+                if field in meta
+            ]
+            for relative in relative_paths:
+                for filepath, arcname in _walk_files(self.dir, relative):
+                    tarinfo = tar.gettarinfo(filepath, arcname=arcname)
+                    if tarinfo.isdir():
+                        tar.addfile(tarinfo)
+                        continue
+                    with open(filepath, "rb") as f:
+                        reader = _HashingReader(f)
+                        tar.addfile(tarinfo, reader)
+                    files[arcname] = {"size": tarinfo.size, "md5": reader.hexdigest()}
+
+            manifest = {
+                "format": BUNDLE_FORMAT,
+                "created": datetime.now().isoformat(),
+                "entries": entries,
+                "files": files,
+            }
+            content = json.dumps(manifest, indent=2, ensure_ascii=False).encode("utf-8")
+            tarinfo = tarfile.TarInfo(BUNDLE_MANIFEST)
+            tarinfo.size = len(content)
+            tarinfo.mtime = int(datetime.now().timestamp())
+            tar.addfile(tarinfo, io.BytesIO(content))
+        return manifest
+
+    def import_bundle(
+        self,
+        source: Union[str, Path, BinaryIO],
+        overwrite: Optional[bool] = False,
+    ) -> List[str]:
+        """Restore a bundle created with `export_bundle` into this cache.
+
+        `source` can be a filepath or a readable binary file object (e.g.
+        `sys.stdin.buffer`). Files are streamed into a staging directory and
+        checked against the manifest sizes and hashes; only if everything
+        matches are they moved into place and added to the catalogue with a
+        single write. Nothing in the cache is changed if the bundle is
+        incomplete or corrupted; if moving files or writing the catalogue
+        fails, the replaced files are restored.
+
+        Raises `ValueError` if a bundled catalogue entry already exists and
+        `overwrite` is not set.
+
+        Returns the list of imported catalogue keys."""
+        staging = Path(tempfile.mkdtemp(prefix=".bundle-", dir=self.dir))
+        try:
+            manifest, found = self._stage_bundle(source, staging)
+            if manifest.get("format") != BUNDLE_FORMAT:
+                raise ValueError(f"Unknown bundle format {manifest.get('format')}")
+            if found != manifest["files"]:
+                missing = set(manifest["files"]).difference(found)
+                changed = [
+                    key
+                    for key, value in found.items()
+                    if manifest["files"].get(key) != value
+                ]
+                ERROR = f"""Bundle doesn't match its manifest:
+    Missing files: {len(missing)}
+    Changed or unexpected files: {len(changed)}"""
+                raise ValueError(ERROR)
+
+            existing = [key for key in manifest["entries"] if key in self.catalogue]
+            if existing and not overwrite:
+                raise ValueError(
+                    f"Bundle entries already in cache: {existing}; "
+                    + "use `overwrite=True` to replace them"
+                )
+
+            replaced = staging / ".replaced"
+            replaced.mkdir()
+            # `(target, replaced path or None)` of every installed path, so
+            # a failure can be rolled back
+            installed = []
+            new_entries = {}
+            try:
+                for key, meta in manifest["entries"].items():
+                    meta = dict(meta)
+                    for field in CACHED_PATH_FIELDS:
+                        if field not in meta:
+                            continue
+                        relative = _safe_relative_path(meta[field])
+                        target = self.dir.joinpath(*relative.parts)
+                        backup = None
+                        if target.exists() or target.is_symlink():
+                            backup = replaced / str(len(installed))
+                            os.replace(target, backup)
+                        installed.append((target, backup))
+                        os.replace(staging.joinpath("files", *relative.parts), target)
+                        meta[field] = str(target)
+                    new_entries[key] = meta
+                self.catalogue.update(new_entries)
+            except BaseException:
+                for target, backup in reversed(installed):
+                    _remove(target)
+                    if backup is not None:
+                        os.replace(backup, target)
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return list(new_entries)
+
+    def _stage_bundle(self, source: Union[str, Path, BinaryIO], staging: Path) -> tuple:
+        """Stream bundle members into `staging`, hashing as we go"""
+        manifest, found = None, {}
+        with _open_tar(source, "r|*") as tar:
+            for member in tar:
+                if member.name == BUNDLE_MANIFEST and member.isfile():
+                    manifest = json.loads(tar.extractfile(member).read())
+                    continue
+                relative = _safe_relative_path(member.name)
+                if relative.parts[0] != "files":
+                    raise ValueError(f"Unexpected bundle member {member.name}")
+                path = staging.joinpath(*relative.parts)
+                if member.isdir():
+                    path.mkdir(parents=True, exist_ok=True)
+                elif member.isfile():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    reader = _HashingReader(tar.extractfile(member))
+                    with open(path, "wb") as f:
+                        shutil.copyfileobj(reader, f, BUNDLE_BUFSIZE)
+                    os.utime(path, (member.mtime, member.mtime))
+                    found[member.name] = {
+                        "size": member.size,
+                        "md5": reader.hexdigest(),
+                    }
+                else:
+                    raise ValueError(f"Unsupported bundle member type: {member.name}")
+        if manifest is None:
+            raise ValueError("Bundle has no manifest; it may be truncated")
+        return manifest, found
+
+
+def _umask() -> int:
+    # `os.umask` can only be read by setting it
+    umask = os.umask(0o22)
+    os.umask(umask)
+    return umask
+
+
+# Read once, as setting the umask while other threads create files isn't safe
+UMASK = _umask()
+
+
+@contextmanager
+def atomic_directory(target: Union[str, Path]) -> Iterator[Path]:
+    """Yield a new temporary directory next to `target` to write files to.
+
+    If the block finishes, an existing `target` is renamed out of the way,
+    the directory is renamed to `target`, and only then is the old `target`
+    deleted; if the second rename fails, the old `target` is put back. If
+    the block fails, the directory is deleted and `target` is left as it
+    was. Readers see the old or the new directory, never a partly written
+    one, though `target` is briefly missing between the two renames.
+
+    The directory gets the usual permissions for the current umask, not the
+    private ones of `tempfile.mkdtemp`."""
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{target.name}-", dir=target.parent))
+    replaced = None
+    try:
+        yield staging
+        os.chmod(staging, 0o777 & ~UMASK)
+        backup = None
+        if target.exists() or target.is_symlink():
+            replaced = Path(
+                tempfile.mkdtemp(prefix=f".{target.name}-replaced-", dir=target.parent)
+            )
+            backup = replaced / target.name
+            os.replace(target, backup)
+        try:
+            os.replace(staging, target)
+        except BaseException:
+            if backup is not None:
+                os.replace(backup, target)
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        if replaced is not None:
+            shutil.rmtree(replaced, ignore_errors=True)
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+
+class _HashingReader:
+    """File-like wrapper which computes the MD5 hash of everything read"""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._hasher = hashlib.md5()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        self._hasher.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+
+
+def _open_tar(fileobj: Union[str, Path, BinaryIO], mode: str) -> tarfile.TarFile:
+    """Open a tar stream with large sequential reads and writes"""
+    if isinstance(fileobj, (str, Path)):
+        name, fileobj = fileobj, None
+    else:
+        name = None
+    return tarfile.open(
+        name=name,
+        fileobj=fileobj,
+        mode=mode,
+        bufsize=BUNDLE_BUFSIZE,
+        copybufsize=BUNDLE_BUFSIZE,
+    )
+
+
+def _safe_relative_path(name: str) -> PurePosixPath:
+    path = PurePosixPath(name)
+    if path.is_absolute() or not path.parts or ".." in path.parts:
+        raise ValueError(f"Unsafe path in bundle: {name}")
+    return path
+
+
+def _walk_files(base_dir: Path, relative: str) -> Iterable[tuple]:
+    """Yield `(filepath, arcname)` for a cached file or directory tree.
+
+    Directories are yielded before their contents, in sorted order."""
+    root = base_dir / relative
+    yield root, f"files/{relative}"
+    if not root.is_dir():
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in dirnames + sorted(filenames):
+            filepath = Path(dirpath) / name
+            arcname = PurePosixPath(filepath.relative_to(base_dir).as_posix())
+            yield filepath, f"files/{arcname}"
+
+
+class ResponseCache:
+    """Persistent cache of JSON API responses, one file per response.
+
+    Entries older than `ttl` seconds are ignored; `None` means that entries
+    never expire. When the total size of the cache goes over `max_size`
+    bytes, the least recently used entries are removed."""
+
+    def __init__(
+        self,
+        dirpath: Path,
+        ttl: Optional[float] = None,
+        max_size: Optional[int] = 100 * 1024 * 1024,
+    ):
+        self.dir = Path(dirpath)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Stable key for JSON-serializable `parts`, e.g. URL and parameters"""
+        content = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _filepath(self, key: str) -> Path:
+        return self.dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Union[dict, list]]:
+        """Return the cached response, or `None` if missing or expired"""
+        filepath = self._filepath(key)
+        try:
+            with open(filepath, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if self.ttl is not None and time() - entry["created"] > self.ttl:
+            self._remove(filepath)
+            return None
+        try:
+            # Modification time records last use for eviction
+            os.utime(filepath)
+        except OSError:
+            pass
+        return entry["response"]
+
+    def set(self, key: str, response: Union[dict, list]) -> None:
+        filepath = self._filepath(key)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(
+            {"created": time(), "response": response}, ensure_ascii=False
+        ).encode("utf-8")
+        fd, tmp_filepath = tempfile.mkstemp(dir=filepath.parent, suffix=".tmp")
+        with open(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_filepath, filepath)
+
+        if self.max_size is not None:
+            with self._lock:
+                if self._size is None:
+                    self._size = sum(size for _, _, size in self._entries())
+                else:
+                    self._size += len(content)
+                if self._size > self.max_size:
+                    self._evict()
+
+    def _entries(self) -> List[tuple]:
+        entries = []
+        if not self.dir.is_dir():
+            return entries
+        for filepath in self.dir.glob("*/*.json"):
+            try:
+                stat = filepath.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, filepath, stat.st_size))
+        return entries
+
+    def _remove(self, filepath: Path) -> None:
+        try:
+            filepath.unlink()
+        except (FileNotFoundError, PermissionError):
+            pass
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until 90% of `max_size`"""
+        entries = sorted(self._entries())
+        self._size = sum(size for _, _, size in entries)
+        for _, filepath, size in entries:
+            if self._size <= 0.9 * self.max_size:
+                break
+            self._remove(filepath)
+            self._size -= size
+
+    def clear(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self._size = None
+
+
+def crc32(filepath: Union[str, Path], blocksize: int = 1024 * 1024) -> int:
+    """Generate CRC32 checksum for file at `filepath`, as used in zip and 7z"""
+    checksum = 0
+    with open(filepath, "rb") as f:
+        buf = f.read(blocksize)
+        while len(buf) > 0:
+            checksum = zlib.crc32(buf, checksum)
+            buf = f.read(blocksize)
+    return checksum
+
+
+def _mtime(filepath: Path) -> int:
+    return filepath.stat().st_mtime_ns
+
 
 def md5(filepath: Union[str, Path], blocksize: int = 65536) -> str:
     """Generate MD5 hash for file at `filepath`"""
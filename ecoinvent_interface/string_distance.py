@@ -25,6 +25,8 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import heapq
+
 
 def damerau_levenshtein(string_1, string_2):
     """
@@ -96,3 +98,230 @@ def damerau_levenshtein(string_1, string_2):
         dprev, d0, d1 = d0, d1, dprev
 
     return d0[-1]
+
+
+def bounded_damerau_levenshtein(string_1, string_2, max_distance):
+    """
+    Damerau-Levenshtein distance between two strings, if it is at most
+    `max_distance`; otherwise returns `max_distance + 1`.
+
+    Gives the same distances as `damerau_levenshtein`, but only computes the
+    diagonal band of `2 * max_distance + 1` cells in each row, and stops as
+    soon as a row has no cell within `max_distance`.
+
+    Usage::
+
+        >>> bounded_damerau_levenshtein('kitten', 'sitting', 3)
+        3
+        >>> bounded_damerau_levenshtein('kitten', 'sitting', 2)
+        3
+
+    """
+    if string_1 == string_2:
+        return 0
+
+    len_1 = len(string_1)
+    len_2 = len(string_2)
+
+    if len_1 > len_2:
+        string_2, string_1 = string_1, string_2
+        len_2, len_1 = len_1, len_2
+
+    too_far = max_distance + 1
+    if len_2 - len_1 > max_distance:
+        return too_far
+    if len_1 == 0:
+        return len_2
+
+    # Cells outside the band are never within `max_distance`
+    d0 = [j if j <= max_distance else too_far for j in range(len_2 + 1)]
+    d1 = [too_far] * (len_2 + 1)
+    dprev = [too_far] * (len_2 + 1)
+
+    s1 = string_1
+    s2 = string_2
+
+    for i in range(len_1):
+        start = max(0, i - max_distance)
+        stop = min(len_2, i + max_distance + 1)
+        d1[start] = i + 1 if start == 0 and i < max_distance else too_far
+        row_min = d1[start]
+
+        for j in range(start, stop):
+            cost = d0[j]
+
+            if s1[i] != s2[j]:
+                # substitution
+                cost += 1
+
+                # insertion
+                x_cost = d1[j] + 1
+                if x_cost < cost:
+                    cost = x_cost
+
+                # deletion
+                y_cost = d0[j + 1] + 1
+                if y_cost < cost:
+                    cost = y_cost
+
+                # transposition
+                if i > 0 and j > 0 and s1[i] == s2[j - 1] and s1[i - 1] == s2[j]:
+                    transp_cost = dprev[j - 1] + 1
+                    if transp_cost < cost:
+                        cost = transp_cost
+            d1[j + 1] = cost
+            if cost < row_min:
+                row_min = cost
+
+        if stop < len_2:
+            d1[stop + 1] = too_far
+        if row_min > max_distance:
+            # Distances never decrease in later rows
+            return too_far
+
+        dprev, d0, d1 = d0, d1, dprev
+
+    return min(d0[-1], too_far)
+
+
+def _by_length(candidates):
+    buckets = {}
+    for candidate in candidates:
+        buckets.setdefault(len(candidate), []).append(candidate)
+    return buckets
+
+
+def _closest(query, buckets, max_distance):
+    best = None
+    bound = max_distance
+    if bound is None:
+        bound = max([max(len(query), length) for length in buckets], default=len(query))
+
+    # Candidates with a length difference above the best distance so far
+    # can't be closer, so look at similar lengths first
+    for difference in range(bound + 1):
+        if best is not None and difference > best[0]:
+            break
+        lengths = {len(query) - difference, len(query) + difference}
+        for candidate in (c for length in lengths for c in buckets.get(length, [])):
+            distance = bounded_damerau_levenshtein(query, candidate, bound)
+            if distance <= bound and (best is None or (distance, candidate) < best):
+                best = (distance, candidate)
+                bound = distance
+    return best
+
+
+def closest_match(query, candidates, max_distance=None):
+    """
+    Find the candidate with the smallest Damerau-Levenshtein distance to
+    `query`; ties are broken by the smallest candidate.
+
+    Returns a `(distance, candidate)` tuple, or `None` if no candidate is
+    within `max_distance`.
+
+    Usage::
+
+        >>> closest_match('kitten', ['sitting', 'mitten', 'kitchen'])
+        (1, 'mitten')
+        >>> closest_match('kitten', ['sitting'], max_distance=2) is None
+        True
+
+    """
+    return _closest(query, _by_length(candidates), max_distance)
+
+
+def closest_matches(queries, candidates, max_distance=None):
+    """
+    Like `closest_match` for each of `queries`, grouping `candidates` by
+    length only once.
+    """
+    buckets = _by_length(candidates)
+    return [_closest(query, buckets, max_distance) for query in queries]
+
+
+def _pattern_masks(pattern):
+    masks = {}
+    for position, character in enumerate(pattern):
+        masks[character] = masks.get(character, 0) | (1 << position)
+    return masks
+
+
+def _bit_parallel_distance(masks, length, text):
+    """Hyyrö's bit-parallel algorithm for the optimal string alignment
+    distance between a pattern and `text`. Bit `i` of the vertical delta
+    vectors is the difference between rows `i + 1` and `i` of the current
+    column of the dynamic programming matrix; Python integers can have any
+    number of bits, so patterns of any length are handled in one word."""
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    vp, vn = full, 0
+    d0, pm_previous = 0, 0
+    distance = length
+
+    for character in text:
+        pm = masks.get(character, 0)
+        # Transpositions: a match in the previous column one row up, where
+        # there was no diagonal zero delta before
+        tr = (((~d0) & pm) << 1) & pm_previous
+        d0 = ((((pm & vp) + vp) ^ vp) | pm | vn | tr) & full
+        hp = (vn | ~(d0 | vp)) & full
+        hn = d0 & vp
+
+        if hp & last:
+            distance += 1
+        elif hn & last:
+            distance -= 1
+
+        hp = (hp << 1) | 1
+        hn = hn << 1
+        vp = (hn | ~(d0 | hp)) & full
+        vn = hp & d0
+        pm_previous = pm
+
+    return distance
+
+
+def damerau_levenshtein_many(query, candidates):
+    """
+    Damerau-Levenshtein distances between `query` and each of `candidates`.
+
+    Gives the same distances as `damerau_levenshtein`, but uses a
+    bit-parallel algorithm, so each distance takes one pass over the
+    candidate instead of `len(query) * len(candidate)` steps.
+
+    Usage::
+
+        >>> damerau_levenshtein_many('kitten', ['sitting', 'kittne', ''])
+        [3, 1, 6]
+
+    """
+    if not query:
+        return [len(candidate) for candidate in candidates]
+    masks = _pattern_masks(query)
+    length = len(query)
+    return [_bit_parallel_distance(masks, length, c) for c in candidates]
+
+
+def damerau_levenshtein_matrix(queries, candidates):
+    """
+    Matrix of Damerau-Levenshtein distances, as a list with one row of
+    distances to all `candidates` per query.
+    """
+    candidates = list(candidates)
+    return [damerau_levenshtein_many(query, candidates) for query in queries]
+
+
+def top_k_matches(query, candidates, k=5, max_distance=None):
+    """
+    The `k` candidates closest to `query`, as `(distance, candidate)`
+    tuples sorted by distance and then candidate. Candidates further than
+    `max_distance` are left out; with `k=None`, all other candidates are
+    returned.
+    """
+    candidates = list(candidates)
+    pairs = zip(damerau_levenshtein_many(query, candidates), candidates)
+    if max_distance is not None:
+        pairs = (pair for pair in pairs if pair[0] <= max_distance)
+    if k is None:
+        return sorted(pairs)
+    return heapq.nsmallest(k, pairs)
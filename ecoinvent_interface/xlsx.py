@@ -0,0 +1,129 @@
+import posixpath
+import zipfile
+from pathlib import Path
+from typing import Iterator, List, Union
+
+from lxml import etree
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _column_number(reference: str) -> int:
+    """Zero-based column number of a cell reference like `AB12`"""
+    number = 0
+    for character in reference:
+        if not character.isalpha():
+            break
+        number = number * 26 + ord(character.upper()) - ord("A") + 1
+    return number - 1
+
+
+def _text(element: etree._Element) -> str:
+    # Rich text is split into runs, each with its own `t` element
+    return "".join(node.text or "" for node in element.iter(NS + "t"))
+
+
+class Workbook:
+    """Minimal streaming reader for the cell values of `.xlsx` files.
+
+    Worksheets are parsed incrementally with `lxml`, one row at a time, so
+    memory use doesn't depend on the size of the sheet. Formulas give their
+    cached values; formatting, dates and merged cells are ignored."""
+
+    def __init__(self, filepath: Union[str, Path]):
+        self.filepath = Path(filepath)
+        self._zip = zipfile.ZipFile(self.filepath)
+        self.sheets = self._sheet_paths()
+        self._shared_strings = None
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def __enter__(self) -> "Workbook":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self.sheets)
+
+    def _sheet_paths(self) -> dict:
+        with self._zip.open("xl/_rels/workbook.xml.rels") as f:
+            targets = {
+                obj.get("Id"): obj.get("Target")
+                for obj in etree.parse(f)
+                .getroot()
+                .iter(PACKAGE_REL_NS + "Relationship")
+            }
+        with self._zip.open("xl/workbook.xml") as f:
+            sheets = etree.parse(f).getroot().iter(NS + "sheet")
+            paths = {}
+            for sheet in sheets:
+                target = targets[sheet.get(REL_NS + "id")]
+                if target.startswith("/"):
+                    target = target[1:]
+                else:
+                    target = posixpath.normpath(posixpath.join("xl", target))
+                paths[sheet.get("name")] = target
+        return paths
+
+    @property
+    def shared_strings(self) -> List[str]:
+        if self._shared_strings is None:
+            self._shared_strings = []
+            if "xl/sharedStrings.xml" in self._zip.namelist():
+                with self._zip.open("xl/sharedStrings.xml") as f:
+                    for _, element in etree.iterparse(f, tag=NS + "si"):
+                        self._shared_strings.append(_text(element))
+                        element.clear()
+        return self._shared_strings
+
+    def _value(self, cell: etree._Element) -> Union[str, float, bool, None]:
+        kind = cell.get("t", "n")
+        if kind == "inlineStr":
+            element = cell.find(NS + "is")
+            return None if element is None else _text(element)
+        value = cell.findtext(NS + "v")
+        if value is None:
+            return None
+        if kind == "s":
+            return self.shared_strings[int(value)]
+        elif kind == "n":
+            return float(value)
+        elif kind == "b":
+            return value == "1"
+        # `str` (formula result) and `e` (error)
+        return value
+
+    def iter_rows(self, sheet: str) -> Iterator[list]:
+        """Yield the cell values of each row of `sheet` as a list.
+
+        Missing cells are `None`; numbers are floats. Rows without any
+        cells are yielded as empty lists, so row positions are kept."""
+        if sheet not in self.sheets:
+            raise KeyError(f"Sheet {sheet} not in {self.sheet_names}")
+        expected = 1
+        with self._zip.open(self.sheets[sheet]) as f:
+            for _, row in etree.iterparse(f, tag=NS + "row"):
+                number = int(row.get("r", expected))
+                while expected < number:
+                    yield []
+                    expected += 1
+                values = []
+                for cell in row.iter(NS + "c"):
+                    reference = cell.get("r")
+                    if reference is not None:
+                        values.extend(
+                            [None] * (_column_number(reference) - len(values))
+                        )
+                    values.append(self._value(cell))
+                row.clear()
+                # Also free the already processed rows
+                while row.getprevious() is not None:
+                    del row.getparent()[0]
+                yield values
+                expected += 1
@@ -1,7 +1,13 @@
 import pytest
 
 from ecoinvent_interface import EcoinventProcess, EcoinventRelease, Settings
-from ecoinvent_interface.process_interface import get_cached_mapping
+from ecoinvent_interface.process_interface import (
+    get_cached_mapping,
+    get_field_values,
+    get_mapping_index,
+    get_search_index,
+    get_version_linkage,
+)
 
 
 def check_access():
@@ -35,6 +41,10 @@ def settings(custom_headers, tmp_path):
         )
 
     get_cached_mapping.cache_clear()
+    get_field_values.cache_clear()
+    get_mapping_index.cache_clear()
+    get_search_index.cache_clear()
+    get_version_linkage.cache_clear()
     return Settings(output_path=str(tmp_path))
 
 
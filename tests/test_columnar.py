@@ -0,0 +1,258 @@
+import json
+import zipfile
+
+import pytest
+
+from ecoinvent_interface import ProcessMapping, Settings
+from ecoinvent_interface import mapping as mapping_module
+from ecoinvent_interface import process_interface
+from ecoinvent_interface.columnar import (
+    ColumnarTable,
+    MappingTable,
+    open_table,
+    write_table,
+)
+from ecoinvent_interface.process_interface import MappingIndex
+from ecoinvent_interface.search import SearchIndex
+
+RECORDS = [
+    {"index": "1", "filename": "a.spold", "geography": "CH", "amount": 1},
+    {"index": "2", "filename": "b.spold", "geography": None, "amount": 2},
+    {"index": "3", "filename": "c.spold", "geography": "Zürich", "amount": 3},
+]
+
+
+def test_columnar_roundtrip(tmp_path):
+    write_table(RECORDS, ["index", "filename", "geography", "amount"], tmp_path / "t")
+    table = open_table(tmp_path / "t")
+    assert len(table) == 3
+    assert table.types == {
+        "index": "str",
+        "filename": "str",
+        "geography": "str",
+        "amount": "int64",
+    }
+    assert table.column("geography") == ["CH", None, "Zürich"]
+    assert table.arrays["amount"].tolist() == [1, 2, 3]
+    assert table.to_records() == RECORDS
+
+
+def test_columnar_shared_strings(tmp_path):
+    records = [{"a": "same", "b": "same"}] * 100
+    write_table(records, ["a", "b"], tmp_path / "t")
+    assert open_table(tmp_path / "t").strings == ["same"]
+
+
+def test_columnar_empty(tmp_path):
+    write_table([], ["a"], tmp_path / "t")
+    assert open_table(tmp_path / "t").to_records() == []
+
+
+@pytest.mark.parametrize(
+    "values, kind",
+    [
+        ([True, False, None], "bool"),
+        ([1, None, -(2**63) + 1], "int64"),
+        ([1.5, None, 2], "float64"),
+        ([None, None], "str"),
+        (["b", 1, True], "json"),
+        ([[1, "a"], {"b": [None]}, None], "json"),
+        ([1, 2**70], "json"),
+    ],
+)
+def test_columnar_value_types(values, kind, tmp_path):
+    records = [{"a": value} for value in values]
+    write_table(records, ["a"], tmp_path / "t")
+    table = open_table(tmp_path / "t")
+    assert table.types == {"a": kind}
+    assert table.to_records() == records
+    mapping = MappingTable.from_records(records)
+    assert mapping.column("a") == values
+    assert [mapping.value("a", row) for row in range(len(values))] == values
+    assert MappingTable.from_columnar(table).to_records() == records
+
+
+def test_mapping_table_missing_keys():
+    records = [{"index": 1, "has_access": True}, {"filename": "a.spold"}]
+    table = MappingTable.from_records(records)
+    assert table.to_records() == [
+        {"index": 1, "has_access": True, "filename": None},
+        {"index": None, "has_access": None, "filename": "a.spold"},
+    ]
+
+
+def test_columnar_errors(tmp_path):
+    with pytest.raises(ValueError):
+        ColumnarTable(b"not a table at all")
+
+
+def write_archive(data_dir, records):
+    with zipfile.ZipFile(data_dir / "mappings.zip", "w") as zf:
+        zf.writestr(
+            "catalogue.json",
+            json.dumps(
+                [
+                    {
+                        "filename": "3.9_apos.json",
+                        "version": "3.9",
+                        "system_model": "apos",
+                    }
+                ]
+            ),
+        )
+        zf.writestr("3.9_apos.json", json.dumps(records))
+
+
+@pytest.fixture
+def mapping_archive(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    write_archive(data_dir, RECORDS)
+    monkeypatch.setattr(mapping_module, "DATA_DIR", data_dir)
+    monkeypatch.setattr(process_interface, "DATA_DIR", data_dir)
+    monkeypatch.setattr(process_interface, "mapping_cache_dir", tmp_path / "cache")
+    process_interface.get_cached_mapping.cache_clear()
+    yield data_dir
+    process_interface.get_cached_mapping.cache_clear()
+
+
+def test_cached_mapping_any_values(mapping_archive):
+    records = [
+        {"index": 1, "has_access": True, "geography": "CH", "tags": ["a"]},
+        {"has_access": False, "geography": "DE", "tags": None},
+    ]
+    write_archive(mapping_archive, records)
+    assert process_interface.get_cached_mapping("3.9", "apos").to_records() == [
+        records[0],
+        dict(records[1], index=None),
+    ]
+
+
+def test_cached_mapping_converted_once(mapping_archive, tmp_path):
+    assert process_interface.get_cached_mapping("3.9", "apos").to_records() == RECORDS
+    with zipfile.ZipFile(mapping_archive / "mappings.zip") as zf:
+        crc = zf.getinfo("3.9_apos.json").CRC
+    filepath = tmp_path / "cache" / f"3.9_apos-{crc:08x}.eicol"
+    assert [p.name for p in filepath.parent.iterdir()] == [filepath.name]
+
+    # Later loads use the columnar file, not the archive
+    write_table(RECORDS[:1], ["index"], filepath)
+    process_interface.get_cached_mapping.cache_clear()
+    assert process_interface.get_cached_mapping("3.9", "apos").to_records() == [
+        {"index": "1"}
+    ]
+
+    # A changed archive member is converted again
+    write_archive(mapping_archive, RECORDS[1:])
+    process_interface.get_cached_mapping.cache_clear()
+    assert (
+        process_interface.get_cached_mapping("3.9", "apos").to_records() == RECORDS[1:]
+    )
+    assert len(list(filepath.parent.iterdir())) == 2
+
+
+def test_cached_mapping_unwritable_cache(mapping_archive, tmp_path):
+    (tmp_path / "cache").write_text("not a directory")
+    assert process_interface.get_cached_mapping("3.9", "apos").to_records() == RECORDS
+    with pytest.raises(KeyError):
+        process_interface.get_cached_mapping("3.10", "apos")
+
+
+def test_add_mapping_columnar(mapping_archive):
+    archive = (mapping_archive / "mappings.zip").read_bytes()
+    pm = ProcessMapping(Settings(), storage=None)
+    pm.add_mapping(RECORDS[:2], version="3.10", system_model="cutoff")
+
+    # Only the new release is written; the archive is unchanged
+    assert (mapping_archive / "mappings.zip").read_bytes() == archive
+    directory = mapping_archive / "mappings"
+    assert sorted(p.name for p in directory.iterdir()) == [
+        "3.10_cutoff.eicol",
+        "3.10_cutoff.json",
+        "catalogue.json",
+    ]
+    catalogue = json.loads((directory / "catalogue.json").read_text())
+    assert [obj["columnar"] for obj in catalogue] == ["3.10_cutoff.eicol"]
+
+    assert list(process_interface.get_cached_mapping("3.9", "apos")) == RECORDS
+    assert (
+        process_interface.get_cached_mapping("3.10", "cutoff").to_records()
+        == RECORDS[:2]
+    )
+
+
+def test_add_mapping_remote_records(mapping_archive):
+    pm = ProcessMapping(Settings(), storage=None)
+    pm.add_mapping([{"index": 1, "has_access": True}], "3.10", "cutoff")
+    assert process_interface.get_cached_mapping("3.10", "cutoff").to_records() == [
+        {"index": 1, "has_access": True}
+    ]
+
+
+def test_add_mapping_failure_leaves_nothing(mapping_archive):
+    pm = ProcessMapping(Settings(), storage=None)
+    pm.add_mapping(RECORDS[:1], version="3.10", system_model="cutoff")
+    directory = mapping_archive / "mappings"
+    before = {p.name: p.read_bytes() for p in directory.iterdir()}
+    with pytest.raises(TypeError):
+        pm.add_mapping(
+            [{"index": 1, "value": object()}], "3.10", "cutoff", replace=True
+        )
+    with pytest.raises(TypeError):
+        pm.add_mapping([{"index": 1, "value": object()}], "3.11", "cutoff")
+    assert {p.name: p.read_bytes() for p in directory.iterdir()} == before
+
+
+def test_add_mapping_replace(mapping_archive):
+    pm = ProcessMapping(Settings(), storage=None)
+    with pytest.raises(ValueError):
+        pm.add_mapping(RECORDS[:1], version="3.9", system_model="apos")
+
+    pm.add_mapping(RECORDS[:1], version="3.9", system_model="apos", replace=True)
+    pm.add_mapping(RECORDS[:2], version="3.10", system_model="cutoff")
+    with pytest.raises(ValueError):
+        pm.add_mapping(RECORDS, version="3.10", system_model="cutoff")
+    pm.add_mapping(RECORDS, version="3.10", system_model="cutoff", replace=True)
+
+    catalogue = json.loads(
+        (mapping_archive / "mappings" / "catalogue.json").read_text()
+    )
+    assert [(obj["version"], obj["system_model"]) for obj in catalogue] == [
+        ("3.9", "apos"),
+        ("3.10", "cutoff"),
+    ]
+    assert process_interface.get_cached_mapping("3.9", "apos").to_records() == (
+        RECORDS[:1]
+    )
+    assert len(process_interface.get_cached_mapping("3.10", "cutoff")) == 3
+
+
+def test_mapping_table_rows():
+    table = MappingTable.from_records(RECORDS)
+    assert len(table) == 3
+    assert table[1] == RECORDS[1]
+    assert table[-1]["geography"] == "Zürich"
+    assert table[0].get("missing", "default") == "default"
+    assert dict(table[0], score=1) == dict(RECORDS[0], score=1)
+    assert table[1:] == RECORDS[1:]
+    assert list(table) == RECORDS
+    assert not hasattr(table[0], "__dict__")
+    with pytest.raises(IndexError):
+        table[3]
+    with pytest.raises(KeyError):
+        table[0]["missing"]
+
+
+def test_mapping_table_from_columnar(tmp_path):
+    write_table(RECORDS, ["index", "filename", "geography", "amount"], tmp_path / "t")
+    table = MappingTable.from_columnar(open_table(tmp_path / "t"))
+    assert table.to_records() == RECORDS
+    assert table.column("filename") == ["a.spold", "b.spold", "c.spold"]
+
+
+def test_mapping_table_consumers():
+    table = MappingTable.from_records(RECORDS)
+    index = MappingIndex(table)
+    assert index.by_filename == {"a.spold": "1", "b.spold": "2", "c.spold": "3"}
+    assert index.filter({"geography": "CH"}) == [RECORDS[0]]
+    assert SearchIndex(table).search({"geography": "Zurich"})[0]["index"] == "3"
@@ -0,0 +1,140 @@
+import zipfile
+
+import numpy as np
+import pytest
+
+from ecoinvent_interface.cumulative import (
+    CumulativeResults,
+    convert_cumulative_workbook,
+)
+from ecoinvent_interface.xlsx import Workbook
+
+MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _cell(reference, value):
+    if value is None:
+        return ""
+    if isinstance(value, int):
+        return f'<c r="{reference}" t="s"><v>{value}</v></c>'
+    if isinstance(value, float):
+        return f'<c r="{reference}"><v>{value!r}</v></c>'
+    return f'<c r="{reference}" t="inlineStr"><is><t>{value}</t></is></c>'
+
+
+def write_xlsx(filepath, sheets, shared_strings):
+    """Minimal workbook; in `sheets`, `int` cells are shared string
+    positions, `float` cells numbers, and `str` cells inline strings"""
+    with zipfile.ZipFile(filepath, "w") as archive:
+        archive.writestr(
+            "xl/workbook.xml",
+            f'<workbook xmlns="{MAIN}" xmlns:r="{RELS}"><sheets>'
+            + "".join(
+                f'<sheet name="{name}" sheetId="{i + 1}" r:id="rId{i + 1}"/>'
+                for i, name in enumerate(sheets)
+            )
+            + "</sheets></workbook>",
+        )
+        archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'<Relationships xmlns="{PACKAGE}">'
+            + "".join(
+                f'<Relationship Id="rId{i + 1}" Target="worksheets/sheet{i + 1}.xml"/>'
+                for i in range(len(sheets))
+            )
+            + "</Relationships>",
+        )
+        archive.writestr(
+            "xl/sharedStrings.xml",
+            f'<sst xmlns="{MAIN}">'
+            + "".join(
+                f"<si><r><t>{obj[:2]}</t></r><r><t>{obj[2:]}</t></r></si>"
+                for obj in shared_strings
+            )
+            + "</sst>",
+        )
+        for i, rows in enumerate(sheets.values()):
+            xml = "".join(
+                f'<row r="{number}">'
+                + "".join(
+                    _cell(f"{'ABCDEFG'[col]}{number}", value)
+                    for col, value in enumerate(row)
+                )
+                + "</row>"
+                for number, row in rows
+            )
+            archive.writestr(
+                f"xl/worksheets/sheet{i + 1}.xml",
+                f'<worksheet xmlns="{MAIN}"><sheetData>{xml}</sheetData></worksheet>',
+            )
+    return filepath
+
+
+def write_cumulative_workbook(directory):
+    shared = ["activity name", "geography", "reference product", "IPCC 2021"]
+    rows = [
+        (1, ["Method", None, None, 3, 3, "EF v3.1"]),
+        (2, [None, None, "Category", "climate change", "GWP20", "acidification"]),
+        (3, [0, 1, 2, "kg CO2-Eq", "kg CO2-Eq", "mol H+-Eq"]),
+        (4, ["heat production", "CH", "heat", 0.5, 0.7, 0.001]),
+        # Row 5 is missing; rows are still aligned
+        (6, ["electricity production", "DE", "electricity", 0.4, None, "n/a"]),
+    ]
+    sheets = {"Info": [(1, ["Cumulative LCIA results"])], "LCIA": rows}
+    return write_xlsx(directory / "cumulative.xlsx", sheets, shared)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    return write_cumulative_workbook(tmp_path)
+
+
+def test_workbook_iter_rows(workbook):
+    with Workbook(workbook) as wb:
+        assert wb.sheet_names == ["Info", "LCIA"]
+        rows = list(wb.iter_rows("LCIA"))
+        with pytest.raises(KeyError):
+            list(wb.iter_rows("missing"))
+    assert len(rows) == 6
+    assert rows[0] == ["Method", None, None, "IPCC 2021", "IPCC 2021", "EF v3.1"]
+    assert rows[1][:3] == [None, None, "Category"]
+    assert rows[3] == ["heat production", "CH", "heat", 0.5, 0.7, 0.001]
+    assert rows[4] == []
+    assert rows[5][4] is None
+
+
+def test_convert_cumulative_workbook(workbook, tmp_path):
+    target = convert_cumulative_workbook(workbook, tmp_path / "converted")
+    results = CumulativeResults(target)
+    # Sheets without numbers are skipped
+    assert results.sheets == ["LCIA"]
+
+    rows = results.rows("LCIA")
+    assert rows.column("activity name") == [
+        "heat production",
+        "electricity production",
+    ]
+    assert rows[1]["geography"] == "DE"
+
+    columns = results.columns("LCIA")
+    assert columns[0] == {
+        "Method": "IPCC 2021",
+        "Category": "climate change",
+        "reference product": "kg CO2-Eq",
+    }
+    positions = results.find(columns, Method="IPCC 2021")
+    assert positions == [0, 1]
+    assert results.find(columns, Method="IPCC 2021", Category="GWP20") == [1]
+
+    values = results.values("LCIA")
+    assert isinstance(values, np.memmap)
+    assert values.shape == (2, 3)
+    assert values.flags["F_CONTIGUOUS"]
+    selected = results.values("LCIA", rows=[1], columns=positions)
+    assert selected[0, 0] == 0.4
+    assert np.isnan(selected[0, 1])
+    assert np.isnan(values[1, 2])
+    with pytest.raises(KeyError):
+        results.values("Info")
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+
+from ecoinvent_interface.dataset_index import DatasetIndex, build_dataset_index
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+PRODUCT_ID = "2a3b4c5d-6e7f-4809-9a1b-2c3d4e5f6a7b"
+MASTERDATA = """<?xml version="1.0" encoding="UTF-8"?>
+<validIntermediateExchanges xmlns="http://www.EcoInvent.org/EcoSpold02">
+  <intermediateExchange id="{id}" unitId="487df68b" casNumber="">
+    <name xml:lang="en">rye seed, Swiss integrated production, for sowing</name>
+    <name xml:lang="de">Roggensaatgut</name>
+    <unitName xml:lang="en">kg</unitName>
+    <classification classificationId="39b0f0ab">
+      <classificationSystem xml:lang="en">CPC</classificationSystem>
+      <classificationValue xml:lang="en">01140: Rye</classificationValue>
+    </classification>
+  </intermediateExchange>
+</validIntermediateExchanges>
+"""
+
+
+def write_release(tmp_path):
+    directory = tmp_path / "ecoinvent 3.10_cutoff_ecoSpold02"
+    (directory / "datasets").mkdir(parents=True)
+    content = (FIXTURES_DIR / "activity.spold").read_text(encoding="utf-8")
+    (directory / "datasets" / "rye.spold").write_text(content, encoding="utf-8")
+    (directory / "datasets" / "rye-DE.spold").write_text(
+        content.replace(">CH<", ">DE<").replace('id="0b2a', 'id="ffff'),
+        encoding="utf-8",
+    )
+    (directory / "MasterData").mkdir()
+    (directory / "MasterData" / "IntermediateExchanges.xml").write_text(
+        MASTERDATA.format(id=PRODUCT_ID), encoding="utf-8"
+    )
+    return directory
+
+
+@pytest.fixture
+def release_dir(tmp_path):
+    return write_release(tmp_path)
+
+
+def test_build_dataset_index(release_dir, tmp_path):
+    target = build_dataset_index(release_dir, tmp_path / "index.sqlite", max_workers=1)
+    with DatasetIndex(target) as index:
+        assert len(index) == 2
+        assert index.masterdata == ["IntermediateExchanges"]
+        rye = index.get("rye.spold")
+        assert rye["activity_id"] == "0b2a5d0d-1b3f-4a2e-9c5d-6f8f3c2d1a10"
+        assert rye["product_id"] == PRODUCT_ID
+        assert rye["geography"] == "CH"
+        assert (rye["start_date"], rye["end_date"]) == ("2001-01-01", "2019-12-31")
+        assert rye["size"] == (release_dir / "datasets" / "rye.spold").stat().st_size
+        assert index.get("missing.spold") is None
+
+        assert [obj["filename"] for obj in index.find(geography="DE")] == [
+            "rye-DE.spold"
+        ]
+        with pytest.raises(ValueError):
+            index.find(color="red")
+
+        entry = index.masterdata_entry("IntermediateExchanges", PRODUCT_ID)
+        assert entry["name"] == "rye seed, Swiss integrated production, for sowing"
+        assert entry["unit_name"] == "kg"
+        assert entry["classification_value"] == "01140: Rye"
+        with pytest.raises(KeyError):
+            index.masterdata_entry("Geographies", "x")
+
+        joined = index.query(
+            "SELECT d.filename, m.unit_name FROM datasets d "
+            "JOIN IntermediateExchanges m ON d.product_id = m.id "
+            "WHERE d.geography = ?",
+            ("CH",),
+        )
+        assert joined == [{"filename": "rye.spold", "unit_name": "kg"}]
@@ -0,0 +1,96 @@
+import zipfile
+from pathlib import Path
+
+import py7zr
+import pytest
+
+from ecoinvent_interface.datasets import iter_dataset_sources, iter_datasets
+from ecoinvent_interface.spold import Exchange, parse_dataset
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+SPOLD = FIXTURES_DIR / "activity.spold"
+
+
+@pytest.fixture
+def release_dir(tmp_path):
+    directory = tmp_path / "release" / "datasets"
+    directory.mkdir(parents=True)
+    for i in range(5):
+        (directory / f"{i}.spold").write_bytes(SPOLD.read_bytes())
+    (directory / "readme.txt").write_text("not a dataset")
+    return directory.parent
+
+
+def test_parse_dataset():
+    record = parse_dataset(SPOLD)
+    assert record["filename"] == "activity.spold"
+    assert record["id"] == "0b2a5d0d-1b3f-4a2e-9c5d-6f8f3c2d1a10"
+    assert record["geography"] == "CH"
+    assert record["reference_product"].startswith("rye seed")
+    assert record["unit"] == "kg"
+    assert len(record["exchanges"]) == 4
+    assert record["exchanges"][2] == Exchange(
+        kind="intermediate",
+        flow_id="6f7a8b9c-0d1e-4f2a-9b3c-4d5e6f7a8b9c",
+        name="nitrogen fertiliser, as N",
+        amount=0.05,
+        unit="kg",
+        direction="input",
+        group=5,
+        compartment=None,
+        subcompartment=None,
+        activity_link=None,
+    )
+    ammonia = record["exchanges"][3]
+    assert (ammonia.kind, ammonia.compartment) == ("elementary", "air")
+
+
+def test_parse_dataset_projection():
+    assert parse_dataset(SPOLD.read_bytes(), "a.spold", ["filename", "id"]) == {
+        "filename": "a.spold",
+        "id": "0b2a5d0d-1b3f-4a2e-9c5d-6f8f3c2d1a10",
+    }
+    record = parse_dataset(SPOLD, fields=["reference_product"])
+    assert list(record) == ["reference_product"]
+    assert record["reference_product"].startswith("rye seed")
+    with pytest.raises(ValueError):
+        parse_dataset(SPOLD, fields=["missing"])
+
+
+@pytest.mark.parametrize("kind", ["directory", "7z", "zip"])
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_iter_datasets(release_dir, tmp_path, kind, max_workers):
+    path = release_dir
+    if kind == "7z":
+        path = tmp_path / "release.7z"
+        with py7zr.SevenZipFile(path, "w") as archive:
+            archive.writeall(release_dir / "datasets", "datasets")
+    elif kind == "zip":
+        path = tmp_path / "release.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            for filepath in (release_dir / "datasets").iterdir():
+                archive.write(filepath, f"datasets/{filepath.name}")
+
+    records = list(
+        iter_datasets(path, fields=["filename", "id"], max_workers=max_workers)
+    )
+    assert sorted(obj["filename"] for obj in records) == [
+        f"{i}.spold" for i in range(5)
+    ]
+    assert {obj["id"] for obj in records} == {parse_dataset(SPOLD)["id"]}
+
+
+def test_iter_datasets_closed_early(release_dir, tmp_path):
+    path = tmp_path / "release.7z"
+    with py7zr.SevenZipFile(path, "w") as archive:
+        archive.writeall(release_dir / "datasets", "datasets")
+    records = iter_datasets(path, chunksize=1, max_workers=1)
+    assert next(records)["geography"] == "CH"
+    records.close()
+
+
+def test_iter_dataset_sources_errors(tmp_path):
+    with pytest.raises(ValueError):
+        iter_dataset_sources(tmp_path / "release.tar")
+    with pytest.raises(ValueError):
+        list(iter_datasets(tmp_path, fields=["missing"]))
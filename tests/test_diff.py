@@ -0,0 +1,117 @@
+import shutil
+import zipfile
+from pathlib import Path
+
+import py7zr
+import pytest
+
+from ecoinvent_interface import diff_releases
+from ecoinvent_interface.spold_versions import fix_version_upr
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+GEOGRAPHIES = """<?xml version="1.0" encoding="UTF-8"?>
+<validGeographies xmlns="http://www.EcoInvent.org/EcoSpold02" majorRelease="3">
+{}
+</validGeographies>
+"""
+GEOGRAPHY = '<geography id="{}"><name xml:lang="en">{}</name></geography>'
+
+
+def write_release(directory, datasets, geographies):
+    (directory / "datasets").mkdir(parents=True)
+    (directory / "MasterData").mkdir()
+    for filename, content in datasets.items():
+        (directory / "datasets" / filename).write_text(content, encoding="utf-8")
+    (directory / "MasterData" / "Geographies.xml").write_text(
+        GEOGRAPHIES.format(
+            "\n".join(GEOGRAPHY.format(*obj) for obj in geographies.items())
+        ),
+        encoding="utf-8",
+    )
+    return directory
+
+
+@pytest.fixture
+def releases(tmp_path):
+    content = (FIXTURES_DIR / "activity.spold").read_text(encoding="utf-8")
+    old = write_release(
+        tmp_path / "old",
+        {
+            "same.spold": content,
+            "reformatted.spold": content,
+            "changed.spold": content,
+            "removed.spold": content,
+        },
+        {"1": "Switzerland", "2": "Germany", "3": "France"},
+    )
+    new = write_release(
+        tmp_path / "new",
+        {
+            "same.spold": content,
+            "reformatted.spold": content,
+            "changed.spold": content.replace('amount="0.05"', 'amount="0.06"'),
+            "added.spold": content,
+        },
+        {"1": "Switzerland", "2": "Deutschland", "4": "Italy"},
+    )
+    # New version number and formatting, same data
+    fix_version_upr(new / "datasets" / "reformatted.spold", 3, 11)
+    return old, new
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_diff_releases(releases, max_workers):
+    result = diff_releases(*releases, max_workers=max_workers)
+    assert result == {
+        "datasets": {
+            "added": ["added.spold"],
+            "removed": ["removed.spold"],
+            "changed": ["changed.spold"],
+        },
+        "unchanged": 2,
+        "masterdata": {
+            "Geographies.xml": {"added": ["4"], "removed": ["3"], "changed": ["2"]}
+        },
+    }
+
+
+def test_diff_releases_strict(releases):
+    result = diff_releases(*releases, ignore_release_version=False, max_workers=1)
+    assert result["datasets"]["changed"] == ["changed.spold", "reformatted.spold"]
+    assert result["unchanged"] == 1
+
+
+def test_diff_releases_identical(releases, tmp_path):
+    old, _ = releases
+    shutil.copytree(old, tmp_path / "copy")
+    result = diff_releases(old, tmp_path / "copy", max_workers=1)
+    assert result["unchanged"] == 4
+    assert not any(result["datasets"].values())
+    assert result["masterdata"] == {}
+    with pytest.raises(ValueError):
+        diff_releases(old, tmp_path / "missing")
+
+
+def write_archive(directory, filepath):
+    if filepath.suffix == ".7z":
+        with py7zr.SevenZipFile(filepath, "w") as archive:
+            archive.writeall(directory, arcname=directory.name)
+    else:
+        with zipfile.ZipFile(filepath, "w") as archive:
+            for path in sorted(directory.rglob("*")):
+                archive.write(path, path.relative_to(directory.parent))
+    return filepath
+
+
+@pytest.mark.parametrize("suffix", [".7z", ".zip"])
+def test_diff_releases_archives(releases, tmp_path, suffix):
+    # E.g. a copy of the archive of an earlier download of the same release
+    old, new = releases
+    expected = diff_releases(old, new, max_workers=1)
+    archive = write_archive(old, tmp_path / f"old{suffix}")
+    shutil.rmtree(old)
+    assert diff_releases(archive, new, max_workers=1) == expected
+    new_archive = write_archive(new, tmp_path / f"new{suffix}")
+    assert diff_releases(archive, new_archive, max_workers=1) == expected
+    with pytest.raises(ValueError):
+        diff_releases(tmp_path / "old.tar", new)
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ecoinvent_interface.exchanges import (
+    ELEMENTARY,
+    INPUT,
+    REFERENCE_PRODUCT,
+    ExchangeArrays,
+    convert_exchanges,
+)
+from ecoinvent_interface.spold import Uncertainty, parse_dataset
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+RYE_ACTIVITY = "0b2a5d0d-1b3f-4a2e-9c5d-6f8f3c2d1a10"
+FERTILISER = "6f7a8b9c-0d1e-4f2a-9b3c-4d5e6f7a8b9c"
+FERTILISER_ACTIVITY = "99999999-1b3f-4a2e-9c5d-6f8f3c2d1a10"
+LOGNORMAL = (
+    '<uncertainty><lognormal meanValue="0.05" mu="-3" variance="0.04" '
+    'varianceWithPedigreeUncertainty="0.09"/></uncertainty>'
+)
+
+
+def write_release(tmp_path):
+    directory = tmp_path / "ecoinvent 3.10_cutoff_ecoSpold02"
+    (directory / "datasets").mkdir(parents=True)
+    content = (FIXTURES_DIR / "activity.spold").read_text(encoding="utf-8")
+    # Link the fertiliser input to a fertiliser production dataset
+    rye = content.replace(
+        f'amount="0.05" intermediateExchangeId="{FERTILISER}"',
+        f'amount="0.05" intermediateExchangeId="{FERTILISER}" '
+        f'activityLinkId="{FERTILISER_ACTIVITY}"',
+    ).replace("<inputGroup>5</inputGroup>", "<inputGroup>5</inputGroup>" + LOGNORMAL)
+    (directory / "datasets" / "a-rye.spold").write_text(rye, encoding="utf-8")
+    # Fertiliser production: the rye dataset, producing fertiliser instead
+    fertiliser = (
+        content.replace(RYE_ACTIVITY, FERTILISER_ACTIVITY)
+        .replace(
+            'amount="1" intermediateExchangeId', 'amount="0" intermediateExchangeId'
+        )
+        .replace("<inputGroup>5</inputGroup>", "<outputGroup>0</outputGroup>")
+    )
+    (directory / "datasets" / "b-fertiliser.spold").write_text(
+        fertiliser, encoding="utf-8"
+    )
+    return directory
+
+
+@pytest.fixture
+def release_dir(tmp_path):
+    return write_release(tmp_path)
+
+
+def test_parse_dataset_uncertainty(release_dir):
+    record = parse_dataset(release_dir / "datasets" / "a-rye.spold")
+    fertiliser = record["exchanges"][2]
+    assert fertiliser.activity_link == FERTILISER_ACTIVITY
+    assert fertiliser.uncertainty == Uncertainty("lognormal", -3.0, 0.3, None, None)
+    assert record["exchanges"][0].uncertainty is None
+
+
+def test_convert_exchanges(release_dir, tmp_path):
+    exchanges = ExchangeArrays(
+        convert_exchanges(release_dir, tmp_path / "exchanges", max_workers=1)
+    )
+    assert len(exchanges) == 8
+    datasets = exchanges.datasets
+    assert datasets.column("filename") == ["a-rye.spold", "b-fertiliser.spold"]
+    assert datasets[1]["product_id"] == FERTILISER
+    flows = exchanges.flows
+    assert len(flows) == 4
+    assert flows[3]["compartment"] == "air"
+
+    dataset, flow = exchanges.array("dataset"), exchanges.array("flow")
+    assert isinstance(dataset, np.memmap)
+    assert dataset.tolist() == [0, 0, 0, 0, 1, 1, 1, 1]
+    assert flow.tolist() == [0, 1, 2, 3, 0, 1, 2, 3]
+    assert exchanges.array("supplier").tolist() == [-1, -1, 1, -1, -1, -1, -1, -1]
+    flags = exchanges.array("flags").tolist()
+    assert flags[:4] == [REFERENCE_PRODUCT, REFERENCE_PRODUCT, INPUT, ELEMENTARY]
+    assert flags[6] == REFERENCE_PRODUCT
+    assert exchanges.array("group").tolist()[:4] == [0, 0, 5, 4]
+    assert exchanges.array("amount").tolist()[:4] == [1.0, 0.0, 0.05, 0.001]
+
+    assert exchanges.array("uncertainty_type").tolist()[:3] == [0, 0, 2]
+    loc, scale = exchanges.array("loc"), exchanges.array("scale")
+    assert (loc[2], scale[2]) == (-3.0, 0.3)
+    assert np.isnan(loc[0]) and np.isnan(exchanges.array("maximum")[2])
+    with pytest.raises(KeyError):
+        exchanges.array("missing")
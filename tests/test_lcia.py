@@ -0,0 +1,65 @@
+import pytest
+
+from ecoinvent_interface.lcia import LCIAImplementation, convert_lcia_workbook
+
+from .test_cumulative import write_xlsx
+
+HEADER = [
+    "Method",
+    "Category",
+    "Indicator",
+    "Name",
+    "Compartment",
+    "Subcompartment",
+    "CF",
+]
+
+
+def write_lcia_workbook(tmp_path):
+    directory = tmp_path / "ecoinvent 3.10_LCIA_implementation"
+    directory.mkdir()
+    rows = [
+        HEADER,
+        ["IPCC", "climate change", "GWP100", "Methane", "air", "unspecified", 29.8],
+        ["EF", "acidification", "AE", "Ammonia", "air", "unspecified", 3.02],
+        ["IPCC", "climate change", "GWP100", 0, "air", "unspecified", 1.0],
+        ["IPCC", "climate change", "GWP20", 0, "air", "unspecified", 1.0],
+        ["IPCC", "climate change", "GWP100", "Water", "water", None, "n/a"],
+    ]
+    sheets = {
+        "units": [(1, ["Method", "Unit"])],
+        "CFs": list(enumerate(rows, start=1)),
+    }
+    filepath = directory / "LCIA Implementation 3.10.xlsx"
+    return write_xlsx(filepath, sheets, ["Carbon dioxide, fossil"])
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    return write_lcia_workbook(tmp_path)
+
+
+def test_convert_lcia_workbook(workbook, tmp_path):
+    cfs = LCIAImplementation(convert_lcia_workbook(workbook, tmp_path / "lcia"))
+    assert len(cfs) == 4
+    assert cfs.methods == ["EF", "IPCC"]
+    assert cfs.categories("IPCC") == ["climate change"]
+    assert cfs.indicators_for("IPCC", "climate change") == ["GWP100", "GWP20"]
+    assert ("EF", "acidification", "AE") in cfs.indicators
+
+    co2 = ("Carbon dioxide, fossil", "air", "unspecified")
+    assert cfs.factors("IPCC", "climate change", "GWP100") == {
+        ("Methane", "air", "unspecified"): 29.8,
+        co2: 1.0,
+    }
+    assert cfs.factor("IPCC", "climate change", "GWP20", co2) == 1.0
+    assert cfs.factor("EF", "acidification", "AE", co2) is None
+    assert cfs.factor("EF", "acidification", "AE", co2, default=0.0) == 0.0
+    with pytest.raises(KeyError):
+        cfs.factors("IPCC", "climate change", "missing")
+
+
+def test_convert_lcia_workbook_no_factors(tmp_path):
+    filepath = write_xlsx(tmp_path / "empty.xlsx", {"CFs": [(1, ["Method"])]}, [])
+    with pytest.raises(ValueError):
+        convert_lcia_workbook(filepath, tmp_path / "lcia")
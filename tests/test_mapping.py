@@ -0,0 +1,143 @@
+import json
+
+import pytest
+import requests
+
+from ecoinvent_interface import CachedStorage, ProcessMapping, Settings
+from ecoinvent_interface import mapping as mapping_module
+
+MISSING = {10, 11, 12}
+LAST = 30
+
+
+class FakeResponse(requests.Response):
+    def __init__(self, status_code, data=None):
+        super().__init__()
+        self.status_code = status_code
+        self._content = b"" if data is None else json.dumps(data).encode()
+
+
+class FakeProcess:
+    calls = []
+    fail_at = None
+    # Dataset id to statuses of failed responses before the real one
+    errors = {}
+    # Dataset id to number of timeouts before the real response
+    timeouts = {}
+
+    def __init__(self, settings):
+        pass
+
+    def set_release(self, version, system_model):
+        self.version, self.system_model = version, system_model
+
+    def get_dataset_info_response(self, index):
+        if index == self.fail_at:
+            raise requests.ConnectionError("Network down")
+        if self.timeouts.get(index):
+            self.timeouts[index] -= 1
+            raise requests.Timeout("Read timed out")
+        self.calls.append(index)
+        if self.errors.get(index):
+            return FakeResponse(self.errors[index].pop(0), {"detail": "Error"})
+        if index in MISSING or index > LAST:
+            return FakeResponse(404, {"detail": "Not found"})
+        return FakeResponse(200, {"index": index, "version": self.version})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waits = []
+    monkeypatch.setattr(mapping_module, "sleep", waits.append)
+    return waits
+
+
+@pytest.fixture
+def mapping(tmp_path, monkeypatch, sleeps):
+    FakeProcess.calls, FakeProcess.fail_at = [], None
+    FakeProcess.errors, FakeProcess.timeouts = {}, {}
+    monkeypatch.setattr(mapping_module, "EcoinventProcess", FakeProcess)
+    return ProcessMapping(
+        Settings(username="u", password="p"), storage=CachedStorage(tmp_path)
+    )
+
+
+def test_remote_mapping_discovers_max_id(mapping):
+    data = mapping.create_remote_mapping("3.10", "cutoff", max_misses=8)
+    assert [obj["index"] for obj in data] == [
+        i for i in range(1, LAST + 1) if i not in MISSING
+    ]
+    assert max(FakeProcess.calls) >= LAST + 8
+    assert len(FakeProcess.calls) == len(set(FakeProcess.calls))
+
+
+def test_remote_mapping_max_id(mapping):
+    data = mapping.create_remote_mapping("3.10", "cutoff", max_id=5, max_workers=2)
+    assert [obj["index"] for obj in data] == [1, 2, 3, 4, 5]
+    assert sorted(FakeProcess.calls) == [1, 2, 3, 4, 5]
+
+
+def test_remote_mapping_resume(mapping, tmp_path):
+    FakeProcess.fail_at = 20
+    with pytest.raises(requests.ConnectionError):
+        mapping.create_remote_mapping("3.10", "cutoff", max_workers=1)
+    checkpoint = tmp_path / "remote-mapping-3.10-cutoff.jsonl"
+    assert len(checkpoint.read_text().splitlines()) == 19
+
+    # Interrupted while writing the last line
+    with open(checkpoint, "a") as f:
+        f.write(json.dumps({"id": 19, "data": None})[:10])
+
+    FakeProcess.calls, FakeProcess.fail_at = [], None
+    data = mapping.create_remote_mapping("3.10", "cutoff", max_misses=5)
+    assert min(FakeProcess.calls) == 20
+    assert len(checkpoint.read_text().splitlines()) == len(FakeProcess.calls) + 19
+    assert len(data) == LAST - len(MISSING)
+
+
+def test_remote_mapping_retries_errors(mapping, tmp_path, sleeps):
+    FakeProcess.errors = {3: [429, 503], 4: [500] * 6}
+    with pytest.raises(requests.HTTPError):
+        mapping.create_remote_mapping(
+            "3.10", "cutoff", max_id=8, max_workers=1, delay=0, max_retries=5
+        )
+    assert FakeProcess.calls.count(3) == 3
+    assert FakeProcess.calls.count(4) == 6
+    assert [wait for wait in sleeps if wait] == [1, 2] + [1, 2, 4, 8, 16]
+
+    # Failed ids aren't checkpointed as missing
+    checkpoint = tmp_path / "remote-mapping-3.10-cutoff.jsonl"
+    lines = [json.loads(line) for line in checkpoint.read_text().splitlines()]
+    assert {obj["id"] for obj in lines} == {1, 2, 3}
+    assert all(obj["data"] for obj in lines)
+
+    # Resumes with the remaining ids once the server recovers
+    FakeProcess.calls, FakeProcess.errors = [], {5: [401]}
+    data = mapping.create_remote_mapping("3.10", "cutoff", max_id=8, max_workers=1)
+    assert sorted(set(FakeProcess.calls)) == [4, 5, 6, 7, 8]
+    assert FakeProcess.calls.count(5) == 2
+    assert [obj["index"] for obj in data] == list(range(1, 9))
+
+
+def test_remote_mapping_errors_dont_end_discovery(mapping):
+    FakeProcess.errors = {i: [503] for i in range(13, 20)}
+    data = mapping.create_remote_mapping("3.10", "cutoff", max_misses=5)
+    assert [obj["index"] for obj in data] == [
+        i for i in range(1, LAST + 1) if i not in MISSING
+    ]
+
+
+def test_remote_mapping_retries_connection_errors(mapping, sleeps):
+    FakeProcess.timeouts = {2: 2}
+    data = mapping.create_remote_mapping("3.10", "cutoff", max_id=4, delay=0)
+    assert [obj["index"] for obj in data] == [1, 2, 3, 4]
+    assert [wait for wait in sleeps if wait] == [1, 2]
+
+
+def test_remote_mapping_checkpoints_batch_before_error(mapping, tmp_path):
+    FakeProcess.fail_at = 18
+    with pytest.raises(requests.ConnectionError):
+        mapping.create_remote_mapping("3.10", "cutoff", max_workers=4, max_retries=1)
+    checkpoint = tmp_path / "remote-mapping-3.10-cutoff.jsonl"
+    ids = {json.loads(line)["id"] for line in checkpoint.read_text().splitlines()}
+    assert ids == set(range(1, 33)) - {18}
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from ecoinvent_interface.matrices import MatrixExport, convert_matrix_export
+
+
+def write_export(tmp_path):
+    directory = tmp_path / "universal_matrix_export_3.10_cut-off" / "export"
+    directory.mkdir(parents=True)
+    (directory / "ie_index.csv").write_text(
+        "activityName;geography;product;unitName;index\n"
+        "heat production;CH;heat;MJ;1\n"
+        "electricity production;CH;electricity;kWh;0\n",
+        encoding="utf-8",
+    )
+    (directory / "ee_index.csv").write_text(
+        "name;compartment;subcompartment;unitName;index\n"
+        "Carbon dioxide, fossil;air;unspecified;kg;0\n",
+        encoding="utf-8",
+    )
+    (directory / "A_public.csv").write_text(
+        "row;column;coefficient\n0;0;1.0\n1;1;1.0\n0;1;-0.25\n", encoding="utf-8"
+    )
+    (directory / "B_public.csv").write_text(
+        "row;column;coefficient\n0;0;0.5\n0;1;0.07\n", encoding="utf-8"
+    )
+    return directory.parent
+
+
+@pytest.fixture
+def export_dir(tmp_path):
+    return write_export(tmp_path)
+
+
+def test_convert_matrix_export(export_dir, tmp_path):
+    target = convert_matrix_export(export_dir, tmp_path / "converted")
+    export = MatrixExport(target)
+    assert export.matrices == ["A", "B"]
+    assert export.shape("A") == (2, 2)
+    assert export.shape("B") == (1, 2)
+
+    rows, cols, data = export.coo("A")
+    assert isinstance(data, np.memmap)
+    assert rows.tolist() == [0, 1, 0]
+    assert cols.tolist() == [0, 1, 1]
+    assert data.tolist() == [1.0, 1.0, -0.25]
+
+    index = export.index("ie")
+    assert index.column("activityName") == [
+        "electricity production",
+        "heat production",
+    ]
+    assert index[1]["index"] == 1
+    with pytest.raises(KeyError):
+        export.coo("C")
+    with pytest.raises(KeyError):
+        export.index("LCIA")
+
+
+def test_convert_matrix_export_replaces_target(export_dir, tmp_path):
+    target = tmp_path / "converted"
+    target.mkdir()
+    (target / "stale.npy").write_bytes(b"")
+    convert_matrix_export(export_dir, target)
+    assert not (target / "stale.npy").exists()
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".matrices")]
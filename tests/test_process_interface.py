@@ -1,15 +1,32 @@
+import random
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 from pypdf import PdfReader
 
-from ecoinvent_interface import EcoinventProcess, ProcessFileType, Settings
+from ecoinvent_interface import (
+    EcoinventProcess,
+    ProcessFileType,
+    Settings,
+    process_interface,
+)
+from ecoinvent_interface.columnar import MappingTable
 from ecoinvent_interface.process_interface import (
+    MappingIndex,
     MissingProcess,
+    VersionLinkage,
     as_tuple,
+    filename_product_id,
     get_cached_mapping,
+    get_field_values,
+    get_version_linkage,
+    link_datasets,
+    match_field,
+    resolve_processes,
 )
 from ecoinvent_interface.storage import md5
+from ecoinvent_interface.string_distance import damerau_levenshtein
 
 WINDOWS = sys.platform.startswith("cygwin") or sys.platform.startswith("win32")
 
@@ -19,6 +36,251 @@ def test_get_cached_mapping_error():
         get_cached_mapping("foo", "bar")
 
 
+MAPPING = [
+    {
+        "index": 1,
+        "filename": "a.spold",
+        "activity_name": "electricity production, oil",
+        "reference_product": "electricity, high voltage",
+        "geography": "FI",
+    },
+    {
+        "index": 2,
+        "filename": "b.spold",
+        "activity_name": "electricity production, oil",
+        "reference_product": "electricity, high voltage",
+        "geography": "CH",
+    },
+    {
+        "index": 3,
+        "filename": "c.spold",
+        "activity_name": "heat production, oil",
+        "reference_product": "heat",
+        "geography": "CH",
+    },
+]
+
+
+def test_mapping_index_filename():
+    index = MappingIndex(MAPPING)
+    assert index.by_filename["b.spold"] == 2
+
+
+def test_mapping_index_filter():
+    index = MappingIndex(MAPPING)
+    assert index.filter({"geography": "CH"}) == MAPPING[1:]
+    assert index.filter(
+        {"activity_name": "electricity production, oil", "geography": "CH"}
+    ) == [MAPPING[1]]
+    assert index.filter(
+        {
+            "activity_name": "heat production, oil",
+            "reference_product": "heat",
+            "geography": "CH",
+        }
+    ) == [MAPPING[2]]
+    assert index.filter({"geography": "DE"}) == []
+    assert index.filter({}) == MAPPING
+
+
+def test_resolve_processes(monkeypatch):
+    monkeypatch.setattr(
+        "ecoinvent_interface.process_interface.get_mapping_index",
+        lambda version, system_model: MappingIndex(MAPPING),
+    )
+    result = resolve_processes(
+        "3.10",
+        "cutoff",
+        [
+            "c.spold",
+            {"name": "electricity production, oil", "location": "FI"},
+            {"name": "electricity production, oil"},
+            "foo.spold",
+            {"location": "DE"},
+            {"location": "FI", "name": "electricity production, oil"},
+        ],
+    )
+    assert result == {
+        "ids": [3, 1, None, None, None, 1],
+        "ambiguous": {2: [1, 2]},
+        "missing": [3, 4],
+    }
+
+
+# Activity UUIDs of a dataset change between releases, product UUIDs don't
+ELECTRICITY = "66c93e71-f32b-4591-901c-55395db5c132"
+HEAT = "a498d9fb-9402-4374-b2e2-3f85f5d98f43"
+SOURCE = [
+    {
+        "index": 1,
+        "filename": f"b0eb27dd-b87f-4ae9-9f69-57d811443a30_{ELECTRICITY}.spold",
+        "activity_name": "electricity production, oil",
+        "reference_product": "electricity, high voltage",
+        "geography": "FI",
+    },
+    {
+        "index": 2,
+        "filename": f"00046b5d-ba08-4d45-bd3f-7af0fa4e2e21_{ELECTRICITY}.spold",
+        "activity_name": "electricity production, oil",
+        "reference_product": "electricity, high voltage",
+        "geography": "CH",
+    },
+    {
+        "index": 3,
+        "filename": f"daec3a84-14ca-49cb-af09-8945ad764e80_{HEAT}.spold",
+        "activity_name": "heat production, heavy fuel oil, at industrial furnace",
+        "reference_product": "heat, district or industrial, other than natural gas",
+        "geography": "CH",
+    },
+    {
+        "index": 4,
+        "filename": "3e8dc2a0-4a5c-4cb4-88b5-3cfc8b0c1b86_7f1bc0a3-2b4e-4a91-a5b1-"
+        "1a6c9a9b2c11.spold",
+        "activity_name": "market for rye seed",
+        "reference_product": "rye seed",
+        "geography": "GLO",
+    },
+    {
+        "index": 5,
+        "filename": "d7a0c0ac-9e5e-4d0e-8f55-8d1b0b6f4c52_5b3f2a71-6a1e-4f0e-b3a4-"
+        "0c9e2d1f6a7b.spold",
+        "activity_name": "market for lime",
+        "reference_product": "lime",
+        "geography": "RoW",
+    },
+]
+
+
+def test_version_linkage():
+    target = [
+        # Same filename, renamed activity
+        dict(SOURCE[0], index=10, activity_name="electricity production, heavy oil"),
+        # New activity UUID, same product UUID and geography; another activity
+        # with the same product in CH is told apart by its name
+        dict(
+            SOURCE[1],
+            index=20,
+            filename=f"4f1d5c4e-0b7a-4c4a-9f2e-6c7b8f5d1e30_{ELECTRICITY}.spold",
+        ),
+        dict(
+            SOURCE[1],
+            index=21,
+            filename=f"9a2b1c3d-5e6f-4a7b-8c9d-0e1f2a3b4c5d_{ELECTRICITY}.spold",
+            activity_name="electricity production, hydro, run-of-river",
+        ),
+        # New activity UUID, renamed activity and product
+        dict(
+            SOURCE[2],
+            index=30,
+            filename=f"1b2c3d4e-5f6a-4b7c-8d9e-0f1a2b3c4d5e_{HEAT}.spold",
+            activity_name="heat production, heavy fuel oil, at furnace",
+            reference_product="heat, district or industrial",
+        ),
+        # New product UUID, same attributes
+        dict(SOURCE[3], index=40, filename="x_y.spold"),
+        # Two datasets with the same attributes can't be linked by key
+        dict(SOURCE[4], index=50, filename="y_z.spold"),
+        dict(SOURCE[4], index=51, filename="z_x.spold"),
+    ]
+    linkage = VersionLinkage(MappingIndex(SOURCE), MappingIndex(target))
+    assert linkage.links == {1: 10, 2: 20, 3: 30, 4: 40}
+    assert linkage.methods == {1: "filename", 2: "product", 3: "product", 4: "key"}
+    assert linkage.unlinked == [5]
+    assert linkage.link([3, 5, 1, 99]) == [30, None, 10, None]
+
+
+def test_filename_product_id():
+    assert filename_product_id(SOURCE[2]["filename"]) == HEAT
+    assert filename_product_id("a.spold") is None
+    assert filename_product_id(None) is None
+
+
+def test_link_datasets(monkeypatch):
+    target = [dict(obj, index=obj["index"] * 10) for obj in MAPPING]
+    monkeypatch.setattr(
+        "ecoinvent_interface.process_interface.get_mapping_index",
+        lambda version, system_model: MappingIndex(
+            MAPPING if version == "3.9.1" else target
+        ),
+    )
+    get_version_linkage.cache_clear()
+    assert link_datasets("3.9.1", "3.10", "cutoff", [1, 2, 3]) == [10, 20, 30]
+    get_version_linkage.cache_clear()
+
+
+@pytest.fixture
+def field_mapping(monkeypatch):
+    def use(records):
+        table = MappingTable.from_records(records)
+        monkeypatch.setattr(
+            process_interface,
+            "get_cached_mapping",
+            lambda version, system_model: table,
+        )
+        get_field_values.cache_clear()
+
+    yield use
+    get_field_values.cache_clear()
+
+
+def test_match_field(field_mapping):
+    field_mapping(
+        [
+            {"activity_name": "heat production", "geography": "CH"},
+            {"activity_name": "heat production", "geography": "DE"},
+            {"activity_name": "heat market", "geography": "DE"},
+            {"activity_name": None, "geography": "FR"},
+        ]
+    )
+    values = get_field_values("3.10", "cutoff", "activity_name")
+    assert values == ("heat market", "heat production")
+    assert get_field_values("3.10", "cutoff", "activity_name") is values
+    assert match_field("3.10", "cutoff", "activity_name", "heat prodcution", k=1) == [
+        (1, "heat production")
+    ]
+    assert match_field(
+        "3.10", "cutoff", "activity_name", "heat prodcution", max_distance=3
+    ) == [(1, "heat production")]
+    assert match_field(
+        "3.10", "cutoff", "activity_name", "heat prodcution", k=None
+    ) == [(1, "heat production"), (9, "heat market")]
+    assert match_field(
+        "3.10", "cutoff", "activity_name", "heat", k=None, max_distance=7
+    ) == [(7, "heat market")]
+
+
+@pytest.mark.slow
+def test_match_field_realistic_size(field_mapping):
+    # About as many distinct activity names as a release has
+    rng = random.Random(1)
+    words = (
+        "electricity heat production market for treatment of waste steel "
+        "aluminium cement clinker wheat grain rye seed natural gas oil diesel "
+        "transport freight lorry high medium low voltage import from swiss "
+        "integrated organic conventional"
+    ).split()
+    names = set()
+    while len(names) < 9293:
+        names.add(
+            ", ".join(
+                " ".join(rng.choice(words) for _ in range(rng.randint(2, 4)))
+                for _ in range(rng.randint(1, 3))
+            )
+        )
+    field_mapping([{"activity_name": name} for name in names])
+    for name in sorted(names)[::3000]:
+        query = name[:-3] + "xyz"
+        expected = sorted((damerau_levenshtein(query, other), other) for other in names)
+        assert match_field("3.10", "cutoff", "activity_name", query) == expected[:5]
+        within = [pair for pair in expected if pair[0] <= 6]
+        assert (
+            match_field(
+                "3.10", "cutoff", "activity_name", query, k=None, max_distance=6
+            )
+            == within
+        )
+
+
 def test_select_process_without_release_error(settings, custom_headers):
     ep = EcoinventProcess(settings=settings, custom_headers=custom_headers)
     with pytest.raises(ValueError):
@@ -180,3 +442,110 @@ def test_get_file_undefined(nuclear, tmp_path):
 def test_as_tuple():
     assert as_tuple("3.10") == (3, 10)
     assert as_tuple("3.10") > (3, 9)
+
+
+class FakeResponse:
+    def __init__(self, ok, data):
+        self.ok = ok
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def test_process_response_cache(tmp_path, monkeypatch):
+    process = EcoinventProcess(
+        Settings(username="u", password="p", output_path=str(tmp_path))
+    )
+    process.version, process.system_model, process.dataset_id = "3.10", "apos", "1"
+    calls = []
+
+    def fake_get_json(url, params):
+        calls.append(params)
+        return FakeResponse(params["dataset_id"] != "2", {"id": params["dataset_id"]})
+
+    monkeypatch.setattr(process, "_get_json", fake_get_json)
+    assert process.get_basic_info() == {"id": "1"}
+    assert process.get_basic_info() == {"id": "1"}
+    assert len(calls) == 1
+    assert process.get_basic_info(use_cache=False) == {"id": "1"}
+    assert len(calls) == 2
+
+    # Unsuccessful responses are not cached
+    process.dataset_id = "2"
+    process.get_basic_info()
+    process.get_basic_info()
+    assert len(calls) == 4
+
+
+def test_process_get_files(tmp_path, monkeypatch):
+    process = EcoinventProcess(
+        Settings(username="u", password="p", output_path=str(tmp_path))
+    )
+    process.version, process.system_model = "3.10", "apos"
+    directory = tmp_path / "files"
+    directory.mkdir()
+    (directory / "ecoinvent-3.10-apos-upr-1.spold").write_text("x")
+    calls = []
+
+    def fake_get_file(dataset_id, file_type, directory, **_):
+        calls.append(dataset_id)
+        filepath = directory / f"ecoinvent-3.10-apos-upr-{dataset_id}.spold"
+        filepath.write_text("partial")
+        if dataset_id == "3":
+            raise ValueError("nope")
+        return filepath
+
+    monkeypatch.setattr(process, "get_dataset_file", fake_get_file)
+    result = process.get_files(
+        ["1", "2", "3"], [ProcessFileType.upr], directory, max_workers=2
+    )
+    statuses = [obj["status"] for obj in result["results"]]
+    assert statuses == ["skipped", "downloaded", "error"]
+    assert sorted(calls) == ["2", "3"]
+    assert result["bytes"] == len("partial")
+    assert not (directory / "ecoinvent-3.10-apos-upr-3.spold").exists()
+
+    # Each file is downloaded once, with results in the order asked for
+    calls.clear()
+    result = process.get_files(
+        [4, "1", "4", 5, "5"],
+        iter([ProcessFileType.upr]),
+        directory,
+        max_workers=4,
+    )
+    assert [(obj["dataset_id"], obj["status"]) for obj in result["results"]] == [
+        ("4", "downloaded"),
+        ("1", "skipped"),
+        ("4", "downloaded"),
+        ("5", "downloaded"),
+        ("5", "downloaded"),
+    ]
+    assert sorted(calls) == ["4", "5"]
+    assert result["bytes"] == 2 * len("partial")
+
+
+def test_process_dataset_requests_threads(tmp_path, monkeypatch):
+    process = EcoinventProcess(
+        Settings(username="u", password="p", output_path=str(tmp_path))
+    )
+    calls = []
+
+    def fake_get_json(url, params):
+        calls.append(params)
+        return FakeResponse(True, {"id": params["dataset_id"]})
+
+    monkeypatch.setattr(process, "_get_json", fake_get_json)
+    with pytest.raises(ValueError):
+        process.get_dataset_info(1)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(
+                lambda index: process.get_dataset_info(index, "3.10", "cutoff"),
+                range(20),
+            )
+        )
+    assert results == [{"id": str(index)} for index in range(20)]
+    assert not hasattr(process, "dataset_id")
+    assert {obj["system_model"] for obj in calls} == {"cutoff"}
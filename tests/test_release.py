@@ -1,12 +1,26 @@
+import shutil
+from datetime import datetime
 from pathlib import Path
 
 import pytest
 from lxml import objectify
 from pypdf import PdfReader
 
-from ecoinvent_interface import ReleaseType
+from ecoinvent_interface import (
+    EcoinventRelease,
+    ReleaseType,
+    Settings,
+    get_lcia_implementation,
+)
+from ecoinvent_interface import release as release_module
 from ecoinvent_interface.storage import md5
 
+from .test_cumulative import write_cumulative_workbook
+from .test_dataset_index import write_release as write_index_release
+from .test_exchanges import write_release as write_exchanges_release
+from .test_lcia import write_lcia_workbook
+from .test_matrices import write_export
+
 
 def test_get_release_files(release):
     rf = release.get_release_files("3.7.1")
@@ -117,3 +131,160 @@ def test_get_release_not_extracted(release):
     assert metadata["version"] == "3.4"
     assert metadata["kind"] == "release"
     assert metadata["system_model"] == "cutoff"
+
+
+def write_cumulative_release(tmp_path):
+    directory = tmp_path / "ecoinvent 3.10_cut-off_cumulative_lcia_xlsx"
+    directory.mkdir()
+    write_cumulative_workbook(directory)
+    return directory
+
+
+# Catalogue field: release directory builder, entry point, release type
+# requested by the entry point, converter, and cache suffix
+DERIVED_CACHES = {
+    "matrices": (
+        write_export,
+        lambda release: release.get_matrix_export("3.10", "cutoff"),
+        ReleaseType.matrix,
+        "convert_matrix_export",
+        ".matrices",
+    ),
+    "cumulative": (
+        write_cumulative_release,
+        lambda release: release.get_cumulative_results("3.10", "cutoff"),
+        ReleaseType.cumulative_lcia,
+        "convert_cumulative_workbook",
+        ".cumulative",
+    ),
+    "dataset_index": (
+        write_index_release,
+        lambda release: release.get_dataset_index(
+            "3.10", "cutoff", max_workers=1
+        ).close(),
+        ReleaseType.ecospold,
+        "build_dataset_index",
+        ".sqlite",
+    ),
+    "exchanges": (
+        write_exchanges_release,
+        lambda release: release.get_exchange_arrays("3.10", "cutoff", max_workers=1),
+        ReleaseType.ecospold,
+        "convert_exchanges",
+        ".exchanges",
+    ),
+    "lcia": (
+        lambda tmp_path: write_lcia_workbook(tmp_path).parent,
+        lambda release: get_lcia_implementation(release, "3.10"),
+        None,
+        "convert_lcia_workbook",
+        ".lcia",
+    ),
+}
+
+
+@pytest.fixture
+def offline_release(tmp_path, monkeypatch):
+    """Release interface with `directory` as the cached download of every
+    release and extra file"""
+
+    def use(directory):
+        release = EcoinventRelease(
+            Settings(username="u", password="p", output_path=str(tmp_path / "cache"))
+        )
+        entry = {
+            "path": str(directory),
+            "created": datetime.now().isoformat(),
+            "kind": "release",
+            "version": "3.10",
+            "system_model": "cutoff",
+        }
+        release.storage.catalogue[directory.name + ".7z"] = entry
+        release.calls = []
+
+        def fake_get_release(version, system_model, release_type, **kwargs):
+            release.calls.append(release_type)
+            return directory
+
+        monkeypatch.setattr(release, "get_release", fake_get_release)
+        monkeypatch.setattr(
+            release_module,
+            "get_excel_lcia_file_for_version",
+            lambda **kwargs: next(directory.glob("*.xlsx")),
+        )
+        return release, entry
+
+    return use
+
+
+@pytest.mark.parametrize("field", DERIVED_CACHES)
+def test_derived_cache(field, offline_release, tmp_path, monkeypatch):
+    build, get, release_type, converter, suffix = DERIVED_CACHES[field]
+    directory = build(tmp_path)
+    release, entry = offline_release(directory)
+    filename = directory.name + ".7z"
+    conversions = []
+    convert = getattr(release_module, converter)
+
+    def counting_convert(*args, **kwargs):
+        conversions.append(args)
+        return convert(*args, **kwargs)
+
+    monkeypatch.setattr(release_module, converter, counting_convert)
+    get(release)
+    assert release.calls == ([release_type] if release_type else [])
+    target = directory.with_name(directory.name + suffix)
+    assert release.storage.catalogue[filename][field] == str(target)
+    assert target.exists()
+    assert len(conversions) == 1
+
+    # Converted only once
+    get(release)
+    assert len(conversions) == 1
+
+    # A new download drops the catalogue field, and the cache is rebuilt
+    release.storage.catalogue[filename] = entry
+    get(release)
+    assert len(conversions) == 2
+
+    # So is a cache which was deleted
+    if target.is_dir():
+        shutil.rmtree(target)
+    else:
+        target.unlink()
+    get(release)
+    assert len(conversions) == 3
+    assert release.storage.catalogue[filename][field] == str(target)
+
+
+@pytest.mark.parametrize(
+    "method, release_type",
+    [
+        ("get_cumulative_results", ReleaseType.matrix),
+        ("get_dataset_index", ReleaseType.matrix),
+        ("get_exchange_arrays", ReleaseType.lcia),
+    ],
+)
+def test_derived_cache_release_type_error(method, release_type, tmp_path):
+    release = EcoinventRelease(
+        Settings(username="u", password="p", output_path=str(tmp_path / "cache"))
+    )
+    with pytest.raises(ValueError):
+        getattr(release, method)("3.10", "cutoff", release_type)
+
+
+def test_get_cumulative_results_workbook(offline_release, tmp_path):
+    directory = write_cumulative_release(tmp_path)
+    release, _ = offline_release(directory)
+    results = release.get_cumulative_results(
+        "3.10", "cutoff", workbook="cumulative.xlsx"
+    )
+    assert results.values("LCIA").shape == (2, 3)
+    with pytest.raises(ValueError):
+        release.get_cumulative_results("3.10", "cutoff", workbook="missing")
+
+    # Several workbooks need a choice
+    shutil.copy(directory / "cumulative.xlsx", directory / "other.xlsx")
+    with pytest.raises(ValueError):
+        release.get_cumulative_results("3.10", "cutoff")
+    assert release.get_cumulative_results("3.10", "cutoff", workbook="other").sheets
@@ -0,0 +1,64 @@
+from ecoinvent_interface.search import SearchIndex, trigrams
+
+DATA = [
+    {
+        "index": 1,
+        "activity_name": "electricity production, oil",
+        "reference_product": "electricity, high voltage",
+        "geography": "FI",
+    },
+    {
+        "index": 2,
+        "activity_name": "electricity production, oil",
+        "reference_product": "electricity, high voltage",
+        "geography": "CH",
+    },
+    {
+        "index": 3,
+        "activity_name": "heat production, natural gas",
+        "reference_product": "heat, district or industrial",
+        "geography": "CH",
+    },
+    {
+        "index": 4,
+        "activity_name": "rye seed production, Swiss integrated production",
+        "reference_product": "rye seed, Swiss integrated production",
+        "geography": "CH",
+    },
+]
+
+
+def test_trigrams():
+    assert trigrams("ch") == {"  c", " ch", "ch "}
+
+
+def test_search_text():
+    index = SearchIndex(DATA)
+    result = index.search("rye sd production, swiss integrated production")
+    assert result[0]["index"] == 4
+    assert 0 < result[0]["score"] < 1
+    assert index.search("heat", limit=1)[0]["index"] == 3
+
+
+def test_search_attributes():
+    index = SearchIndex(DATA)
+    result = index.search(
+        {"activity_name": "electricity production, oyl", "geography": "CH"}, limit=2
+    )
+    assert [obj["index"] for obj in result] == [2, 1]
+    assert result[0]["score"] > result[1]["score"]
+
+
+def test_search_exact_match_scores_one():
+    index = SearchIndex(DATA)
+    result = index.search({"activity_name": "heat production, natural gas"})
+    assert result[0]["index"] == 3
+    assert result[0]["score"] == 1
+
+
+def test_search_no_limit():
+    index = SearchIndex(DATA)
+    result = index.search("electricity production, oil", limit=None)
+    assert len(result) == len(DATA)
+    scores = [obj["score"] for obj in result]
+    assert scores == sorted(scores, reverse=True)
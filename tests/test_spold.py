@@ -0,0 +1,101 @@
+import os
+import shutil
+from pathlib import Path
+
+import pyecospold
+import pytest
+
+from ecoinvent_interface import CachedStorage, ProcessMapping, Settings
+from ecoinvent_interface import mapping as mapping_module
+from ecoinvent_interface.spold import extract_mapping_fields
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def test_extract_mapping_fields_matches_pyecospold():
+    filepath = FIXTURES_DIR / "activity.spold"
+    ecospold = pyecospold.parse_file_v2(filepath)
+    description = ecospold.activityDataset.activityDescription
+    (product,) = [
+        exc
+        for exc in ecospold.activityDataset.flowData.intermediateExchanges
+        if exc.groupStr == "ReferenceProduct" and exc.amount
+    ]
+    assert extract_mapping_fields(filepath) == {
+        "filename": "activity.spold",
+        "activity_name": description.activity[0].activityNames[0],
+        "reference_product": product.names[0],
+        "geography": description.geography[0].shortNames[0],
+    }
+
+
+def test_extract_mapping_fields_no_reference_product(tmp_path):
+    content = (FIXTURES_DIR / "activity.spold").read_text(encoding="utf-8")
+    filepath = tmp_path / "broken.spold"
+    filepath.write_text(content.replace('amount="1"', 'amount="0"'), encoding="utf-8")
+    with pytest.raises(ValueError):
+        extract_mapping_fields(filepath)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_iter_local_mapping(tmp_path, max_workers):
+    storage = CachedStorage(tmp_path / "cache")
+    directory = tmp_path / "release" / "datasets"
+    directory.mkdir(parents=True)
+    for index in range(5):
+        shutil.copy(FIXTURES_DIR / "activity.spold", directory / f"{index}.spold")
+    (directory / "other.txt").write_text("not a dataset")
+    storage.catalogue["ecoinvent 3.10_cutoff_ecoSpold02.7z"] = {
+        "path": str(tmp_path / "release")
+    }
+
+    pm = ProcessMapping(Settings(username="u", password="p"), storage=storage)
+    records = pm.create_local_mapping("3.10", "cutoff", max_workers=max_workers)
+    assert sorted(obj["filename"] for obj in records) == [
+        f"{index}.spold" for index in range(5)
+    ]
+    assert {obj["geography"] for obj in records} == {"CH"}
+
+
+def test_local_mapping_incremental(tmp_path, monkeypatch):
+    storage = CachedStorage(tmp_path / "cache")
+    directory = tmp_path / "release" / "datasets"
+    directory.mkdir(parents=True)
+    for index in range(3):
+        shutil.copy(FIXTURES_DIR / "activity.spold", directory / f"{index}.spold")
+    storage.catalogue["ecoinvent 3.10_cutoff_ecoSpold02.7z"] = {
+        "path": str(tmp_path / "release")
+    }
+    pm = ProcessMapping(Settings(username="u", password="p"), storage=storage)
+    first = pm.create_local_mapping("3.10", "cutoff", max_workers=1)
+
+    parsed = []
+
+    def fake_extract(filepath):
+        parsed.append(filepath.name)
+        return extract_mapping_fields(filepath)
+
+    monkeypatch.setattr(mapping_module, "extract_mapping_fields", fake_extract)
+    assert pm.create_local_mapping("3.10", "cutoff", max_workers=1) == first
+    assert parsed == []
+
+    # Touched but unchanged, changed, new, and deleted files
+    os.utime(directory / "0.spold", ns=(0, 0))
+    content = (directory / "1.spold").read_text(encoding="utf-8")
+    (directory / "1.spold").write_text(
+        content.replace(">CH<", ">RoW<"), encoding="utf-8"
+    )
+    shutil.copy(directory / "2.spold", directory / "3.spold")
+    (directory / "2.spold").unlink()
+
+    records = pm.create_local_mapping("3.10", "cutoff", max_workers=1)
+    assert sorted(parsed) == ["1.spold", "3.spold"]
+    assert {obj["filename"]: obj["geography"] for obj in records} == {
+        "0.spold": "CH",
+        "1.spold": "RoW",
+        "3.spold": "CH",
+    }
+
+    parsed.clear()
+    pm.create_local_mapping("3.10", "cutoff", max_workers=1, incremental=False)
+    assert len(parsed) == 3
@@ -0,0 +1,338 @@
+import io
+import json
+import os
+import shutil
+import stat
+import tarfile
+from datetime import datetime
+from pathlib import Path
+
+import py7zr
+import pytest
+
+from ecoinvent_interface import EcoinventRelease, Settings
+from ecoinvent_interface import storage as storage_module
+from ecoinvent_interface.release import fix_release_versions
+from ecoinvent_interface.storage import (
+    CachedStorage,
+    ResponseCache,
+    atomic_directory,
+    md5,
+)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def add_entry(storage, filename, files):
+    directory = storage.dir / filename.replace(".7z", "")
+    for name, content in files.items():
+        (directory / name).parent.mkdir(parents=True, exist_ok=True)
+        (directory / name).write_text(content, encoding="utf-8")
+    storage.catalogue[filename] = {
+        "path": str(directory),
+        "archive": filename,
+        "extracted": True,
+        "created": datetime.now().isoformat(),
+        "system_model": "cutoff",
+        "version": "3.10",
+        "kind": "release",
+    }
+    return directory
+
+
+@pytest.fixture
+def source(tmp_path):
+    storage = CachedStorage(tmp_path / "source")
+    add_entry(
+        storage,
+        "first.7z",
+        {"datasets/a.spold": "a" * 1000, "MasterData/b.xml": "b", "c.txt": "c"},
+    )
+    add_entry(storage, "second.7z", {"d.txt": "d"})
+    return storage
+
+
+def test_bundle_roundtrip(source, tmp_path):
+    manifest = source.export_bundle(tmp_path / "bundle.tar", filenames=["first.7z"])
+    assert list(manifest["entries"]) == ["first.7z"]
+    assert manifest["entries"]["first.7z"]["path"] == "first"
+    assert len(manifest["files"]) == 3
+
+    target = CachedStorage(tmp_path / "target")
+    assert target.import_bundle(tmp_path / "bundle.tar") == ["first.7z"]
+    assert list(target.catalogue) == ["first.7z"]
+
+    path = target.dir / "first"
+    assert target.catalogue["first.7z"]["path"] == str(path)
+    assert target.catalogue["first.7z"]["version"] == "3.10"
+    assert md5(path / "datasets" / "a.spold") == md5(
+        source.dir / "first" / "datasets" / "a.spold"
+    )
+    assert (path / "MasterData" / "b.xml").read_text(encoding="utf-8") == "b"
+    assert not [p for p in target.dir.iterdir() if p.name.startswith(".bundle")]
+
+
+def test_bundle_stream_compressed(source, tmp_path):
+    buffer = io.BytesIO()
+    source.export_bundle(buffer, compression="gz")
+    buffer.seek(0)
+
+    target = CachedStorage(tmp_path / "target")
+    assert sorted(target.import_bundle(buffer)) == ["first.7z", "second.7z"]
+    assert (target.dir / "second" / "d.txt").read_text(encoding="utf-8") == "d"
+
+
+def test_bundle_existing_entries(source, tmp_path):
+    source.export_bundle(tmp_path / "bundle.tar", filenames=["second.7z"])
+    target = CachedStorage(tmp_path / "target")
+    add_entry(target, "second.7z", {"old.txt": "old"})
+
+    with pytest.raises(ValueError):
+        target.import_bundle(tmp_path / "bundle.tar")
+    assert (target.dir / "second" / "old.txt").is_file()
+
+    target.import_bundle(tmp_path / "bundle.tar", overwrite=True)
+    assert not (target.dir / "second" / "old.txt").exists()
+    assert (target.dir / "second" / "d.txt").is_file()
+
+
+@pytest.mark.parametrize("failing_call", [2, 4, None])
+def test_bundle_import_failure_rolls_back(source, tmp_path, monkeypatch, failing_call):
+    source.export_bundle(tmp_path / "bundle.tar")
+    target = CachedStorage(tmp_path / "target")
+    add_entry(target, "first.7z", {"old.txt": "first"})
+    add_entry(target, "second.7z", {"old.txt": "second"})
+    catalogue = dict(target.catalogue)
+
+    replace, calls = os.replace, []
+
+    def flaky_replace(src, dst):
+        calls.append(src)
+        if len(calls) == failing_call:
+            raise OSError("disk full")
+        return replace(src, dst)
+
+    def failing_update(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", flaky_replace)
+    if failing_call is None:
+        # Fail at the catalogue write, after all files are in place
+        monkeypatch.setattr(type(target.catalogue), "update", failing_update)
+    with pytest.raises(OSError):
+        target.import_bundle(tmp_path / "bundle.tar", overwrite=True)
+
+    for name in ("first", "second"):
+        directory = target.dir / name
+        assert [p.name for p in directory.iterdir()] == ["old.txt"]
+        assert (directory / "old.txt").read_text(encoding="utf-8") == name
+    assert dict(target.catalogue) == catalogue
+    assert not [p for p in target.dir.iterdir() if p.name.startswith(".bundle")]
+
+
+def test_bundle_corrupted(source, tmp_path):
+    source.export_bundle(tmp_path / "bundle.tar", filenames=["second.7z"])
+    with tarfile.open(tmp_path / "bundle.tar") as tar:
+        manifest = json.load(tar.extractfile("manifest.json"))
+    manifest["files"]["files/second/d.txt"]["md5"] = "nope"
+
+    content = json.dumps(manifest).encode("utf-8")
+    with tarfile.open(tmp_path / "broken.tar", "w") as tar:
+        tar.add(source.dir / "second", arcname="files/second")
+        tarinfo = tarfile.TarInfo("manifest.json")
+        tarinfo.size = len(content)
+        tar.addfile(tarinfo, io.BytesIO(content))
+
+    target = CachedStorage(tmp_path / "target")
+    with pytest.raises(ValueError):
+        target.import_bundle(tmp_path / "broken.tar")
+    assert not len(target.catalogue)
+    assert sorted(p.name for p in target.dir.iterdir()) == ["catalogue.json"]
+
+
+def test_bundle_unsafe_member(tmp_path):
+    with tarfile.open(tmp_path / "evil.tar", "w") as tar:
+        tarinfo = tarfile.TarInfo("files/../../evil.txt")
+        tarinfo.size = 1
+        tar.addfile(tarinfo, io.BytesIO(b"x"))
+
+    target = CachedStorage(tmp_path / "target")
+    with pytest.raises(ValueError):
+        target.import_bundle(tmp_path / "evil.tar")
+    assert not (tmp_path / "evil.txt").exists()
+
+
+@pytest.fixture
+def offline_release(tmp_path, monkeypatch):
+    source = tmp_path / "source"
+    (source / "datasets").mkdir(parents=True)
+    (source / "MasterData").mkdir()
+    shutil.copy(FIXTURES_DIR / "dataset.spold", source / "datasets" / "a.spold")
+    shutil.copy(FIXTURES_DIR / "Compartments.xml", source / "MasterData" / "c.xml")
+    (source / "datasets" / "b.spold").write_text(
+        (FIXTURES_DIR / "dataset.spold").read_text(encoding="utf-8"),
+        encoding="utf-8",
+    )
+    archive_path = tmp_path / "archive.7z"
+    with py7zr.SevenZipFile(archive_path, "w") as archive:
+        archive.writeall(source, arcname="")
+
+    release = EcoinventRelease(
+        Settings(username="u", password="p", output_path=str(tmp_path / "cache"))
+    )
+
+    def fake_download(uuid, filename, url_namespace, directory):
+        shutil.copy(archive_path, directory / filename)
+        return directory / filename
+
+    monkeypatch.setattr(release, "_download_s3", fake_download)
+    return release
+
+
+def test_verify_and_repair(offline_release):
+    filename = "ecoinvent 3.10_cutoff_ecoSpold02.7z"
+    directory = offline_release._download_and_cache(
+        filename=filename,
+        uuid="foo",
+        kind="release",
+        modified=datetime(2020, 1, 1),
+        expected_size=0,
+        url_namespace="r",
+    )
+    storage = offline_release.storage
+    manifest = storage.load_manifest(filename)
+    assert manifest["uuid"] == "foo"
+    assert sorted(manifest["members"]) == [
+        "MasterData/c.xml",
+        "datasets/a.spold",
+        "datasets/b.spold",
+    ]
+    assert storage.verify(filename) == []
+    assert storage.verify(filename, full=True) == []
+
+    # Same size, different content, different mtime
+    content = (directory / "datasets" / "a.spold").read_bytes()
+    (directory / "datasets" / "a.spold").write_bytes(content[::-1])
+    (directory / "MasterData" / "c.xml").unlink()
+    assert storage.verify(filename, max_workers=2) == [
+        "MasterData/c.xml",
+        "datasets/a.spold",
+    ]
+
+    assert offline_release.repair(filename) == ["MasterData/c.xml", "datasets/a.spold"]
+    assert (directory / "datasets" / "a.spold").read_bytes() == content
+    assert storage.verify(filename, full=True) == []
+    assert not (storage.dir / filename).exists()
+
+
+def test_verify_after_version_fix(offline_release):
+    filename = "ecoinvent 3.10_cutoff_ecoSpold02.7z"
+    directory = offline_release._download_and_cache(
+        filename=filename,
+        uuid="foo",
+        kind="release",
+        modified=datetime(2020, 1, 1),
+        expected_size=0,
+        url_namespace="r",
+    )
+    storage = offline_release.storage
+    fixed = fix_release_versions(directory, 3, 10)
+    storage.refresh_manifest(filename, fixed, fixed_version=[3, 10])
+    assert storage.verify(filename, full=True) == []
+
+    (directory / "datasets" / "b.spold").write_text("", encoding="utf-8")
+    assert offline_release.repair(filename) == ["datasets/b.spold"]
+    assert 'minorRelease="10"' in (directory / "datasets" / "b.spold").read_text(
+        encoding="utf-8"
+    )
+    assert storage.verify(filename, full=True) == []
+
+
+def test_bundle_includes_manifest(offline_release, tmp_path):
+    filename = "ecoinvent 3.10_cutoff_ecoSpold02.7z"
+    offline_release._download_and_cache(
+        filename=filename,
+        uuid="foo",
+        kind="release",
+        modified=datetime(2020, 1, 1),
+        expected_size=0,
+        url_namespace="r",
+    )
+    offline_release.storage.export_bundle(tmp_path / "bundle.tar")
+
+    target = CachedStorage(tmp_path / "target")
+    target.import_bundle(tmp_path / "bundle.tar")
+    assert target.catalogue[filename]["manifest"].startswith(str(target.dir))
+    assert target.verify(filename) == []
+
+
+def test_response_cache_roundtrip(tmp_path):
+    cache = ResponseCache(tmp_path)
+    key = ResponseCache.make_key("user", "url", {"b": 1, "a": 2})
+    assert key == ResponseCache.make_key("user", "url", {"a": 2, "b": 1})
+    assert cache.get(key) is None
+    cache.set(key, {"foo": ["bar"]})
+    assert cache.get(key) == {"foo": ["bar"]}
+    assert ResponseCache(tmp_path).get(key) == {"foo": ["bar"]}
+
+
+def test_response_cache_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path, ttl=10)
+    cache.set("abc", [1])
+    assert cache.get("abc") == [1]
+    monkeypatch.setattr("ecoinvent_interface.storage.time", lambda: 1e12)
+    assert cache.get("abc") is None
+    assert not list(tmp_path.glob("*/*.json"))
+
+
+def test_response_cache_eviction(tmp_path):
+    cache = ResponseCache(tmp_path, max_size=1000)
+    for index in range(20):
+        key = ResponseCache.make_key(index)
+        cache.set(key, "x" * 100)
+        os.utime(cache._filepath(key), (index, index))
+    sizes = [fp.stat().st_size for fp in tmp_path.glob("*/*.json")]
+    assert sum(sizes) <= 1000
+    assert cache.get(ResponseCache.make_key(19)) == "x" * 100
+    assert cache.get(ResponseCache.make_key(0)) is None
+
+
+def test_atomic_directory(tmp_path):
+    target = tmp_path / "cache" / "converted"
+    with atomic_directory(target) as staging:
+        (staging / "a").write_text("old")
+    assert (target / "a").read_text() == "old"
+
+    with pytest.raises(ValueError):
+        with atomic_directory(target) as staging:
+            (staging / "b").write_text("new")
+            raise ValueError
+    assert sorted(p.name for p in target.iterdir()) == ["a"]
+
+    with atomic_directory(target) as staging:
+        (staging / "b").write_text("new")
+    assert sorted(p.name for p in target.iterdir()) == ["b"]
+    assert list(target.parent.iterdir()) == [target]
+    if os.name != "nt":
+        mode = stat.S_IMODE(target.stat().st_mode)
+        assert mode == 0o777 & ~storage_module.UMASK
+
+
+def test_atomic_directory_restores_target(tmp_path, monkeypatch):
+    target = tmp_path / "converted"
+    with atomic_directory(target) as staging:
+        (staging / "a").write_text("old")
+
+    replace = os.replace
+
+    def fail_on_staging(source, destination):
+        if Path(destination) == target and Path(source).name.startswith(".conv"):
+            raise OSError("Rename failed")
+        replace(source, destination)
+
+    monkeypatch.setattr(storage_module.os, "replace", fail_on_staging)
+    with pytest.raises(OSError):
+        with atomic_directory(target) as staging:
+            (staging / "b").write_text("new")
+    assert sorted(p.name for p in target.iterdir()) == ["a"]
+    assert list(tmp_path.iterdir()) == [target]
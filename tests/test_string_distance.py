@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from ecoinvent_interface.string_distance import (
+    bounded_damerau_levenshtein,
+    closest_match,
+    closest_matches,
+    damerau_levenshtein,
+    damerau_levenshtein_many,
+    damerau_levenshtein_matrix,
+    top_k_matches,
+)
+
+
+def random_strings(count, alphabet="abcd", max_length=10, seed=42):
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2, 3, 5])
+def test_bounded_same_as_full(max_distance):
+    strings = random_strings(60)
+    for first in strings:
+        for second in strings:
+            assert bounded_damerau_levenshtein(first, second, max_distance) == min(
+                damerau_levenshtein(first, second), max_distance + 1
+            )
+
+
+def test_bounded_examples():
+    assert bounded_damerau_levenshtein("kitten", "sitting", 3) == 3
+    assert bounded_damerau_levenshtein("kitten", "sitting", 2) == 3
+    assert bounded_damerau_levenshtein("ab", "ba", 1) == 1
+    assert bounded_damerau_levenshtein("", "abc", 5) == 3
+    assert bounded_damerau_levenshtein("", "abcdef", 2) == 3
+
+
+def test_closest_match():
+    assert closest_match("kitten", ["sitting", "mitten", "kitchen"]) == (1, "mitten")
+    assert closest_match("kitten", ["sitting"], max_distance=2) is None
+    assert closest_match("kitten", []) is None
+    # Ties go to the smallest candidate, as with sorting all distances
+    assert closest_match("ab", ["ba", "ac", "bb"]) == (1, "ac")
+
+
+def test_closest_matches_same_as_sorting():
+    candidates = random_strings(40, seed=1)
+    queries = random_strings(40, seed=2)
+    for max_distance in (None, 1, 3):
+        expected = []
+        for query in queries:
+            best = sorted((damerau_levenshtein(query, c), c) for c in candidates)[0]
+            if max_distance is not None and best[0] > max_distance:
+                best = None
+            expected.append(best)
+        assert closest_matches(queries, candidates, max_distance) == expected
+
+
+@pytest.mark.parametrize("alphabet", ["ab", "abcd", "abcdefghijklmnop"])
+def test_bit_parallel_same_as_scalar(alphabet):
+    queries = random_strings(50, alphabet=alphabet, max_length=15, seed=3)
+    candidates = random_strings(50, alphabet=alphabet, max_length=15, seed=4)
+    assert damerau_levenshtein_matrix(queries, candidates) == [
+        [damerau_levenshtein(query, candidate) for candidate in candidates]
+        for query in queries
+    ]
+
+
+def test_bit_parallel_long_strings():
+    # Longer than a machine word
+    first = "ab" * 50 + "electricity" + "c" * 30
+    second = "ba" * 50 + "electircity" + "c" * 25
+    assert damerau_levenshtein_many(first, [second]) == [
+        damerau_levenshtein(first, second)
+    ]
+
+
+def test_top_k_matches():
+    candidates = ["sitting", "mitten", "kitchen", "bitten", "kitten"]
+    assert top_k_matches("kitten", candidates, k=3) == [
+        (0, "kitten"),
+        (1, "bitten"),
+        (1, "mitten"),
+    ]
+    assert top_k_matches("kitten", candidates, k=10, max_distance=1) == [
+        (0, "kitten"),
+        (1, "bitten"),
+        (1, "mitten"),
+    ]
+    assert top_k_matches("", ["ab", "a"], k=1) == [(1, "a")]
+    assert top_k_matches("kitten", candidates, k=None, max_distance=2) == [
+        (0, "kitten"),
+        (1, "bitten"),
+        (1, "mitten"),
+        (2, "kitchen"),
+    ]
+    assert len(top_k_matches("kitten", candidates, k=None)) == 5